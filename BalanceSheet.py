@@ -0,0 +1,74 @@
+import heapq
+
+# All-address balances in one pass over the chain
+# Calling get_balance once per wallet scans the chain once per wallet. A
+# BalanceSheet holds every address's balance after a given height, so a rich
+# list or treasury report costs one linear pass, and later reports only replay
+# the blocks added since the previous sheet.
+#
+# Works with any chain of blocks whose transactions have sender, receiver and
+# amount (and optionally fee), e.g. Day 4 and Day 7 blocks.
+
+MINT_SENDER = "System"  # Coinbase transactions create coins; this sender is never debited
+
+
+class BalanceSheet:
+    def __init__(self, balances=None, height=-1, tip_hash=None):
+        self.balances = balances if balances is not None else {}
+        self.height = height  # Last block included (-1 = none yet)
+        self.tip_hash = tip_hash  # Hash of that block, to detect reorgs
+
+    def get(self, address):
+        return self.balances.get(address, 0)
+
+    def ranked(self, top=None, min_balance=None):
+        """[(address, balance)] richest first, optionally the top K and/or at least min_balance"""
+        items = self.balances.items()
+        if min_balance is not None:
+            items = [(address, balance) for address, balance in items if balance >= min_balance]
+        if top is not None:
+            return heapq.nlargest(top, items, key=lambda item: item[1])
+        return sorted(items, key=lambda item: item[1], reverse=True)
+
+    def total_supply(self):
+        return sum(self.balances.values())
+
+    def copy(self):
+        return BalanceSheet(dict(self.balances), self.height, self.tip_hash)
+
+    def __len__(self):
+        return len(self.balances)
+
+    def __repr__(self):
+        return f"BalanceSheet({len(self.balances)} addresses at height {self.height})"
+
+
+def compute_balances(chain, previous=None, mint_sender=MINT_SENDER):
+    """
+    Balances of every address after the last block of `chain`.
+
+    With `previous` (an earlier sheet for the same chain) only the blocks above
+    previous.height are replayed; if that block has since been replaced by a
+    reorg, everything is recomputed. `previous` is not modified.
+    """
+    start = 0
+    sheet = BalanceSheet()
+    if previous is not None and previous.height < len(chain):
+        if previous.height < 0 or chain[previous.height].hash == previous.tip_hash:
+            sheet = previous.copy()
+            start = previous.height + 1
+
+    balances = sheet.balances
+    for height in range(start, len(chain)):
+        block = chain[height]
+        if getattr(block, "pruned", False):
+            raise ValueError(f"Block #{block.index} is pruned; use the chain's state index instead")
+        for tx in block.transactions:
+            balances[tx.receiver] = balances.get(tx.receiver, 0) + tx.amount
+            if tx.sender != mint_sender:
+                balances[tx.sender] = balances.get(tx.sender, 0) - (tx.amount + getattr(tx, "fee", 0))
+
+    if len(chain) > 0:
+        sheet.height = len(chain) - 1
+        sheet.tip_hash = chain[-1].hash
+    return sheet
@@ -0,0 +1,442 @@
+import struct
+from datetime import datetime, timedelta, timezone
+
+from BloomFilter import BloomFilter
+from Day4_TransactionSystem import Transaction, EnhancedBlock
+
+# Versioned binary codec for transactions, blocks and block headers
+# Used for storage and the network. JSON (to_dict) stays around for display.
+#
+# Every top-level record starts with a version byte and a kind byte. Integers
+# are (zigzag) varints, floats are 8-byte doubles, hex digests are stored as
+# raw bytes and timestamps as microseconds since the Unix epoch.
+# Records of older versions stay readable where they can still be checked:
+# readers take the record's version and default whatever it did not carry yet.
+# v1 headers and blocks are refused. Their block hashes covered the JSON
+# transaction list, not a Merkle root, so no v1 block can validate today; such
+# chains have to be re-mined (or re-downloaded) rather than migrated.
+
+CODEC_VERSION = 3  # 2: headers carry the Merkle root, blocks a pruned flag; 3: transaction nonces
+MIN_BLOCK_VERSION = 2  # Oldest header/block records that can still be validated
+
+KIND_TRANSACTION = 1
+KIND_BLOCK = 2
+KIND_HEADER = 3
+KIND_VALUE = 4
+
+EPOCH = datetime(1970, 1, 1)
+ONE_MICROSECOND = timedelta(microseconds=1)
+DOUBLE = struct.Struct(">d")
+
+class CodecError(ValueError):
+    """Raised for truncated, corrupt or unsupported records"""
+
+#-----------------------------------------------------------------------------
+# Primitive encoders: each appends to a bytearray
+#-----------------------------------------------------------------------------
+def write_varint(out, value):
+    if value < 0x80:
+        out.append(value)
+        return
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def read_varint(data, offset):
+    result = 0
+    shift = 0
+    while True:
+        try:
+            byte = data[offset]
+        except IndexError:
+            raise CodecError("Truncated varint") from None
+        offset += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, offset
+        shift += 7
+
+def write_signed(out, value):
+    write_varint(out, (value << 1) if value >= 0 else ((-value << 1) - 1))
+
+def read_signed(data, offset):
+    value, offset = read_varint(data, offset)
+    return (value >> 1) if not value & 1 else -((value + 1) >> 1), offset
+
+def write_bytes(out, value):
+    length = len(value)
+    if length < 0x80:
+        out.append(length)
+    else:
+        write_varint(out, length)
+    out += value
+
+def read_bytes(data, offset):
+    length, offset = read_varint(data, offset)
+    end = offset + length
+    if end > len(data):
+        raise CodecError("Truncated byte string")
+    return bytes(data[offset:end]), end
+
+def write_text(out, value):
+    write_bytes(out, value.encode())
+
+def read_text(data, offset):
+    value, offset = read_bytes(data, offset)
+    return value.decode(), offset
+
+# Numbers keep their Python type so amounts round-trip exactly
+NUMBER_INT, NUMBER_FLOAT = 0, 1
+
+def write_number(out, value):
+    if isinstance(value, int) and not isinstance(value, bool):
+        out.append(NUMBER_INT)
+        write_signed(out, value)
+    elif isinstance(value, float):
+        out.append(NUMBER_FLOAT)
+        out += DOUBLE.pack(value)
+    else:
+        raise CodecError(f"Unsupported number type: {type(value).__name__}")
+
+def read_number(data, offset):
+    tag = data[offset]
+    if tag == NUMBER_INT:
+        return read_signed(data, offset + 1)
+    if tag == NUMBER_FLOAT:
+        return DOUBLE.unpack_from(data, offset + 1)[0], offset + 9
+    raise CodecError(f"Unknown number tag {tag}")
+
+# Hex digests become raw bytes; anything else (e.g. "0", "SYSTEM_SIGNATURE") stays text
+DIGEST_NONE, DIGEST_32, DIGEST_RAW, DIGEST_TEXT = 0, 1, 2, 3
+
+def write_digest(out, value):
+    if value is None:
+        out.append(DIGEST_NONE)
+        return
+    raw = None
+    if len(value) % 2 == 0:
+        try:
+            raw = bytes.fromhex(value)
+        except ValueError:
+            pass
+    if raw is None or raw.hex() != value:
+        out.append(DIGEST_TEXT)
+        write_text(out, value)
+    elif len(raw) == 32:
+        out.append(DIGEST_32)
+        out += raw
+    else:
+        out.append(DIGEST_RAW)
+        write_bytes(out, raw)
+
+def read_digest(data, offset):
+    tag = data[offset]
+    offset += 1
+    if tag == DIGEST_32:
+        if offset + 32 > len(data):
+            raise CodecError("Truncated digest")
+        return data[offset:offset + 32].hex(), offset + 32
+    if tag == DIGEST_NONE:
+        return None, offset
+    if tag == DIGEST_RAW:
+        raw, offset = read_bytes(data, offset)
+        return raw.hex(), offset
+    if tag == DIGEST_TEXT:
+        return read_text(data, offset)
+    raise CodecError(f"Unknown digest tag {tag}")
+
+TIME_NAIVE, TIME_AWARE, TIME_TEXT = 0, 1, 2
+
+def write_timestamp(out, value):
+    if isinstance(value, datetime):
+        if value.tzinfo is None:
+            out.append(TIME_NAIVE)
+            write_signed(out, (value - EPOCH) // ONE_MICROSECOND)
+        else:
+            offset = value.utcoffset()
+            out.append(TIME_AWARE)
+            write_signed(out, (value.replace(tzinfo=None) - offset - EPOCH) // ONE_MICROSECOND)
+            write_signed(out, offset // timedelta(seconds=1))
+    else:
+        out.append(TIME_TEXT)
+        write_text(out, str(value))
+
+def read_timestamp(data, offset):
+    tag = data[offset]
+    offset += 1
+    if tag == TIME_NAIVE:
+        micros, offset = read_signed(data, offset)
+        return EPOCH + micros * ONE_MICROSECOND, offset
+    if tag == TIME_AWARE:
+        micros, offset = read_signed(data, offset)
+        seconds, offset = read_signed(data, offset)
+        utc_offset = timedelta(seconds=seconds)
+        value = EPOCH + timedelta(microseconds=micros) + utc_offset
+        return value.replace(tzinfo=timezone(utc_offset)), offset
+    if tag == TIME_TEXT:
+        return read_text(data, offset)
+    raise CodecError(f"Unknown timestamp tag {tag}")
+
+#-----------------------------------------------------------------------------
+# Transactions, headers and blocks (bodies without the version prefix)
+#-----------------------------------------------------------------------------
+def write_transaction(out, tx):
+    if type(tx) is not Transaction:  # e.g. UTXOTransaction: its inputs and outputs have no layout here
+        raise CodecError(f"Cannot encode {type(tx).__name__}")
+    write_text(out, tx.sender)
+    write_text(out, tx.receiver)
+    write_number(out, tx.amount)
+    write_number(out, tx.fee)
+    write_timestamp(out, tx.timestamp)
+    write_digest(out, tx.transaction_id)
+    write_digest(out, tx.signature)
+    write_digest(out, tx.hash)
+    write_varint(out, 0 if tx.nonce is None else tx.nonce + 1)  # 0 = no nonce
+
+def read_transaction(data, offset, version=CODEC_VERSION):
+    # Skip __init__: the stored ID and hash are kept as-is and checked by is_valid()
+    tx = Transaction.__new__(Transaction)
+    tx.sender, offset = read_text(data, offset)
+    tx.receiver, offset = read_text(data, offset)
+    tx.amount, offset = read_number(data, offset)
+    tx.fee, offset = read_number(data, offset)
+    tx.timestamp, offset = read_timestamp(data, offset)
+    tx.transaction_id, offset = read_digest(data, offset)
+    tx.signature, offset = read_digest(data, offset)
+    tx.hash, offset = read_digest(data, offset)
+    tx.nonce = None  # v1/v2: transactions had no nonce
+    if version >= 3:
+        nonce, offset = read_varint(data, offset)
+        tx.nonce = nonce - 1 if nonce else None
+    return tx, offset
+
+def write_header(out, header):
+    write_varint(out, header["index"])
+    write_timestamp(out, header["timestamp"])
+    write_digest(out, header["previous_hash"])
+    write_digest(out, header["merkle_root"])
+    write_varint(out, header["nonce"])
+    write_digest(out, header["hash"])
+    write_varint(out, header["transaction_count"])
+
+def read_header(data, offset, version=CODEC_VERSION):
+    if version < MIN_BLOCK_VERSION:
+        raise CodecError(f"v{version} headers and blocks predate Merkle roots and cannot be validated")
+    header = {}
+    header["index"], offset = read_varint(data, offset)
+    header["timestamp"], offset = read_timestamp(data, offset)
+    header["previous_hash"], offset = read_digest(data, offset)
+    header["merkle_root"], offset = read_digest(data, offset)
+    header["nonce"], offset = read_varint(data, offset)
+    header["hash"], offset = read_digest(data, offset)
+    header["transaction_count"], offset = read_varint(data, offset)
+    return header, offset
+
+def block_header(block):
+    """Like EnhancedBlock.header() but keeps the timestamp object"""
+    header = block.header()
+    header["timestamp"] = block.timestamp
+    return header
+
+def write_address_filter(out, address_filter):
+    if address_filter is None:
+        out.append(0)
+        return
+    out.append(1)
+    write_varint(out, address_filter.capacity)
+    out += DOUBLE.pack(address_filter.fp_rate)
+    write_varint(out, address_filter.count)
+    write_bytes(out, address_filter.bits)
+
+def read_address_filter(data, offset):
+    present = data[offset]
+    offset += 1
+    if not present:
+        return None, offset
+    capacity, offset = read_varint(data, offset)
+    fp_rate = DOUBLE.unpack_from(data, offset)[0]
+    count, offset = read_varint(data, offset + 8)
+    bits, offset = read_bytes(data, offset)
+    address_filter = BloomFilter(capacity, fp_rate)
+    if len(bits) != len(address_filter.bits):
+        raise CodecError("Address filter size does not match its parameters")
+    address_filter.bits = bytearray(bits)
+    address_filter.count = count
+    return address_filter, offset
+
+def write_block(out, block):
+    write_header(out, block_header(block))
+    out.append(1 if block.pruned else 0)
+    for tx in block.transactions:
+        write_transaction(out, tx)
+    write_address_filter(out, block.address_filter)
+
+def read_block(data, offset, version=CODEC_VERSION):
+    header, offset = read_header(data, offset, version)
+    pruned = bool(data[offset])
+    offset += 1
+    transactions = []
+    for _ in range(0 if pruned else header["transaction_count"]):
+        tx, offset = read_transaction(data, offset, version)
+        transactions.append(tx)
+
+    block = EnhancedBlock.__new__(EnhancedBlock)
+    block.index = header["index"]
+    block.timestamp = header["timestamp"]
+    block.transactions = transactions
+    block.previous_hash = header["previous_hash"]
+    block.merkle_root = header["merkle_root"]
+    block.nonce = header["nonce"]
+    block.hash = header["hash"]
+    block.pruned = pruned
+    block.pruned_transaction_count = header["transaction_count"] if pruned else 0
+    block.address_filter, offset = read_address_filter(data, offset)
+    return block, offset
+
+#-----------------------------------------------------------------------------
+# Generic values (network messages): dicts, lists and the objects above
+#-----------------------------------------------------------------------------
+VALUE_NONE, VALUE_FALSE, VALUE_TRUE = 0, 1, 2
+VALUE_INT, VALUE_FLOAT, VALUE_TEXT, VALUE_BYTES = 3, 4, 5, 6
+VALUE_LIST, VALUE_DICT, VALUE_TRANSACTION, VALUE_BLOCK, VALUE_TIMESTAMP = 7, 8, 9, 10, 11
+
+def write_value(out, value):
+    if value is None:
+        out.append(VALUE_NONE)
+    elif value is True or value is False:
+        out.append(VALUE_TRUE if value else VALUE_FALSE)
+    elif isinstance(value, int):
+        out.append(VALUE_INT)
+        write_signed(out, value)
+    elif isinstance(value, float):
+        out.append(VALUE_FLOAT)
+        out += DOUBLE.pack(value)
+    elif isinstance(value, str):
+        out.append(VALUE_TEXT)
+        write_text(out, value)
+    elif isinstance(value, (bytes, bytearray)):
+        out.append(VALUE_BYTES)
+        write_bytes(out, value)
+    elif isinstance(value, (list, tuple)):
+        out.append(VALUE_LIST)
+        write_varint(out, len(value))
+        for item in value:
+            write_value(out, item)
+    elif isinstance(value, dict):
+        out.append(VALUE_DICT)
+        write_varint(out, len(value))
+        for key, item in value.items():
+            write_text(out, key)
+            write_value(out, item)
+    elif isinstance(value, Transaction):
+        out.append(VALUE_TRANSACTION)
+        write_transaction(out, value)
+    elif isinstance(value, EnhancedBlock):
+        out.append(VALUE_BLOCK)
+        write_block(out, value)
+    elif isinstance(value, datetime):
+        out.append(VALUE_TIMESTAMP)
+        write_timestamp(out, value)
+    else:
+        raise CodecError(f"Cannot encode {type(value).__name__}")
+
+def read_value(data, offset, version=CODEC_VERSION):
+    tag = data[offset]
+    offset += 1
+    if tag == VALUE_NONE:
+        return None, offset
+    if tag == VALUE_FALSE:
+        return False, offset
+    if tag == VALUE_TRUE:
+        return True, offset
+    if tag == VALUE_INT:
+        return read_signed(data, offset)
+    if tag == VALUE_FLOAT:
+        return DOUBLE.unpack_from(data, offset)[0], offset + 8
+    if tag == VALUE_TEXT:
+        return read_text(data, offset)
+    if tag == VALUE_BYTES:
+        return read_bytes(data, offset)
+    if tag == VALUE_LIST:
+        length, offset = read_varint(data, offset)
+        items = []
+        for _ in range(length):
+            item, offset = read_value(data, offset, version)
+            items.append(item)
+        return items, offset
+    if tag == VALUE_DICT:
+        length, offset = read_varint(data, offset)
+        result = {}
+        for _ in range(length):
+            key, offset = read_text(data, offset)
+            result[key], offset = read_value(data, offset, version)
+        return result, offset
+    if tag == VALUE_TRANSACTION:
+        return read_transaction(data, offset, version)
+    if tag == VALUE_BLOCK:
+        return read_block(data, offset, version)
+    if tag == VALUE_TIMESTAMP:
+        return read_timestamp(data, offset)
+    raise CodecError(f"Unknown value tag {tag}")
+
+#-----------------------------------------------------------------------------
+# Public API: versioned top-level records
+#-----------------------------------------------------------------------------
+WRITERS = {
+    KIND_TRANSACTION: write_transaction,
+    KIND_BLOCK: write_block,
+    KIND_HEADER: write_header,
+    KIND_VALUE: write_value,
+}
+READERS = {
+    KIND_TRANSACTION: read_transaction,
+    KIND_BLOCK: read_block,
+    KIND_HEADER: read_header,
+    KIND_VALUE: read_value,
+}
+
+def _encode(kind, value):
+    out = bytearray((CODEC_VERSION, kind))
+    WRITERS[kind](out, value)
+    return bytes(out)
+
+def _decode(kind, data):
+    if len(data) < 2:
+        raise CodecError("Record too short")
+    version = data[0]
+    if not 1 <= version <= CODEC_VERSION:
+        raise CodecError(f"Unsupported codec version {version}")
+    if data[1] != kind:
+        raise CodecError(f"Expected record kind {kind}, got {data[1]}")
+    try:
+        value, offset = READERS[kind](data, 2, version)
+    except (IndexError, struct.error, UnicodeDecodeError) as error:
+        raise CodecError(f"Corrupt record: {error}") from None
+    if offset != len(data):
+        raise CodecError("Trailing bytes after record")
+    return value
+
+def encode_transaction(tx):
+    return _encode(KIND_TRANSACTION, tx)
+
+def decode_transaction(data):
+    return _decode(KIND_TRANSACTION, data)
+
+def encode_block(block):
+    return _encode(KIND_BLOCK, block)
+
+def decode_block(data):
+    return _decode(KIND_BLOCK, data)
+
+def encode_header(block):
+    return _encode(KIND_HEADER, block_header(block))
+
+def decode_header(data):
+    return _decode(KIND_HEADER, data)
+
+def encode_value(value):
+    return _encode(KIND_VALUE, value)
+
+def decode_value(data):
+    return _decode(KIND_VALUE, data)
@@ -0,0 +1,144 @@
+import sys
+from collections import OrderedDict
+from collections.abc import Sequence
+
+# LRU cache of decoded blocks in front of a BlockStore
+# LazyChain looks like the usual `chain` list to the blockchain classes, but
+# only the blocks that are actually used live in memory.
+
+def estimate_block_size(block):
+    """Rough in-memory footprint of a decoded block in bytes"""
+    size = sys.getsizeof(block) + sys.getsizeof(block.__dict__) + sys.getsizeof(block.transactions)
+    for tx in block.transactions:
+        size += sys.getsizeof(tx) + sys.getsizeof(tx.__dict__)
+        size += sum(sys.getsizeof(value) for value in tx.__dict__.values())
+    if block.address_filter is not None:
+        size += sys.getsizeof(block.address_filter.bits)
+    return size
+
+
+class BlockCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024, max_entries=None):
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self.entries = OrderedDict()  # Height -> (block, estimated size), oldest first
+        self.heights_by_hash = {}
+        self.current_bytes = 0
+        self.stats = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def get(self, height):
+        entry = self.entries.get(height)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        self.entries.move_to_end(height)
+        self.stats["hits"] += 1
+        return entry[0]
+
+    def get_by_hash(self, block_hash):
+        height = self.heights_by_hash.get(block_hash)
+        if height is None:
+            self.stats["misses"] += 1
+            return None
+        return self.get(height)
+
+    def put(self, block):
+        """Insert a block, evicting least recently used ones beyond the limits"""
+        size = estimate_block_size(block)
+        if size > self.max_bytes:
+            return
+        self.discard(block.index)
+        self.entries[block.index] = (block, size)
+        self.heights_by_hash[block.hash] = block.index
+        self.current_bytes += size
+
+        while self.current_bytes > self.max_bytes or \
+                (self.max_entries is not None and len(self.entries) > self.max_entries):
+            height, (evicted, evicted_size) = self.entries.popitem(last=False)
+            self.heights_by_hash.pop(evicted.hash, None)
+            self.current_bytes -= evicted_size
+            self.stats["evictions"] += 1
+
+    def discard(self, height):
+        entry = self.entries.pop(height, None)
+        if entry is not None:
+            self.heights_by_hash.pop(entry[0].hash, None)
+            self.current_bytes -= entry[1]
+
+    def invalidate_from(self, height):
+        """Drop every cached block at or above a height (after a reorg)"""
+        for cached_height in [h for h in self.entries if h >= height]:
+            self.discard(cached_height)
+            self.stats["invalidations"] += 1
+
+    def hit_rate(self):
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return self.stats["hits"] / lookups if lookups else 0.0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __repr__(self):
+        return (f"BlockCache({len(self.entries)} blocks, {self.current_bytes / 1024:.0f}/"
+                f"{self.max_bytes / 1024:.0f} KiB, hit rate {self.hit_rate():.1%})")
+
+
+class LazyChain(Sequence):
+    """
+    Sequence of blocks backed by a BlockStore with a BlockCache in front.
+
+    Supports what the chain classes do with their `chain` list: indexing
+    (including negative indexes and slices), len(), iteration, append() and
+    pop(). Full iterations use cached blocks but do not fill the cache, so a
+    chain scan does not evict the hot recent blocks.
+    """
+
+    def __init__(self, store, cache=None):
+        self.store = store
+        self.cache = cache if cache is not None else BlockCache()
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("chain index out of range")
+
+        block = self.cache.get(index)
+        if block is None:
+            block = self.store.get_block(index)
+            self.cache.put(block)
+        return block
+
+    def get_by_hash(self, block_hash):
+        block = self.cache.get_by_hash(block_hash)
+        if block is None:
+            height = self.store.heights_by_hash.get(block_hash)
+            if height is None:
+                return None
+            block = self[height]
+        return block
+
+    def __iter__(self):
+        for height in range(len(self)):
+            block = self.cache.entries.get(height)
+            yield block[0] if block is not None else self.store.get_block(height)
+
+    def append(self, block):
+        self.store.append(block)
+        self.cache.put(block)
+
+    def pop(self):
+        """Remove the tip block (used when disconnecting it in a reorg)"""
+        block = self[-1]
+        height = len(self) - 1
+        self.store.truncate(height)
+        self.cache.invalidate_from(height)
+        return block
+
+    def __repr__(self):
+        return f"LazyChain({len(self)} blocks, {self.cache})"
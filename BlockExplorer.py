@@ -0,0 +1,374 @@
+import asyncio
+import json
+import sys
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs
+
+# Read-only block explorer over HTTP
+# A small asyncio HTTP/1.1 server (keep-alive, GET/HEAD only) exposing a
+# CryptocurrencyBlockchain as JSON:
+#   GET /stats                    chain statistics
+#   GET /block/<height or hash>   block with transactions
+#   GET /tx/<transaction id>      transaction and the block that confirmed it
+#   GET /address/<address>        balance and recent history (?limit=N)
+#
+# Blocks buried under `immutable_depth` confirmations never change, so their
+# responses are cached for good and served with an ETag (If-None-Match gets a
+# 304). Everything that depends on the tip is cached for `tip_ttl` seconds.
+
+HTTP_REASONS = {200: "OK", 304: "Not Modified", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed"}
+
+
+class ResponseCache:
+    """Immutable entries in a bounded LRU plus a short-TTL map for tip data"""
+
+    def __init__(self, max_immutable=10000, tip_ttl=1.0):
+        self.immutable = OrderedDict()  # Path -> (etag, body)
+        self.max_immutable = max_immutable
+        self.tip_ttl = tip_ttl
+        self.tip = {}  # Path -> (expires at, body)
+        self.stats = {"immutable_hits": 0, "tip_hits": 0, "misses": 0, "not_modified": 0}
+
+    def get_immutable(self, path):
+        entry = self.immutable.get(path)
+        if entry is not None:
+            self.immutable.move_to_end(path)
+            self.stats["immutable_hits"] += 1
+        return entry
+
+    def put_immutable(self, path, etag, body):
+        self.immutable[path] = (etag, body)
+        if len(self.immutable) > self.max_immutable:
+            self.immutable.popitem(last=False)
+
+    def get_tip(self, path, now):
+        entry = self.tip.get(path)
+        if entry is not None and entry[0] > now:
+            self.stats["tip_hits"] += 1
+            return entry[1]
+        return None
+
+    def put_tip(self, path, body, now):
+        if len(self.tip) > self.max_immutable:  # Drop expired entries once in a while
+            self.tip = {key: entry for key, entry in self.tip.items() if entry[0] > now}
+        self.tip[path] = (now + self.tip_ttl, body)
+
+    def clear(self):
+        self.immutable.clear()
+        self.tip.clear()
+
+
+class BlockExplorer:
+    def __init__(self, blockchain, host="127.0.0.1", port=8080, immutable_depth=6, tip_ttl=1.0,
+                 history_limit=100):
+        self.blockchain = blockchain
+        self.host = host
+        self.port = port
+        self.immutable_depth = immutable_depth
+        self.history_limit = history_limit
+        self.cache = ResponseCache(tip_ttl=tip_ttl)
+        self.transaction_index = {}  # Transaction ID -> block height
+        self.block_heights = {}  # Block hash -> height
+        self._indexed_height = -1
+        self._indexed_hash = None
+        self.requests_served = 0
+        self._server = None
+        self._loop = None
+        self._thread = None
+        self._connections = set()  # Connection handler tasks
+
+    #-------------------------------------------------------------------------
+    # Indexes (kept in step with the chain on every request)
+    #-------------------------------------------------------------------------
+    def sync(self):
+        """Index blocks added since the last request; start over after a reorg"""
+        chain = self.blockchain.chain
+        if self._indexed_height >= len(chain) or \
+                (self._indexed_height >= 0 and chain[self._indexed_height].hash != self._indexed_hash):
+            self.transaction_index = {}
+            self.block_heights = {}
+            self._indexed_height = -1
+            self.cache.clear()
+
+        for height in range(self._indexed_height + 1, len(chain)):
+            block = chain[height]
+            self.block_heights[block.hash] = height
+            for tx in block.transactions:
+                self.transaction_index[tx.transaction_id] = height
+        if len(chain) > 0:
+            self._indexed_height = len(chain) - 1
+            self._indexed_hash = chain[-1].hash
+
+    def is_immutable(self, height):
+        return self._indexed_height - height >= self.immutable_depth
+
+    #-------------------------------------------------------------------------
+    # Endpoints: return (status, payload, ETag key if immutable else None)
+    #-------------------------------------------------------------------------
+    def get_stats(self, query):
+        blockchain = self.blockchain
+        tip = blockchain.get_latest_block()
+        return 200, {
+            "height": tip.index,
+            "tip_hash": tip.hash,
+            "genesis_hash": blockchain.chain[0].hash,
+            "difficulty": blockchain.difficulty,
+            "pending_transactions": len(blockchain.pending_transactions),
+            "indexed_transactions": len(self.transaction_index),
+            "addresses": len(blockchain.balances),
+            "pruned_height": blockchain.pruned_height
+        }, None
+
+    def get_block(self, query, key):
+        height = self.block_heights.get(key)
+        if height is None and key.isdigit():
+            height = int(key)
+        if height is None or not 0 <= height < len(self.blockchain.chain):
+            return 404, {"error": f"Block {key} not found"}, None
+        block = self.blockchain.chain[height]
+        payload = block.to_dict()
+        payload["confirmations"] = self._indexed_height - height + 1
+        if self.is_immutable(height):
+            payload.pop("confirmations")  # Keeps the cached body stable
+            return 200, payload, block.hash
+        return 200, payload, None
+
+    def get_transaction(self, query, transaction_id):
+        height = self.transaction_index.get(transaction_id)
+        if height is None:
+            for tx in self.blockchain.pending_transactions:
+                if tx.transaction_id == transaction_id:
+                    return 200, {"transaction": tx.to_dict(), "status": "pending"}, None
+            return 404, {"error": f"Transaction {transaction_id} not found"}, None
+
+        block = self.blockchain.chain[height]
+        if block.pruned:
+            return 404, {"error": f"Transaction {transaction_id} was in pruned block #{height}"}, None
+        tx = next(tx for tx in block.transactions if tx.transaction_id == transaction_id)
+        payload = {"transaction": tx.to_dict(), "status": "confirmed", "block_height": height,
+                   "block_hash": block.hash}
+        return 200, payload, (block.hash + transaction_id if self.is_immutable(height) else None)
+
+    def get_address(self, query, address):
+        limit = int(query.get("limit", [self.history_limit])[0])
+        history = self.blockchain.get_transaction_history(address)
+        payload = {
+            "address": address,
+            "balance": self.blockchain.get_balance(address),
+            "transaction_count": len(history),
+            "history": [{"block_height": height, "transaction": tx.to_dict()}
+                        for height, tx in history[-limit:]] if limit > 0 else []
+        }
+        if hasattr(self.blockchain, "get_spendable_balance"):
+            payload["spendable_balance"] = self.blockchain.get_spendable_balance(address)
+        return 200, payload, None
+
+    def route(self, path, query):
+        parts = [part for part in path.split("/") if part]
+        if parts == ["stats"]:
+            return self.get_stats(query)
+        if len(parts) == 2 and parts[0] == "block":
+            return self.get_block(query, parts[1])
+        if len(parts) == 2 and parts[0] == "tx":
+            return self.get_transaction(query, parts[1])
+        if len(parts) == 2 and parts[0] == "address":
+            return self.get_address(query, parts[1])
+        return 404, {"error": f"Unknown endpoint {path}"}, None
+
+    def handle(self, target, if_none_match=None):
+        """(status, extra headers, body bytes) for a GET of `target`, using the caches"""
+        self.requests_served += 1
+        self.sync()
+        now = time.monotonic()
+        cache = self.cache
+
+        entry = cache.get_immutable(target)
+        if entry is not None:
+            etag, body = entry
+            if if_none_match == etag:
+                cache.stats["not_modified"] += 1
+                return 304, self._immutable_headers(etag), b""
+            return 200, self._immutable_headers(etag), body
+
+        body = cache.get_tip(target, now)
+        if body is not None:
+            return 200, self._tip_headers(), body
+
+        cache.stats["misses"] += 1
+        url = urlsplit(target)
+        try:
+            status, payload, immutable_key = self.route(url.path, parse_qs(url.query))
+        except ValueError as error:
+            status, payload, immutable_key = 400, {"error": str(error)}, None
+        body = json.dumps(payload).encode()
+        if status != 200:
+            return status, self._tip_headers(), body
+        if immutable_key is not None:
+            etag = f'"{immutable_key}"'
+            cache.put_immutable(target, etag, body)
+            if if_none_match == etag:
+                cache.stats["not_modified"] += 1
+                return 304, self._immutable_headers(etag), b""
+            return 200, self._immutable_headers(etag), body
+        cache.put_tip(target, body, now)
+        return 200, self._tip_headers(), body
+
+    def _immutable_headers(self, etag):
+        return {"ETag": etag, "Cache-Control": "public, max-age=31536000, immutable"}
+
+    def _tip_headers(self):
+        return {"Cache-Control": f"public, max-age={max(1, int(self.cache.tip_ttl))}"}
+
+    #-------------------------------------------------------------------------
+    # HTTP server
+    #-------------------------------------------------------------------------
+    async def _serve_connection(self, reader, writer):
+        self._connections.add(asyncio.current_task())
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                try:
+                    method, target, version = lines[0].split(" ", 2)
+                except ValueError:
+                    writer.write(self._response(400, {}, b'{"error": "Malformed request line"}', True))
+                    break
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+                close = headers.get("connection", "").lower() == "close" or version == "HTTP/1.0"
+
+                if method not in ("GET", "HEAD"):
+                    status, extra, body = 405, {"Allow": "GET, HEAD"}, b'{"error": "Read-only service"}'
+                else:
+                    status, extra, body = self.handle(target, headers.get("if-none-match"))
+                writer.write(self._response(status, extra, body, close, head_only=method == "HEAD"))
+                await writer.drain()
+                if close:
+                    break
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._connections.discard(asyncio.current_task())
+            writer.close()
+
+    def _response(self, status, extra_headers, body, close, head_only=False):
+        headers = [f"HTTP/1.1 {status} {HTTP_REASONS.get(status, '')}",
+                   "Content-Type: application/json",
+                   f"Content-Length: {len(body)}",
+                   f"Connection: {'close' if close else 'keep-alive'}"]
+        headers.extend(f"{name}: {value}" for name, value in extra_headers.items())
+        data = ("\r\n".join(headers) + "\r\n\r\n").encode("latin-1")
+        return data if head_only else data + body
+
+    def start(self):
+        """Run the server on a background thread (returns once it is listening)"""
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._serve_connection, self.host, self.port))
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait()
+        print(f"🔎 Block explorer on http://{self.host}:{self.port}")
+        return self
+
+    async def _shutdown(self):
+        self._server.close()
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self._server.wait_closed()
+
+    def stop(self):
+        """Close the listener and any keep-alive connections, then stop the thread"""
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop.close()
+        self._loop = None
+
+#=============================================================================
+# Local load generator
+#=============================================================================
+async def _load_client(host, port, paths, deadline, counts, use_etags):
+    reader, writer = await asyncio.open_connection(host, port)
+    etags = {}
+    i = 0
+    try:
+        while time.monotonic() < deadline:
+            path = paths[i % len(paths)]
+            i += 1
+            request = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+            if use_etags and path in etags:
+                request += f"If-None-Match: {etags[path]}\r\n"
+            writer.write((request + "\r\n").encode())
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            status = int(head[9:12])
+            for line in head.decode("latin-1").split("\r\n")[1:]:
+                name, _, value = line.partition(":")
+                name = name.lower()
+                if name == "content-length":
+                    length = int(value)
+                elif name == "etag":
+                    etags[path] = value.strip()
+            if length:
+                await reader.readexactly(length)
+            counts[status] = counts.get(status, 0) + 1
+    finally:
+        writer.close()
+
+def run_load(host, port, paths, connections=32, duration=3.0, use_etags=True):
+    """Hammer the explorer over keep-alive connections; returns (requests/s, status counts)"""
+    async def main():
+        counts = {}
+        deadline = time.monotonic() + duration
+        await asyncio.gather(*(_load_client(host, port, paths[i:] + paths[:i], deadline, counts, use_etags)
+                               for i in range(connections)))
+        return counts
+
+    start_time = time.perf_counter()
+    counts = asyncio.run(main())
+    elapsed = time.perf_counter() - start_time
+    return sum(counts.values()) / elapsed, counts
+
+#=============================================================================
+# DEMONSTRATION: Explorer under local load
+#=============================================================================
+def demonstrate_block_explorer(duration=3.0):
+    from ChainBenchmarks import build_benchmark_chain
+
+    print("🚀 Block Explorer Demo")
+    print("=" * 60)
+    blockchain, addresses = build_benchmark_chain(num_blocks=300, txs_per_block=20, num_addresses=500)
+    explorer = BlockExplorer(blockchain, port=0).start()
+
+    sample_tx = blockchain.chain[10].transactions[0].transaction_id
+    paths = ["/stats", f"/block/{len(blockchain.chain) - 1}", f"/tx/{sample_tx}", f"/block/{blockchain.chain[5].hash}"]
+    paths += [f"/block/{height}" for height in range(0, 300, 7)]
+    paths += [f"/address/{address}?limit=10" for address in addresses[:20]]
+
+    requests_per_second, counts = run_load(explorer.host, explorer.port, paths, duration=duration)
+    print(f"📈 {requests_per_second:,.0f} requests/s over {sum(counts.values()):,} requests, statuses {counts}")
+    print(f"   Cache: {explorer.cache.stats}")
+    explorer.stop()
+
+if __name__ == "__main__":
+    demonstrate_block_explorer(float(sys.argv[1]) if len(sys.argv) > 1 else 3.0)
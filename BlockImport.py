@@ -0,0 +1,353 @@
+import collections
+import contextlib
+import functools
+import io
+import os
+import queue
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from BinaryCodec import decode_block, encode_block
+from BlockStore import BlockStore
+
+# Pipelined block import
+# Blocks flow through five stages connected by bounded queues:
+#   decode  -> codec bytes to EnhancedBlock
+#   header  -> block hash and proof of work
+#   verify  -> transaction IDs, hashes and signatures, Merkle root
+#   state   -> linkage, duplicates and funds/nonces, then connect (serial)
+#   persist -> append to a BlockStore (optional)
+# A full queue stalls the stage that feeds it (backpressure), so memory stays
+# bounded however fast the source is. decode, header and verify are pure and
+# can each run on their own thread or process pool; results are collected in
+# block order. Per-stage utilization shows where the bottleneck is.
+
+_DONE = object()  # End-of-stream marker passed down the pipeline
+
+
+class BlockImportError(Exception):
+    pass
+
+
+def check_header(block, difficulty):
+    """Problem with a block's own header, or None (linkage is checked by the state stage)"""
+    if block.hash != block.calculate_hash():
+        return "hash does not match header"
+    if not block.hash.startswith("0" * difficulty):
+        return "insufficient proof of work"
+    return None
+
+def check_transactions(block):
+    """Problem with a block's transactions taken on their own, or None"""
+    if block.pruned:
+        return "pruned block (no transactions to validate)"
+    for tx in block.transactions:
+        if not tx.is_valid():
+            return f"invalid transaction {tx}"
+    if not block.has_valid_merkle_root():
+        return "transactions do not match the Merkle root"
+    return None
+
+def _timed(function, item):
+    """Run a stage function, returning (seconds, result); runs in pool workers"""
+    start_time = time.perf_counter()
+    result = function(item)
+    return time.perf_counter() - start_time, result
+
+
+class Stage:
+    """
+    One pipeline step. A "map" stage replaces each item with function(item);
+    a "check" stage passes items on unchanged unless function(item) returns a
+    problem. workers=0 runs the function on the stage's own thread.
+    """
+
+    def __init__(self, name, function, kind="check", workers=0, use_processes=False):
+        self.name = name
+        self.function = function
+        self.kind = kind
+        self.workers = workers
+        self.use_processes = use_processes
+        self.position = 0  # Index in the pipeline
+        self.stats = {"items": 0, "busy_seconds": 0.0, "starved_seconds": 0.0, "blocked_seconds": 0.0}
+
+    def capacity(self):
+        return max(1, self.workers)
+
+
+class ImportPipeline:
+    """
+    Imports encoded blocks into a CryptocurrencyBlockchain through concurrent stages.
+
+    `store` (optional) receives every connected block; leave it out when the
+    blockchain is itself store-backed, as connecting already writes the block.
+    `workers` and `use_processes` map stage names to pool sizes / pool kinds.
+    """
+
+    def __init__(self, blockchain, store=None, queue_size=16, workers=None, use_processes=None):
+        self.blockchain = blockchain
+        self.store = store
+        self.queue_size = queue_size
+        workers = workers or {}
+        use_processes = use_processes or {}
+        self.stages = [Stage("read", None, "map")]  # The source, run by the feeder thread
+        for name, function, kind in (
+                ("decode", decode_block, "map"),
+                ("header", functools.partial(check_header, difficulty=blockchain.difficulty), "check"),
+                ("verify", check_transactions, "check")):
+            self.stages.append(Stage(name, function, kind, workers.get(name, 0), use_processes.get(name, False)))
+        self.stages.append(Stage("state", self._apply, "check"))
+        if store is not None:
+            self.stages.append(Stage("persist", self._persist, "check"))
+        for position, stage in enumerate(self.stages):
+            stage.position = position
+        self.error = None  # (block index or None, stage name, problem) of the first failing block
+        self._failed_position = -1  # Stages up to here discard their input after a failure
+
+    #-------------------------------------------------------------------------
+    # Serial stages
+    #-------------------------------------------------------------------------
+    def _apply(self, block):
+        blockchain = self.blockchain
+        tip = blockchain.get_latest_block()
+        if block.index != tip.index + 1 or block.previous_hash != tip.hash:
+            return "does not extend the chain tip"
+        problem = blockchain.check_duplicates(block) or blockchain.check_block_state(block)
+        if problem:
+            return problem
+        block.build_address_filter(blockchain.address_filter_fp_rate)
+        blockchain.connect_block(block)
+        blockchain.remove_confirmed_transactions(block)
+        return None
+
+    def _persist(self, block):
+        self.store.append(block)
+        return None
+
+    #-------------------------------------------------------------------------
+    # Plumbing
+    #-------------------------------------------------------------------------
+    def _fail(self, block, stage, problem):
+        # A failure further down the line concerns an earlier block, so it wins
+        if self.error is None or stage.position > self._failed_position:
+            self.error = (getattr(block, "index", None), stage.name, problem)
+            self._failed_position = stage.position
+
+    def _discarding(self, stage):
+        """After a failure, stages up to the failing one drop work; later ones finish the good prefix"""
+        return stage.position <= self._failed_position
+
+    def _put(self, stage, output, item):
+        start_time = time.perf_counter()
+        output.put(item)
+        stage.stats["blocked_seconds"] += time.perf_counter() - start_time
+
+    def _feed(self, stage, source, output):
+        """Pull items from the source iterator (its time counts as the read stage)"""
+        iterator = iter(source)
+        try:
+            while self.error is None:
+                start_time = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                stage.stats["busy_seconds"] += time.perf_counter() - start_time
+                stage.stats["items"] += 1
+                self._put(stage, output, item)
+        except Exception as error:
+            self._fail(None, stage, f"source failed: {error}")
+        finally:
+            output.put(_DONE)
+
+    def _finish_item(self, stage, item, result, output):
+        if stage.kind == "map":
+            self._put(stage, output, result)
+        elif result:
+            self._fail(item, stage, result)
+        else:
+            self._put(stage, output, item)
+
+    def _run_stage(self, stage, source, output, pool):
+        """Consume `source` until _DONE; after a failure keep draining so upstream never blocks"""
+        in_flight = collections.deque()  # (item, future) in block order
+        window = stage.capacity() * 2
+        while True:
+            start_time = time.perf_counter()
+            item = source.get()
+            stage.stats["starved_seconds"] += time.perf_counter() - start_time
+            if item is _DONE:
+                break
+            if self._discarding(stage):
+                continue
+
+            if pool is None:
+                try:
+                    elapsed, result = _timed(stage.function, item)
+                except Exception as error:  # A dead stage thread would stall the pipeline
+                    self._fail(item, stage, f"{type(error).__name__}: {error}")
+                    continue
+                stage.stats["busy_seconds"] += elapsed
+                stage.stats["items"] += 1
+                self._finish_item(stage, item, result, output)
+                continue
+
+            in_flight.append((item, pool.submit(_timed, stage.function, item)))
+            while len(in_flight) >= window or (in_flight and in_flight[0][1].done()):
+                self._collect(stage, in_flight.popleft(), output)
+
+        while in_flight:
+            self._collect(stage, in_flight.popleft(), output)
+        output.put(_DONE)
+
+    def _collect(self, stage, entry, output):
+        item, future = entry
+        try:
+            elapsed, result = future.result()
+        except Exception as error:
+            self._fail(item, stage, f"{type(error).__name__}: {error}")
+            return
+        stage.stats["busy_seconds"] += elapsed
+        stage.stats["items"] += 1
+        if not self._discarding(stage):
+            self._finish_item(stage, item, result, output)
+
+    def run(self, source):
+        """
+        Import every item of `source` (codec bytes of consecutive blocks, e.g.
+        payloads_from_store()). Returns a report; on the first invalid block the
+        blocks before it are still imported, then BlockImportError is raised.
+        """
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        sink = queue.Queue()  # Unbounded: the end of the line only carries _DONE
+        pools = {}
+        for stage in self.stages:
+            if stage.workers > 0:
+                pool_class = ProcessPoolExecutor if stage.use_processes else ThreadPoolExecutor
+                pools[stage.name] = pool_class(max_workers=stage.workers)
+
+        start_height = len(self.blockchain.chain)
+        start_time = time.perf_counter()
+        threads = [threading.Thread(target=self._feed, args=(self.stages[0], source, queues[0]), daemon=True)]
+        for position, stage in enumerate(self.stages[1:], start=1):
+            output = queues[position] if position < len(self.stages) - 1 else sink
+            threads.append(threading.Thread(target=self._run_stage, daemon=True,
+                                            args=(stage, queues[position - 1], output, pools.get(stage.name))))
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - start_time
+        for pool in pools.values():
+            pool.shutdown()
+        if self.store is not None:
+            self.store.flush()
+
+        report = self.report(elapsed, len(self.blockchain.chain) - start_height)
+        if self.error is not None:
+            index, stage_name, problem = self.error
+            raise BlockImportError(f"Block #{index} failed at {stage_name}: {problem} "
+                                   f"({report['blocks']} blocks imported)")
+        return report
+
+    def report(self, elapsed, blocks):
+        stages = {}
+        for stage in self.stages:
+            stages[stage.name] = {
+                "workers": stage.workers,
+                "utilization": stage.stats["busy_seconds"] / (elapsed * stage.capacity()) if elapsed else 0.0,
+                **stage.stats
+            }
+        bottleneck = max(stages, key=lambda name: stages[name]["utilization"]) if stages else None
+        return {"blocks": blocks, "seconds": elapsed, "blocks_per_second": blocks / elapsed if elapsed else 0.0,
+                "bottleneck": bottleneck, "stages": stages}
+
+
+def payloads_from_store(store, start=0):
+    """Codec bytes of every stored block from a height on (the reindex source)"""
+    for height in range(start, len(store)):
+        yield store.read_payload(height)
+
+def print_import_report(report):
+    print(f"   {report['blocks']} blocks in {report['seconds']:.2f}s ({report['blocks_per_second']:.0f} blocks/s), "
+          f"bottleneck: {report['bottleneck']}")
+    for name, stage in report["stages"].items():
+        pool = f"{stage['workers']} workers" if stage["workers"] else "inline"
+        print(f"      {name:<8} {pool:<10} busy {stage['utilization'] * 100:5.1f}%  "
+              f"starved {stage['starved_seconds']:6.2f}s  blocked {stage['blocked_seconds']:6.2f}s")
+
+#=============================================================================
+# DEMONSTRATION: reindex a synthetic chain from disk
+#=============================================================================
+def demonstrate_block_import(num_blocks=300, txs_per_block=200):
+    from Day4_TransactionSystem import CryptocurrencyBlockchain
+    from SyntheticWorkload import WorkloadConfig, generate_chain
+
+    print("🚀 Pipelined Block Import Demo")
+    print("=" * 60)
+    source, _ = generate_chain(WorkloadConfig(num_wallets=2000), num_blocks, txs_per_block)
+    cores = os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = BlockStore(os.path.join(directory, "source"))
+        store.extend(source.chain)
+        store.flush()
+        print(f"💾 Stored {len(store)} blocks ({store.disk_usage() / 2**20:.1f} MB), {cores} CPU cores")
+
+        def fresh_node():
+            node = CryptocurrencyBlockchain()
+            node.difficulty = 0
+            node.chain = [source.chain[0]]
+            with contextlib.redirect_stdout(io.StringIO()):
+                node.connect_block(source.chain[1])  # Premine, part of the genesis state
+            return node
+
+        # Baseline: decode everything, the serial sync path, then write the new store
+        node = fresh_node()
+        target = BlockStore(os.path.join(directory, "serial"))
+        target.extend(node.chain)
+        start_time = time.perf_counter()
+        blocks = [decode_block(payload) for payload in payloads_from_store(store, start=2)]
+        with contextlib.redirect_stdout(io.StringIO()):
+            node.sync_blocks(blocks, full_verification=True)
+        target.extend(blocks)
+        target.flush()
+        print(f"\n🐢 Serial decode + sync + persist: {time.perf_counter() - start_time:.2f}s")
+        target.close()
+
+        configurations = [
+            ("inline stages", {}, {}),
+            ("thread pools", {"decode": 2, "header": 2, "verify": cores + 1}, {}),
+            ("process pool for verify", {"verify": max(2, cores)}, {"verify": True}),
+        ]
+        for number, (label, workers, use_processes) in enumerate(configurations):
+            node = fresh_node()
+            target = BlockStore(os.path.join(directory, f"reindex{number}"))
+            pipeline = ImportPipeline(node, store=target, workers=workers, use_processes=use_processes)
+            target.extend(node.chain)  # Genesis and premine were connected outside the pipeline
+            with contextlib.redirect_stdout(io.StringIO()):
+                report = pipeline.run(payloads_from_store(store, start=2))
+            print(f"\n⚙️  Pipeline, {label}:")
+            print_import_report(report)
+            print(f"      tip matches: {node.get_latest_block().hash == source.get_latest_block().hash}, "
+                  f"reindexed store: {len(target)} blocks")
+            target.close()
+
+        # A corrupted block stops the import right before it
+        payloads = list(payloads_from_store(store, start=2))
+        tampered = decode_block(payloads[10])
+        tampered.transactions[1].amount += 1
+        payloads[10] = encode_block(tampered)
+        node = fresh_node()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                ImportPipeline(node).run(payloads)
+        except BlockImportError as error:
+            print(f"\n🛑 {error}")
+        store.close()
+
+if __name__ == "__main__":
+    demonstrate_block_import(int(sys.argv[1]) if len(sys.argv) > 1 else 300)
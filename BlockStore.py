@@ -0,0 +1,266 @@
+import lzma
+import os
+import struct
+import zlib
+from collections import Counter, deque
+
+from BinaryCodec import encode_block, decode_block
+
+# Append-only block storage with optional per-block compression
+# Blocks are written with the binary codec into one data file. Each record can
+# be stored raw, zlib-compressed, zlib-compressed with a dictionary trained on
+# recent blocks, or lzma-compressed. Reads only decompress the requested block.
+#
+# Record layout: payload length, CRC32, method, dictionary id, 32-byte block hash, payload
+
+RECORD_HEADER = struct.Struct(">IIBH32s")
+
+COMPRESSION_NONE = "none"
+COMPRESSION_ZLIB = "zlib"
+COMPRESSION_ZLIB_DICT = "zlib-dict"
+COMPRESSION_LZMA = "lzma"
+METHOD_IDS = {COMPRESSION_NONE: 0, COMPRESSION_ZLIB: 1, COMPRESSION_ZLIB_DICT: 2, COMPRESSION_LZMA: 3}
+
+MAX_DICTIONARY_SIZE = 32768  # zlib's window size; bytes beyond it are never referenced
+
+class BlockStoreError(Exception):
+    """Raised when the store is corrupt or a lookup cannot be satisfied"""
+
+def train_dictionary(samples, size=MAX_DICTIONARY_SIZE, segment_length=16):
+    """
+    Build a zlib preset dictionary from sample payloads.
+
+    Counts fixed-length segments across samples and keeps the most common
+    ones, most frequent last because zlib reaches recent bytes more cheaply.
+    """
+    counts = Counter()
+    for sample in samples:
+        seen = set()
+        for start in range(0, len(sample) - segment_length + 1, 4):
+            piece = sample[start:start + segment_length]
+            if piece not in seen:
+                seen.add(piece)
+                counts[piece] += 1
+
+    chosen = []
+    total = 0
+    for piece, count in counts.most_common():
+        if count < 2 or total + len(piece) > size:
+            break
+        chosen.append(piece)
+        total += len(piece)
+    return b"".join(reversed(chosen))
+
+
+class BlockStore:
+    def __init__(self, directory, compression=COMPRESSION_ZLIB_DICT, level=6,
+                 training_blocks=64, retrain_interval=1000):
+        if compression not in METHOD_IDS:
+            raise ValueError(f"Unknown compression '{compression}', pick one of {sorted(METHOD_IDS)}")
+        self.directory = directory
+        self.compression = compression
+        self.level = level
+        self.training_blocks = training_blocks  # Recent blocks used to train a dictionary
+        self.retrain_interval = retrain_interval  # Retrain after this many blocks (0 = never)
+        os.makedirs(directory, exist_ok=True)
+
+        self.data_path = os.path.join(directory, "blocks.dat")
+        self.dictionary_path = os.path.join(directory, "dictionaries.dat")
+        self.offsets = []  # Height -> record offset
+        self.heights_by_hash = {}
+        self.dictionaries = {}  # Dictionary id -> bytes
+        self.current_dictionary = 0  # 0 means "no dictionary yet"
+        self.stats = {"raw_bytes": 0, "stored_bytes": 0, "blocks_written": 0, "blocks_read": 0}
+        self._recent_payloads = deque(maxlen=training_blocks)  # Training samples
+
+        self._load_dictionaries()
+        self._scan_records()
+        self._last_trained_height = len(self.offsets) if self.dictionaries else 0
+        self._writer = open(self.data_path, "ab")
+        self._reader = open(self.data_path, "rb")
+
+    def _load_dictionaries(self):
+        """Load the trained dictionaries, dropping a torn final entry"""
+        if not os.path.exists(self.dictionary_path):
+            return
+        with open(self.dictionary_path, "rb") as f:
+            data = f.read()
+        offset = 0
+        while offset + 6 <= len(data):
+            dictionary_id, length = struct.unpack_from(">HI", data, offset)
+            if offset + 6 + length > len(data):
+                break
+            self.dictionaries[dictionary_id] = data[offset + 6:offset + 6 + length]
+            offset += 6 + length
+        if offset != len(data):
+            print(f"⚠️  Block store: discarding {len(data) - offset} bytes of incomplete dictionary data")
+            with open(self.dictionary_path, "r+b") as f:
+                f.truncate(offset)
+        if self.dictionaries:
+            self.current_dictionary = max(self.dictionaries)
+
+    def _scan_records(self):
+        """Rebuild the height and hash indexes, dropping a torn final record"""
+        if not os.path.exists(self.data_path):
+            return
+        size = os.path.getsize(self.data_path)
+        offset = 0
+        with open(self.data_path, "rb") as f:
+            while offset + RECORD_HEADER.size <= size:
+                f.seek(offset)
+                length, _, _, _, block_hash = RECORD_HEADER.unpack(f.read(RECORD_HEADER.size))
+                if offset + RECORD_HEADER.size + length > size:
+                    break
+                self.heights_by_hash[block_hash.hex()] = len(self.offsets)
+                self.offsets.append(offset)
+                offset += RECORD_HEADER.size + length
+        if offset != size:
+            print(f"⚠️  Block store: discarding {size - offset} bytes of incomplete data")
+            with open(self.data_path, "r+b") as f:
+                f.truncate(offset)
+
+    def _save_dictionary(self, dictionary):
+        self.current_dictionary += 1
+        self.dictionaries[self.current_dictionary] = dictionary
+        with open(self.dictionary_path, "ab") as f:
+            f.write(struct.pack(">HI", self.current_dictionary, len(dictionary)) + dictionary)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def train(self):
+        """Train a new dictionary from the most recent blocks"""
+        samples = list(self._recent_payloads)
+        if not samples:
+            start = max(0, len(self.offsets) - self.training_blocks)
+            samples = [self._decompress(*self.read_record(height)) for height in range(start, len(self.offsets))]
+        if not samples:
+            return None
+        dictionary = train_dictionary(samples)
+        if dictionary:
+            self._save_dictionary(dictionary)
+        return dictionary
+
+    def _compress(self, payload):
+        if self.compression == COMPRESSION_NONE:
+            return payload, 0
+        if self.compression == COMPRESSION_ZLIB:
+            return zlib.compress(payload, self.level), 0
+        if self.compression == COMPRESSION_LZMA:
+            return lzma.compress(payload, preset=self.level), 0
+
+        dictionary = self.dictionaries.get(self.current_dictionary)
+        if dictionary is None:
+            return zlib.compress(payload, self.level), 0
+        compressor = zlib.compressobj(self.level, zlib.DEFLATED, 15, 9, zlib.Z_DEFAULT_STRATEGY, zdict=dictionary)
+        return compressor.compress(payload) + compressor.flush(), self.current_dictionary
+
+    def _decompress(self, method, dictionary_id, data):
+        if method == METHOD_IDS[COMPRESSION_NONE]:
+            return data
+        if method == METHOD_IDS[COMPRESSION_LZMA]:
+            return lzma.decompress(data)
+        if dictionary_id:
+            decompressor = zlib.decompressobj(15, zdict=self.dictionaries[dictionary_id])
+            return decompressor.decompress(data) + decompressor.flush()
+        return zlib.decompress(data)
+
+    def append(self, block):
+        """Write a block at the next height"""
+        if block.index != len(self.offsets):
+            raise BlockStoreError(f"Expected block #{len(self.offsets)}, got #{block.index}")
+
+        # Dictionaries are trained once enough blocks exist and refreshed periodically
+        if self.compression == COMPRESSION_ZLIB_DICT:
+            height = len(self.offsets)
+            interval = self.retrain_interval if self.current_dictionary else self.training_blocks
+            if interval and height - self._last_trained_height >= interval:
+                self._last_trained_height = height
+                self.train()
+
+        payload = encode_block(block)
+        stored, dictionary_id = self._compress(payload)
+        record = RECORD_HEADER.pack(len(stored), zlib.crc32(stored), METHOD_IDS[self.compression],
+                                    dictionary_id, bytes.fromhex(block.hash)) + stored
+        self._recent_payloads.append(payload)
+
+        self._writer.seek(0, os.SEEK_END)
+        offset = self._writer.tell()
+        self._writer.write(record)
+        self.offsets.append(offset)
+        self.heights_by_hash[block.hash] = block.index
+
+        self.stats["raw_bytes"] += len(payload)
+        self.stats["stored_bytes"] += len(stored)
+        self.stats["blocks_written"] += 1
+
+    def extend(self, blocks):
+        for block in blocks:
+            self.append(block)
+
+    def truncate(self, height):
+        """Drop every block at or above a height (used when the tip is disconnected)"""
+        if height >= len(self.offsets):
+            return
+        self._writer.flush()
+        self._writer.truncate(self.offsets[height])
+        del self.offsets[height:]
+        self.heights_by_hash = {block_hash: h for block_hash, h in self.heights_by_hash.items() if h < height}
+
+    def flush(self, sync=False):
+        """Push buffered records to the OS (and to disk with sync=True)"""
+        self._writer.flush()
+        if sync:
+            os.fsync(self._writer.fileno())
+
+    def read_record(self, height):
+        """Raw stored bytes of a block and how they were compressed"""
+        if not 0 <= height < len(self.offsets):
+            raise BlockStoreError(f"No block at height {height}")
+        self._writer.flush()
+        self._reader.seek(self.offsets[height])
+        length, checksum, method, dictionary_id, _ = RECORD_HEADER.unpack(self._reader.read(RECORD_HEADER.size))
+        data = self._reader.read(length)
+        if zlib.crc32(data) != checksum:
+            raise BlockStoreError(f"Checksum mismatch for block at height {height}")
+        return method, dictionary_id, data
+
+    def read_payload(self, height):
+        """Decompressed codec bytes of a block (decode with BinaryCodec.decode_block)"""
+        method, dictionary_id, data = self.read_record(height)
+        self.stats["blocks_read"] += 1
+        return self._decompress(method, dictionary_id, data)
+
+    def get_block(self, height):
+        """Read and decompress a single block"""
+        return decode_block(self.read_payload(height))
+
+    def get_block_by_hash(self, block_hash):
+        height = self.heights_by_hash.get(block_hash)
+        return None if height is None else self.get_block(height)
+
+    def compression_ratio(self):
+        """Raw codec bytes / stored bytes for blocks written by this instance"""
+        if not self.stats["stored_bytes"]:
+            return 1.0
+        return self.stats["raw_bytes"] / self.stats["stored_bytes"]
+
+    def disk_usage(self):
+        usage = os.path.getsize(self.data_path) if os.path.exists(self.data_path) else 0
+        if os.path.exists(self.dictionary_path):
+            usage += os.path.getsize(self.dictionary_path)
+        return usage
+
+    def close(self):
+        self._writer.close()
+        self._reader.close()
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __iter__(self):
+        """Decode blocks one at a time, oldest first"""
+        for height in range(len(self.offsets)):
+            yield self.get_block(height)
+
+    def __repr__(self):
+        return f"BlockStore({self.directory}, {len(self.offsets)} blocks, {self.compression})"
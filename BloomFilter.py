@@ -0,0 +1,131 @@
+import hashlib
+import math
+from collections import OrderedDict
+
+# Bloom filters for cheap "have we seen this before?" checks
+# Used by the transaction pool to reject replayed transactions without
+# scanning the whole blockchain.
+
+class BloomFilter:
+    def __init__(self, capacity, fp_rate=0.01):
+        if capacity < 1:
+            capacity = 1
+        if not 0 < fp_rate < 1:
+            raise ValueError("False-positive rate must be between 0 and 1")
+        self.capacity = capacity
+        self.fp_rate = fp_rate
+        # Optimal bit count and number of hash functions for the target rate
+        self.num_bits = max(8, math.ceil(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+        self._bits_value = None  # Cached integer view of self.bits for mask checks
+
+    def _positions(self, item):
+        """Derive bit positions with double hashing over one digest"""
+        if isinstance(item, str):
+            item = item.encode()
+        digest = hashlib.blake2b(item, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "big")
+        h2 = int.from_bytes(digest[8:], "big") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, item):
+        """Add an item (str or bytes) to the filter"""
+        for position in self._positions(item):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+        self._bits_value = None
+
+    def __contains__(self, item):
+        """False means definitely absent, True means possibly present"""
+        for position in self._positions(item):
+            if not self.bits[position >> 3] & (1 << (position & 7)):
+                return False
+        return True
+
+    def mask_for(self, item):
+        """Integer with the item's bits set (only valid for filters of the same geometry)"""
+        mask = 0
+        for position in self._positions(item):
+            mask |= 1 << position
+        return mask
+
+    def contains_mask(self, mask):
+        """Membership test against a precomputed mask, see BloomProbe"""
+        if self._bits_value is None:
+            self._bits_value = int.from_bytes(self.bits, "little")
+        return self._bits_value & mask == mask
+
+    def __len__(self):
+        return self.count
+
+    def __repr__(self):
+        return f"BloomFilter({self.count}/{self.capacity} items, {len(self.bits)} bytes, k={self.num_hashes})"
+
+
+class BloomProbe:
+    """
+    Look up one item in many filters, hashing it once per filter geometry.
+
+    Filters built with the same capacity and false-positive rate share their
+    bit positions, so scanning thousands of blocks costs one big-int AND each.
+    """
+
+    def __init__(self, item):
+        self.item = item
+        self._masks = {}
+
+    def matches(self, bloom_filter):
+        geometry = (bloom_filter.num_bits, bloom_filter.num_hashes)
+        mask = self._masks.get(geometry)
+        if mask is None:
+            mask = self._masks[geometry] = bloom_filter.mask_for(self.item)
+        return bloom_filter.contains_mask(mask)
+
+
+class RecentTransactionFilter:
+    """
+    Bounded set of recently seen transaction IDs with Bloom filters in front.
+
+    New IDs are rejected by the Bloom filters without touching the set, and
+    only possible duplicates pay for an exact lookup. The set keeps the last
+    `capacity` IDs; two rotating Bloom generations always cover them.
+    """
+
+    def __init__(self, capacity=100000, fp_rate=0.001):
+        self.capacity = max(1, capacity)
+        self.fp_rate = fp_rate
+        self._recent = OrderedDict()
+        self._current = BloomFilter(self.capacity, fp_rate)
+        self._previous = BloomFilter(self.capacity, fp_rate)
+
+    def __contains__(self, tx_id):
+        if tx_id not in self._current and tx_id not in self._previous:
+            return False
+        return tx_id in self._recent
+
+    def add(self, tx_id):
+        """Remember a transaction ID, evicting the oldest one when full"""
+        if tx_id in self._recent:
+            return
+        self._recent[tx_id] = None
+        if len(self._recent) > self.capacity:
+            self._recent.popitem(last=False)
+
+        self._current.add(tx_id)
+        if len(self._current) >= self.capacity:
+            # Everything still in the set was added during the last two generations
+            self._previous = self._current
+            self._current = BloomFilter(self.capacity, self.fp_rate)
+
+    def discard(self, tx_id):
+        """Forget a transaction ID (the Bloom bits stay, the exact set decides)"""
+        self._recent.pop(tx_id, None)
+
+    def __len__(self):
+        return len(self._recent)
+
+    def __repr__(self):
+        return f"RecentTransactionFilter({len(self._recent)}/{self.capacity} IDs)"
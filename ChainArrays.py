@@ -0,0 +1,137 @@
+try:
+    import numpy as np
+except ImportError:  # Optional: only the columnar export needs NumPy
+    np = None
+
+# Columnar export of a chain for vectorized analytics
+# Every transaction becomes one row of a NumPy structured array. Addresses are
+# interned to integer IDs so whole-chain questions (all balances, volume per
+# block, fee distribution, top senders) are answered by np.bincount/np.add.at
+# instead of Python loops over blocks and transactions.
+#
+# Pruned blocks have no transaction bodies, so they contribute no rows; the
+# per-block aggregates still work, but balances need every body and refuse.
+
+SYSTEM_SENDER = "System"
+
+if np is not None:
+    TRANSACTION_DTYPE = np.dtype([
+        ("height", np.int64),
+        ("sender", np.int32),  # Address ID
+        ("receiver", np.int32),  # Address ID
+        ("amount", np.float64),
+        ("fee", np.float64),
+        ("timestamp", np.float64),  # Seconds since the epoch
+    ])
+
+def require_numpy():
+    if np is None:
+        raise ImportError("The columnar chain export needs NumPy; install it with `pip install numpy`")
+
+
+class ChainColumns:
+    """Transactions of a chain as a structured array plus the address table"""
+
+    def __init__(self, transactions, addresses, num_blocks, first_height=0, pruned_blocks=0):
+        self.transactions = transactions
+        self.addresses = addresses  # Address ID -> address
+        self.address_ids = {address: i for i, address in enumerate(addresses)}
+        self.num_blocks = num_blocks
+        self.first_height = first_height  # Height of the first exported block (index 0 of per-block arrays)
+        self.pruned_blocks = pruned_blocks  # Exported blocks that had no transaction bodies
+        self.system_id = self.address_ids.get(SYSTEM_SENDER, -1)
+
+    def __len__(self):
+        return len(self.transactions)
+
+    def __repr__(self):
+        return f"ChainColumns({len(self)} transactions, {len(self.addresses)} addresses, {self.num_blocks} blocks)"
+
+
+def export_chain(chain):
+    """Build ChainColumns from a sequence of blocks (one Python pass)"""
+    require_numpy()
+    address_ids = {}
+    intern = address_ids.setdefault
+    rows = []
+    num_blocks = 0
+    first_height = None
+    pruned_blocks = 0
+    for block in chain:
+        num_blocks += 1
+        height = block.index
+        if first_height is None:
+            first_height = height
+        if block.pruned:
+            pruned_blocks += 1
+        for tx in block.transactions:
+            sender = intern(tx.sender, len(address_ids))
+            receiver = intern(tx.receiver, len(address_ids))
+            rows.append((height, sender, receiver, tx.amount, tx.fee, tx.timestamp.timestamp()))
+
+    transactions = np.array(rows, dtype=TRANSACTION_DTYPE)
+    return ChainColumns(transactions, list(address_ids), num_blocks, first_height or 0, pruned_blocks)
+
+#=============================================================================
+# Vectorized aggregates
+#=============================================================================
+def balances(columns):
+    """Balance per address ID (same rules as the state index; "System" is not debited)"""
+    if columns.pruned_blocks:
+        raise ValueError(f"{columns.pruned_blocks} exported blocks are pruned; balances need every transaction")
+    txs = columns.transactions
+    size = len(columns.addresses)
+    credits = np.bincount(txs["receiver"], weights=txs["amount"], minlength=size)
+    spends = txs[txs["sender"] != columns.system_id]
+    debits = np.bincount(spends["sender"], weights=spends["amount"] + spends["fee"], minlength=size)
+    result = credits - debits
+    if columns.system_id >= 0:
+        result[columns.system_id] = 0.0
+    return result
+
+def balances_by_address(columns):
+    """{address: balance} for every address that appears on the chain"""
+    values = balances(columns)
+    return {address: float(values[i]) for i, address in enumerate(columns.addresses)
+            if i != columns.system_id}
+
+def volume_per_block(columns, include_coinbase=False):
+    """Total amount transferred in each exported block (index = height - columns.first_height)"""
+    txs = columns.transactions
+    if not include_coinbase:
+        txs = txs[txs["sender"] != columns.system_id]
+    volume = np.zeros(columns.num_blocks, dtype=np.float64)
+    np.add.at(volume, txs["height"] - columns.first_height, txs["amount"])
+    return volume
+
+def fees_per_block(columns):
+    """Fees paid in each exported block (index = height - columns.first_height)"""
+    txs = columns.transactions
+    fees = np.zeros(columns.num_blocks, dtype=np.float64)
+    np.add.at(fees, txs["height"] - columns.first_height, txs["fee"])
+    return fees
+
+def fee_histogram(columns, edges=(0, 1, 2, 5, 10, 50, 100)):
+    """
+    Count of non-coinbase transactions per fee bucket.
+
+    Bucket i holds fees in [edges[i-1], edges[i]); bucket 0 is below edges[0]
+    and the last bucket is at or above edges[-1].
+    """
+    txs = columns.transactions
+    fees = txs["fee"][txs["sender"] != columns.system_id]
+    buckets = np.digitize(fees, edges)
+    return np.bincount(buckets, minlength=len(edges) + 1)
+
+def top_senders(columns, k=10):
+    """[(address, total amount sent)] for the k largest senders"""
+    txs = columns.transactions
+    totals = np.bincount(txs["sender"], weights=txs["amount"], minlength=len(columns.addresses))
+    if columns.system_id >= 0:
+        totals[columns.system_id] = 0.0
+    k = min(k, len(totals))
+    if k <= 0:
+        return []
+    top = np.argpartition(totals, -k)[-k:]
+    top = top[np.argsort(totals[top])[::-1]]
+    return [(columns.addresses[i], float(totals[i])) for i in top if totals[i] > 0]
@@ -0,0 +1,266 @@
+import contextlib
+import io
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import BinaryCodec
+import ChainArrays
+from BlockExecution import BlockExecutor, partition_transactions
+from BlockStore import BlockStore, METHOD_IDS
+from Day4_TransactionSystem import Transaction, EnhancedBlock, CryptocurrencyBlockchain
+from SyntheticWorkload import WorkloadConfig, generate_chain
+from WalletRPC import benchmark_wallet_rpc
+
+# Benchmarks for the Day 4 cryptocurrency system
+# Run all of them with `python ChainBenchmarks.py` or pick one by name,
+# e.g. `python ChainBenchmarks.py address_filters`
+
+def build_benchmark_chain(num_blocks, txs_per_block, num_addresses, fp_rate=0.01, seed=42):
+    """Build a chain of random (unmined, difficulty 0) blocks without console noise"""
+    rng = random.Random(seed)
+    addresses = [f"1{rng.getrandbits(120):030x}" for _ in range(num_addresses)]
+    start = datetime(2024, 1, 1)
+
+    blockchain = CryptocurrencyBlockchain()
+    blockchain.difficulty = 0
+    blockchain.address_filter_fp_rate = fp_rate
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for height in range(1, num_blocks + 1):
+            timestamp = start + timedelta(minutes=height)
+            transactions = []
+            for i in range(txs_per_block):
+                sender, receiver = rng.sample(addresses, 2)
+                tx = Transaction(sender, receiver, rng.randint(1, 100), fee=rng.randint(0, 3),
+                                 timestamp=timestamp + timedelta(microseconds=i))
+                tx.sign_transaction("BENCHMARK_KEY")
+                transactions.append(tx)
+            block = EnhancedBlock(height, timestamp, transactions, blockchain.get_latest_block().hash)
+            block.mine_block(blockchain.difficulty, fp_rate)
+            blockchain.connect_block(block)
+
+    return blockchain, addresses
+
+def benchmark_address_filters(num_blocks=1000, txs_per_block=50, num_addresses=50000, fp_rate=0.01):
+    """Compare history scans with and without per-block address filters"""
+    print("🧪 Benchmark: per-block address Bloom filters (sparse addresses)")
+    blockchain, addresses = build_benchmark_chain(num_blocks, txs_per_block, num_addresses, fp_rate)
+    targets = addresses[:50]
+
+    skipped = 0
+    for address in targets:
+        skipped += sum(1 for block in blockchain.chain if not block.may_involve(address))
+    scanned = len(targets) * len(blockchain.chain)
+
+    start_time = time.perf_counter()
+    filtered = [blockchain.get_transaction_history(address) for address in targets]
+    filtered_time = time.perf_counter() - start_time
+
+    saved_filters = [block.address_filter for block in blockchain.chain]
+    for block in blockchain.chain:
+        block.address_filter = None
+    start_time = time.perf_counter()
+    unfiltered = [blockchain.get_transaction_history(address) for address in targets]
+    unfiltered_time = time.perf_counter() - start_time
+    for block, address_filter in zip(blockchain.chain, saved_filters):
+        block.address_filter = address_filter
+
+    filter_bytes = sum(len(f.bits) for f in saved_filters if f is not None)
+    print(f"   Blocks: {num_blocks}, txs/block: {txs_per_block}, addresses: {num_addresses}, fp rate: {fp_rate}")
+    print(f"   Blocks skipped: {skipped}/{scanned} ({skipped / scanned:.1%})")
+    print(f"   Filter memory: {filter_bytes / 1024:.1f} KiB ({filter_bytes / num_blocks:.0f} bytes/block)")
+    print(f"   History scans with filters:    {filtered_time * 1000:.1f} ms")
+    print(f"   History scans without filters: {unfiltered_time * 1000:.1f} ms")
+    print(f"   Results identical: {filtered == unfiltered}")
+
+def benchmark_codec(num_blocks=200, txs_per_block=100):
+    """Compare the binary codec with the JSON form for size and throughput"""
+    print("🧪 Benchmark: binary codec vs JSON")
+    blockchain, _ = build_benchmark_chain(num_blocks, txs_per_block, num_addresses=1000)
+    blocks = blockchain.chain[1:]
+
+    start_time = time.perf_counter()
+    json_blobs = [json.dumps(block.to_dict()).encode() for block in blocks]
+    json_encode_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    parsed = [json.loads(blob) for blob in json_blobs]
+    json_parse_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    for block_data in parsed:
+        EnhancedBlock.from_dict(block_data)
+    json_objects_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    binary_blobs = [BinaryCodec.encode_block(block) for block in blocks]
+    binary_encode_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    decoded = [BinaryCodec.decode_block(blob) for blob in binary_blobs]
+    binary_decode_time = time.perf_counter() - start_time
+
+    exact = all(original.to_dict() == copy.to_dict() and BinaryCodec.encode_block(copy) == blob
+                for original, copy, blob in zip(blocks, decoded, binary_blobs))
+    json_size = sum(len(blob) for blob in json_blobs)
+    binary_size = sum(len(blob) for blob in binary_blobs)
+    megabytes = json_size / 1e6
+
+    print(f"   Blocks: {num_blocks}, txs/block: {txs_per_block}")
+    print(f"   JSON size:   {json_size:>10} bytes")
+    print(f"   Binary size: {binary_size:>10} bytes ({json_size / binary_size:.2f}x smaller)")
+    print(f"   JSON encode:   {json_encode_time * 1000:8.1f} ms ({megabytes / json_encode_time:.1f} MB/s of JSON)")
+    print(f"   Binary encode: {binary_encode_time * 1000:8.1f} ms")
+    print(f"   JSON decode:   {json_parse_time * 1000:8.1f} ms parse + {json_objects_time * 1000:.1f} ms to objects")
+    print(f"   Binary decode: {binary_decode_time * 1000:8.1f} ms (straight to objects)")
+    print(f"   Exact round trip: {exact}")
+
+def compression_report(num_blocks=400, txs_per_block=50, num_addresses=500):
+    """Compression ratio and read/write throughput for each block store mode"""
+    print("🧪 Report: block store compression modes")
+    blockchain, _ = build_benchmark_chain(num_blocks, txs_per_block, num_addresses)
+    raw_size = sum(len(BinaryCodec.encode_block(block)) for block in blockchain.chain)
+    print(f"   Blocks: {len(blockchain.chain)}, txs/block: {txs_per_block}, codec bytes: {raw_size}")
+    print(f"   {'mode':<10} {'on disk':>10} {'ratio':>7} {'write ms':>9} {'read all ms':>12} {'random read ms':>15}")
+
+    rng = random.Random(7)
+    sample_heights = [rng.randrange(len(blockchain.chain)) for _ in range(200)]
+    for compression in METHOD_IDS:
+        with tempfile.TemporaryDirectory() as directory:
+            store = BlockStore(directory, compression=compression)
+            start_time = time.perf_counter()
+            store.extend(blockchain.chain)
+            store.flush(sync=True)
+            write_time = time.perf_counter() - start_time
+
+            start_time = time.perf_counter()
+            for _ in store:
+                pass
+            read_time = time.perf_counter() - start_time
+
+            start_time = time.perf_counter()
+            for height in sample_heights:
+                store.get_block(height)
+            random_time = time.perf_counter() - start_time
+
+            on_disk = store.disk_usage()
+            store.close()
+        print(f"   {compression:<10} {on_disk:>10} {raw_size / on_disk:>6.2f}x {write_time * 1000:>9.1f} "
+              f"{read_time * 1000:>12.1f} {random_time * 1000:>15.1f}")
+
+def benchmark_columnar(num_blocks=1000, txs_per_block=200, num_addresses=50000):
+    """Whole-chain aggregates on the columnar export vs Python loops"""
+    print("🧪 Benchmark: columnar chain export (NumPy)")
+    if ChainArrays.np is None:
+        print("   Skipped: NumPy is not installed (pip install numpy)")
+        return
+    blockchain, addresses = build_benchmark_chain(num_blocks, txs_per_block, num_addresses)
+
+    start_time = time.perf_counter()
+    columns = ChainArrays.export_chain(blockchain.chain)
+    export_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    balances = ChainArrays.balances_by_address(columns)
+    balances_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    ChainArrays.volume_per_block(columns)
+    ChainArrays.fees_per_block(columns)
+    ChainArrays.fee_histogram(columns)
+    ChainArrays.top_senders(columns)
+    aggregates_time = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    volume = [sum(tx.amount for tx in block.transactions if tx.sender != "System") for block in blockchain.chain]
+    loop_time = time.perf_counter() - start_time
+
+    matches = all(abs(balances.get(address, 0) - blockchain.get_balance(address)) < 1e-6 for address in addresses[:1000])
+    print(f"   Transactions: {len(columns):,}, addresses: {len(columns.addresses):,}")
+    print(f"   Export:                   {export_time * 1000:8.1f} ms (one pass)")
+    print(f"   All balances:             {balances_time * 1000:8.1f} ms")
+    print(f"   Volume, fees, histogram, top: {aggregates_time * 1000:5.1f} ms")
+    print(f"   Volume per block (loops): {loop_time * 1000:8.1f} ms")
+    print(f"   Volume matches: {bool(ChainArrays.np.allclose(ChainArrays.volume_per_block(columns), volume))}, "
+          f"balances match state index: {matches}")
+
+def benchmark_block_execution(num_transactions=10000, repeats=5):
+    """Serial vs conflict-aware parallel state updates for large blocks"""
+    print("🧪 Benchmark: conflict-aware parallel block execution")
+    rng = random.Random(3)
+    for contention, num_addresses in (("low", 200000), ("high", 50)):
+        addresses = [f"1{rng.getrandbits(120):030x}" for _ in range(num_addresses)]
+        start_balances = {address: rng.random() * 1000 for address in addresses}
+        transactions = []
+        for i in range(num_transactions):
+            sender, receiver = rng.sample(addresses, 2)
+            transactions.append(Transaction(sender, receiver, rng.random() * 10, fee=rng.random() / 10,
+                                            timestamp=datetime(2024, 1, 1) + timedelta(microseconds=i)))
+        block = EnhancedBlock(1, datetime(2024, 1, 1), transactions, "0" * 64)
+        groups = partition_transactions(transactions)
+
+        def timed_runs(blockchain):
+            """Average time to apply the block to fresh copies of the starting state"""
+            states = [dict(start_balances) for _ in range(repeats)]
+            elapsed = 0
+            for balances in states:
+                blockchain.balances, blockchain.nonces = balances, {}
+                start_time = time.perf_counter()
+                blockchain.apply_block_to_state(block)
+                elapsed += time.perf_counter() - start_time
+            return elapsed / repeats
+
+        blockchain = CryptocurrencyBlockchain()
+        serial_time = timed_runs(blockchain)
+        serial_state = blockchain.balances
+
+        print(f"   {contention} contention: {num_addresses} addresses, {len(groups)} groups, "
+              f"largest {max(map(len, groups))} txs, serial {serial_time * 1000:.1f} ms")
+        for label, use_processes in (("threads", False), ("processes", True)):
+            blockchain.block_executor = BlockExecutor(use_processes=use_processes, min_parallel=0,
+                                                      workers=max(2, os.cpu_count() or 1))
+            blockchain.balances, blockchain.nonces = dict(start_balances), {}
+            blockchain.apply_block_to_state(block)  # Warm up the pool
+            parallel_time = timed_runs(blockchain)
+            blockchain.block_executor.close()
+            identical = blockchain.balances == serial_state
+            print(f"      {label:<9} {parallel_time * 1000:7.1f} ms ({serial_time / parallel_time:.2f}x), "
+                  f"bit-identical: {identical}")
+    print(f"   ({os.cpu_count()} CPU cores available)")
+
+def benchmark_assume_valid(num_blocks=300, txs_per_block=200):
+    """Cold sync of a synthetic chain with full verification vs an assume-valid checkpoint"""
+    print("🧪 Benchmark: initial sync with assume-valid checkpoints")
+    source, _ = generate_chain(WorkloadConfig(num_wallets=2000), num_blocks, txs_per_block)
+    checkpoint = source.chain[-6]  # Shipped a few blocks behind the tip
+
+    for label, full_verification in (("full verification", True), ("assume-valid", False)):
+        node = CryptocurrencyBlockchain()
+        node.difficulty = 0
+        node.chain = [source.chain[0]]
+        node.add_checkpoint(checkpoint.index, checkpoint.hash)
+        with contextlib.redirect_stdout(io.StringIO()):
+            node.connect_block(source.chain[1])  # Premine, part of the genesis state
+            start_time = time.perf_counter()
+            connected = node.sync_blocks(source.chain[2:], full_verification=full_verification)
+            elapsed = time.perf_counter() - start_time
+        in_sync = node.get_latest_block().hash == source.get_latest_block().hash and node.balances == source.balances
+        print(f"   {label:<18} {connected} blocks / {connected * txs_per_block:,} txs in {elapsed:.2f}s "
+              f"({connected * txs_per_block / elapsed:,.0f} tx/s), matches source: {in_sync}")
+
+BENCHMARKS = {
+    "address_filters": benchmark_address_filters,
+    "codec": benchmark_codec,
+    "compression": compression_report,
+    "columnar": benchmark_columnar,
+    "block_execution": benchmark_block_execution,
+    "wallet_rpc": benchmark_wallet_rpc,
+    "assume_valid": benchmark_assume_valid,
+}
+
+if __name__ == "__main__":
+    selected = sys.argv[1:] or list(BENCHMARKS)
+    for name in selected:
+        BENCHMARKS[name]()
+        print()
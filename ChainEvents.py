@@ -0,0 +1,389 @@
+import asyncio
+import collections
+import contextlib
+import io
+import sys
+import threading
+import time
+
+# Event subscriptions for blocks and pool changes
+# Attach an EventBus to a chain (`bus = EventBus(blockchain)`) and it
+# publishes typed events as they happen:
+#   BlockConnected, BlockDisconnected, TransactionAdmitted, TransactionEvicted
+# Every event gets the next sequence number and is kept in a bounded history.
+#
+# Subscribers consume with a plain loop (`for event in subscription`) or from
+# asyncio (`async for event in subscription`). Each has its own bounded buffer
+# and slow-consumer policy: "drop" discards the oldest buffered event (the
+# gap shows in the sequence numbers and in `dropped`), "block" makes the
+# publisher wait for room, i.e. backpressure on the chain itself.
+#
+# Subscriptions can resume from a sequence number (replayed from history) or
+# from a height (BlockConnected events rebuilt from the chain), and switch to
+# live events without gaps or duplicates.
+#
+# Block events carry the transactions as connected or disconnected; `block` is
+# the chain's own object and its body may be pruned by the time it is read.
+
+POLICY_DROP = "drop"
+POLICY_BLOCK = "block"
+
+
+class ResumeError(Exception):
+    """Raised when a subscription asks to resume from events no longer in history"""
+
+
+class ChainEvent:
+    __slots__ = ("sequence", "height", "time", "replayed")
+
+    def __init__(self, height):
+        self.sequence = None  # Assigned when published
+        self.height = height  # Block height (tip height for pool events)
+        self.time = time.time()
+        self.replayed = False  # Rebuilt from the chain rather than seen live
+
+    def __repr__(self):
+        return f"{type(self).__name__}(#{self.sequence}, height {self.height})"
+
+
+class BlockConnected(ChainEvent):
+    __slots__ = ("block", "transactions")
+
+    def __init__(self, block):
+        super().__init__(block.index)
+        self.block = block
+        self.transactions = tuple(block.transactions)  # Snapshot: pruning empties block.transactions
+
+
+class BlockDisconnected(ChainEvent):
+    __slots__ = ("block", "transactions")
+
+    def __init__(self, block):
+        super().__init__(block.index)
+        self.block = block
+        self.transactions = tuple(block.transactions)
+
+
+class TransactionAdmitted(ChainEvent):
+    __slots__ = ("transaction",)
+
+    def __init__(self, transaction, height):
+        super().__init__(height)
+        self.transaction = transaction
+
+
+class TransactionEvicted(ChainEvent):
+    __slots__ = ("transaction",)
+
+    def __init__(self, transaction, height):
+        super().__init__(height)
+        self.transaction = transaction
+
+
+class Subscription:
+    def __init__(self, bus, kinds=None, buffer_size=1000, policy=POLICY_DROP, block_timeout=None):
+        if policy not in (POLICY_DROP, POLICY_BLOCK):
+            raise ValueError(f"policy must be '{POLICY_DROP}' or '{POLICY_BLOCK}'")
+        self.bus = bus
+        self.kinds = tuple(kinds) if kinds else None  # Event classes to receive (None = all)
+        self.buffer_size = buffer_size
+        self.policy = policy
+        self.block_timeout = block_timeout  # "block": give up on (and close) a consumer stuck this long
+        self.buffer = collections.deque()
+        self.backlog = iter(())  # Replayed events, delivered before the buffer
+        self.closed = False
+        self.dropped = 0
+        self.delivered = 0
+        self.last_sequence = None  # Resume point for a new subscription
+        self._condition = threading.Condition()
+        self._async_waiters = []  # (loop, future) of suspended async consumers
+
+    def wants(self, event):
+        return self.kinds is None or isinstance(event, self.kinds)
+
+    def _wake_async(self):
+        for loop, future in self._async_waiters:
+            # A consumer's loop may be gone; that must never fail the publisher (a chain operation)
+            if future.done() or loop.is_closed():
+                continue
+            with contextlib.suppress(RuntimeError):  # Loop closed just now
+                loop.call_soon_threadsafe(_resolve, future)
+        self._async_waiters = []
+
+    def push(self, event):
+        """Called by the bus; applies the slow-consumer policy"""
+        with self._condition:
+            if self.closed:
+                return
+            if len(self.buffer) >= self.buffer_size:
+                if self.policy == POLICY_DROP:
+                    self.buffer.popleft()
+                    self.dropped += 1
+                else:
+                    deadline = None if self.block_timeout is None else time.monotonic() + self.block_timeout
+                    while len(self.buffer) >= self.buffer_size and not self.closed:
+                        remaining = None if deadline is None else deadline - time.monotonic()
+                        if remaining is not None and remaining <= 0:
+                            print(f"⚠️  Closing a subscription stuck for {self.block_timeout}s")
+                            self._close_locked()
+                            return
+                        self._condition.wait(remaining)
+                    if self.closed:
+                        return
+            self.buffer.append(event)
+            self._condition.notify_all()
+            self._wake_async()
+
+    def _take(self):
+        """Next event if one is ready (caller holds the condition), else None"""
+        for event in self.backlog:
+            if self.wants(event):
+                return self._delivered(event)
+        if self.buffer:
+            event = self.buffer.popleft()
+            self._condition.notify_all()  # Room for a blocked publisher
+            return self._delivered(event)
+        return None
+
+    def _delivered(self, event):
+        self.delivered += 1
+        if event.sequence is not None:
+            self.last_sequence = event.sequence
+        return event
+
+    def get(self, timeout=None):
+        """Next event, waiting up to `timeout` seconds (None = until one arrives); None if closed or timed out"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                event = self._take()
+                if event is not None or self.closed:
+                    return event
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return None
+                self._condition.wait(remaining)
+
+    def __iter__(self):
+        while True:
+            event = self.get()
+            if event is None:
+                return
+            yield event
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            with self._condition:
+                event = self._take()
+                if event is not None:
+                    return event
+                if self.closed:
+                    raise StopAsyncIteration
+                waiter = (loop, loop.create_future())
+                self._async_waiters.append(waiter)
+            try:
+                await waiter[1]
+            finally:  # Also when cancelled (e.g. asyncio.wait_for timing out)
+                with self._condition:
+                    with contextlib.suppress(ValueError):
+                        self._async_waiters.remove(waiter)
+
+    def _close_locked(self):
+        self.closed = True
+        self._condition.notify_all()
+        self._wake_async()
+
+    def close(self):
+        """Stop receiving; consumers finish what is buffered, then their loops end"""
+        self.bus.unsubscribe(self)
+        with self._condition:
+            self._close_locked()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __repr__(self):
+        return (f"Subscription({self.policy}, {len(self.buffer)}/{self.buffer_size} buffered, "
+                f"{self.delivered} delivered, {self.dropped} dropped)")
+
+
+def _resolve(future):
+    if not future.done():
+        future.set_result(None)
+
+
+class EventBus:
+    def __init__(self, blockchain=None, history_size=10000):
+        self.blockchain = blockchain
+        self.history = collections.deque(maxlen=history_size)  # Recent events, for resuming by sequence
+        self.next_sequence = 0
+        self.subscriptions = []
+        self.stats = {"published": 0}
+        self._publish_lock = threading.RLock()  # Orders events; held while a "block" consumer makes room
+        if blockchain is not None:
+            blockchain.event_bus = self
+
+    def publish(self, event):
+        with self._publish_lock:
+            event.sequence = self.next_sequence
+            self.next_sequence += 1
+            self.history.append(event)
+            self.stats["published"] += 1
+            for subscription in list(self.subscriptions):
+                if subscription.wants(event):
+                    subscription.push(event)
+
+    # Hooks called by the blockchain
+    def block_connected(self, block):
+        self.publish(BlockConnected(block))
+
+    def block_disconnected(self, block):
+        self.publish(BlockDisconnected(block))
+
+    def transaction_admitted(self, transaction, height):
+        self.publish(TransactionAdmitted(transaction, height))
+
+    def transaction_evicted(self, transaction, height):
+        self.publish(TransactionEvicted(transaction, height))
+
+    def subscribe(self, kinds=None, buffer_size=1000, policy=POLICY_DROP, block_timeout=None,
+                  from_sequence=None, from_height=None):
+        """
+        New Subscription, live from now on, optionally resuming first:
+
+        from_sequence: every event with that sequence number or later (must
+        still be in history, else ResumeError); from_height: a BlockConnected
+        for every block from that height to the tip (rebuilt from the chain
+        when subscribing, marked replayed; the bodies must not be pruned).
+        """
+        subscription = Subscription(self, kinds, buffer_size, policy, block_timeout)
+        with self._publish_lock:  # No event can slip between the replay and going live
+            if from_sequence is not None:
+                if from_sequence < self.next_sequence and (not self.history or self.history[0].sequence > from_sequence):
+                    raise ResumeError(f"Events before #{self.history[0].sequence if self.history else self.next_sequence} "
+                                      f"are no longer kept; resume from a height instead")
+                subscription.backlog = iter([event for event in self.history if event.sequence >= from_sequence])
+            elif from_height is not None:
+                if self.blockchain is None:
+                    raise ResumeError("Resuming from a height needs the bus to be attached to a chain")
+                subscription.backlog = iter(self._replay_blocks(from_height))
+            self.subscriptions.append(subscription)
+        return subscription
+
+    def _replay_blocks(self, from_height):
+        """
+        BlockConnected events for chain[from_height:], built now (under the
+        publish lock) so later pruning or reorgs cannot change what is replayed
+        """
+        from_height = max(0, from_height)
+        chain = self.blockchain.chain
+        if self.blockchain.pruned_height >= max(from_height, 1):  # Genesis is never pruned
+            raise ResumeError(f"Blocks up to #{self.blockchain.pruned_height} are pruned; "
+                              f"resume from #{self.blockchain.pruned_height + 1} or later")
+        events = []
+        for height in range(from_height, len(chain)):
+            event = BlockConnected(chain[height])
+            event.replayed = True
+            events.append(event)
+        return events
+
+    def unsubscribe(self, subscription):
+        with contextlib.suppress(ValueError):
+            self.subscriptions.remove(subscription)
+
+    def __repr__(self):
+        return f"EventBus({len(self.subscriptions)} subscriptions, next #{self.next_sequence})"
+
+#=============================================================================
+# DEMONSTRATION
+#=============================================================================
+def demonstrate_chain_events(num_blocks=10, txs_per_block=200):
+    from Day4_TransactionSystem import CryptocurrencyBlockchain
+    from SyntheticWorkload import WorkloadConfig, WorkloadGenerator, make_genesis
+    from datetime import datetime, timedelta
+
+    print("🚀 Chain Event Stream Demo")
+    print("=" * 60)
+    generator = WorkloadGenerator(WorkloadConfig(num_wallets=1000))
+    blockchain = CryptocurrencyBlockchain()
+    blockchain.difficulty = 1
+    blockchain.chain = [make_genesis()]
+    bus = EventBus(blockchain, history_size=1000)
+
+    # A fast consumer that only wants blocks, a slow one that wants everything
+    # but drops, and an asyncio consumer that applies backpressure
+    blocks_only = bus.subscribe(kinds=(BlockConnected, BlockDisconnected))
+    slow = bus.subscribe(buffer_size=100, policy=POLICY_DROP)
+    backpressure = bus.subscribe(buffer_size=50, policy=POLICY_BLOCK)
+    counts = {}
+
+    def watch_blocks():
+        for event in blocks_only:
+            counts[type(event).__name__] = counts.get(type(event).__name__, 0) + 1
+
+    def slow_consumer():
+        for _ in slow:
+            time.sleep(0.0005)
+
+    async def async_consumer():
+        received = 0
+        async for event in backpressure:
+            received += 1
+        return received
+
+    async_result = {}
+    async_thread = threading.Thread(target=lambda: async_result.setdefault("received", asyncio.run(async_consumer())))
+    threads = [threading.Thread(target=watch_blocks), threading.Thread(target=slow_consumer), async_thread]
+    for thread in threads:
+        thread.start()
+
+    start_time = time.perf_counter()
+    clock = datetime(2024, 1, 1)
+    with contextlib.redirect_stdout(io.StringIO()):
+        blockchain.connect_block(generator.allocation_block(blockchain))
+        for _ in range(num_blocks):
+            for _ in range(txs_per_block):
+                clock += timedelta(milliseconds=1)
+                tx = generator.next_transaction(clock, blockchain.get_spendable_balance)
+                if tx is not None:
+                    blockchain.create_transaction(tx)
+            blockchain.mine_pending_transactions(generator.addresses[0])
+        blockchain.disconnect_tip()  # Reorg: its transactions return to the pool
+    elapsed = time.perf_counter() - start_time
+    resume_point = blocks_only.last_sequence
+
+    for subscription in (blocks_only, slow, backpressure):
+        subscription.close()
+    for thread in threads:
+        thread.join()
+
+    print(f"📣 {bus.stats['published']} events published in {elapsed:.2f}s while mining {num_blocks} blocks")
+    print(f"   Block watcher: {counts}")
+    print(f"   Slow consumer (drop): {slow}")
+    print(f"   Async consumer (block): {async_result['received']} received, {backpressure.dropped} dropped")
+
+    # Resume: by sequence from history, and by height from the chain itself
+    with bus.subscribe(from_sequence=resume_point - 2, kinds=(BlockConnected, BlockDisconnected)) as resumed:
+        replay = []
+        while (event := resumed.get(timeout=0)) is not None:
+            replay.append(event)
+        print(f"\n🔁 Resumed from #{resume_point - 2}: {replay}")
+    with bus.subscribe(from_height=len(blockchain.chain) - 3) as resumed:
+        replay = []
+        while (event := resumed.get(timeout=0)) is not None:
+            replay.append(f"#{event.height}{' (replayed)' if event.replayed else ''}")
+        print(f"🔁 Resumed from height {len(blockchain.chain) - 3}: {replay}")
+    try:
+        bus.subscribe(from_sequence=0)
+    except ResumeError as error:
+        print(f"🛑 {error}")
+
+if __name__ == "__main__":
+    demonstrate_chain_events(int(sys.argv[1]) if len(sys.argv) > 1 else 10)
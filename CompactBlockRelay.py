@@ -0,0 +1,263 @@
+import hashlib
+import json
+import os
+import time
+
+from BinaryCodec import block_header, encode_value, decode_value
+from Day4_TransactionSystem import EnhancedBlock, CryptocurrencyBlockchain, Wallet
+
+# Compact block relay between nodes
+# Instead of sending every transaction of a new block again, a node sends the
+# block header plus a short salted ID per transaction. Peers rebuild the block
+# from their own pending pool and only ask for the transactions they miss.
+# If the rebuilt block does not match its header (a short ID matched the wrong
+# pool transaction) the peer falls back to requesting the full block.
+
+SHORT_ID_BYTES = 6  # 48-bit short IDs, like BIP 152
+PARTIAL_BLOCK_TIMEOUT = 30  # Seconds to wait for missing transactions before giving up on a block
+MAX_PARTIAL_BLOCKS = 16  # Blocks awaiting transactions at once (oldest dropped first)
+
+def encode_message(message):
+    """Serialize a relay message for the wire (binary codec)"""
+    return encode_value(message)
+
+def decode_message(data):
+    """Parse a relay message received from the wire"""
+    return decode_value(data)
+
+def short_id_salt(block_hash, nonce):
+    """Per-block key so short ID collisions cannot be precomputed"""
+    return hashlib.sha256(f"{block_hash}{nonce}".encode()).digest()[:16]
+
+def short_transaction_id(transaction_id, salt):
+    """Salted, truncated transaction ID used in compact blocks"""
+    return hashlib.blake2b(transaction_id.encode(), key=salt, digest_size=SHORT_ID_BYTES).digest()
+
+def make_compact_block(block):
+    """Header + short IDs, with the coinbase prefilled (no peer has it yet)"""
+    nonce = os.urandom(8).hex()
+    salt = short_id_salt(block.hash, nonce)
+    return {
+        "type": "cmpctblock",
+        "header": block_header(block),
+        "nonce": nonce,
+        "short_ids": [short_transaction_id(tx.transaction_id, salt) for tx in block.transactions[1:]],
+        "prefilled": [{"index": 0, "transaction": block.transactions[0]}]
+    }
+
+
+class RelayNode:
+    def __init__(self, name, blockchain=None):
+        self.name = name
+        self.blockchain = blockchain or CryptocurrencyBlockchain()
+        self.peers = []
+        self.partial_blocks = {}  # Block hash -> (header, transaction slots, peer, time requested)
+        self.stats = {
+            "bytes_sent": 0,
+            "bytes_received": 0,
+            "compact_blocks_received": 0,
+            "blocks_reconstructed": 0,
+            "transactions_requested": 0,
+            "full_blocks_requested": 0,
+            "partial_blocks_expired": 0,
+            "full_block_bytes_avoided": 0
+        }
+
+    def connect(self, peer):
+        """Open a two-way link to another node"""
+        if peer not in self.peers:
+            self.peers.append(peer)
+            peer.peers.append(self)
+
+    def send(self, peer, message):
+        """In-process transport: encode, count bytes and deliver"""
+        data = encode_message(message)
+        self.stats["bytes_sent"] += len(data)
+        peer.receive(self, data)
+
+    def receive(self, peer, data):
+        self.stats["bytes_received"] += len(data)
+        message = decode_message(data)
+        handler = getattr(self, f"_handle_{message['type']}")
+        handler(peer, message)
+
+    def submit_transaction(self, transaction):
+        """Accept a transaction locally and gossip it to peers"""
+        if self.blockchain.create_transaction(transaction):
+            self._broadcast({"type": "tx", "transaction": transaction})
+            return True
+        return False
+
+    def mine(self, mining_reward_address):
+        """Mine the pending pool and announce the block as a compact block"""
+        block = self.blockchain.mine_pending_transactions(mining_reward_address)
+        self.announce_block(block)
+        return block
+
+    def announce_block(self, block, exclude=None):
+        for peer in self.peers:
+            if peer is not exclude:
+                self.send(peer, make_compact_block(block))
+
+    def _broadcast(self, message, exclude=None):
+        for peer in self.peers:
+            if peer is not exclude:
+                self.send(peer, message)
+
+    def _find_block(self, block_hash):
+        """Look up a recent block by hash (newest first)"""
+        for block in reversed(self.blockchain.chain):
+            if block.hash == block_hash:
+                return block
+        return None
+
+    def _handle_tx(self, peer, message):
+        transaction = message["transaction"]
+        if transaction.transaction_id in self.blockchain.seen_transactions:
+            return
+        if self.blockchain.create_transaction(transaction):
+            self._broadcast(message, exclude=peer)
+
+    def _expire_partial_blocks(self):
+        """Forget blocks whose missing transactions never arrived, and keep the table bounded"""
+        now = time.monotonic()
+        for block_hash, (header, _, _, requested) in list(self.partial_blocks.items()):
+            if now - requested > PARTIAL_BLOCK_TIMEOUT:
+                del self.partial_blocks[block_hash]
+                self.stats["partial_blocks_expired"] += 1
+                print(f"⌛ {self.name}: gave up waiting for transactions of block #{header['index']}")
+        while len(self.partial_blocks) >= MAX_PARTIAL_BLOCKS:
+            del self.partial_blocks[next(iter(self.partial_blocks))]  # Oldest request first
+            self.stats["partial_blocks_expired"] += 1
+
+    def _handle_cmpctblock(self, peer, message):
+        header = message["header"]
+        self._expire_partial_blocks()
+        if header["hash"] in self.partial_blocks or self._find_block(header["hash"]):
+            return
+        self.stats["compact_blocks_received"] += 1
+
+        # Match short IDs against our own pool; colliding IDs count as missing
+        salt = short_id_salt(header["hash"], message["nonce"])
+        pool = {}
+        for tx in self.blockchain.pending_transactions:
+            short_id = short_transaction_id(tx.transaction_id, salt)
+            pool[short_id] = None if short_id in pool else tx
+
+        # Every slot needs exactly one prefilled transaction or short ID; otherwise get the full block
+        count = header["transaction_count"]
+        prefilled_indexes = {prefilled["index"] for prefilled in message["prefilled"]}
+        if len(prefilled_indexes) != len(message["prefilled"]) or \
+                not all(0 <= index < count for index in prefilled_indexes) or \
+                len(message["short_ids"]) != count - len(prefilled_indexes):
+            print(f"⚠️  {self.name}: compact block #{header['index']} is malformed, requesting the full block")
+            self.stats["full_blocks_requested"] += 1
+            self.send(peer, {"type": "getblock", "block_hash": header["hash"]})
+            return
+
+        slots = [None] * count
+        for prefilled in message["prefilled"]:
+            slots[prefilled["index"]] = prefilled["transaction"]
+        short_ids = iter(message["short_ids"])
+        for index in range(len(slots)):
+            if index not in prefilled_indexes:
+                slots[index] = pool.get(next(short_ids))
+
+        missing = [index for index, tx in enumerate(slots) if tx is None]
+        if missing:
+            print(f"📡 {self.name}: block #{header['index']} missing {len(missing)} transactions, requesting them")
+            self.partial_blocks[header["hash"]] = (header, slots, peer, time.monotonic())
+            self.stats["transactions_requested"] += len(missing)
+            self.send(peer, {"type": "getblocktxn", "block_hash": header["hash"], "indexes": missing})
+        else:
+            self._finish_block(header, slots, peer)
+
+    def _handle_getblocktxn(self, peer, message):
+        block = self._find_block(message["block_hash"])
+        if block is None or block.pruned:
+            return
+        transactions = [block.transactions[index] for index in message["indexes"]]
+        self.send(peer, {"type": "blocktxn", "block_hash": block.hash,
+                         "indexes": message["indexes"], "transactions": transactions})
+
+    def _handle_blocktxn(self, peer, message):
+        partial = self.partial_blocks.pop(message["block_hash"], None)
+        if partial is None:
+            return
+        header, slots, _, _ = partial
+        for index, tx in zip(message["indexes"], message["transactions"]):
+            slots[index] = tx
+        self._finish_block(header, slots, peer)
+
+    def _handle_getblock(self, peer, message):
+        block = self._find_block(message["block_hash"])
+        if block is None or block.pruned:
+            return
+        self.send(peer, {"type": "block", "block": block})
+
+    def _handle_block(self, peer, message):
+        block = message["block"]
+        if self._find_block(block.hash):
+            return
+        if self.blockchain.add_block(block):
+            self.announce_block(block, exclude=peer)
+
+    def _finish_block(self, header, transactions, peer):
+        block = EnhancedBlock.from_header(header, transactions)
+        if block.calculate_hash() != header["hash"]:
+            # A short ID collision put the wrong transaction in a slot: fetch the real block
+            print(f"⚠️  {self.name}: reconstructed block #{header['index']} does not match its header, "
+                  f"requesting the full block")
+            self.stats["full_blocks_requested"] += 1
+            self.send(peer, {"type": "getblock", "block_hash": header["hash"]})
+            return
+        if self.blockchain.add_block(block):
+            self.stats["blocks_reconstructed"] += 1
+            self.stats["full_block_bytes_avoided"] += len(encode_message({"type": "block", "block": block}))
+            self.announce_block(block, exclude=peer)
+
+    def __repr__(self):
+        return f"RelayNode({self.name}, height {len(self.blockchain.chain) - 1})"
+
+#=============================================================================
+# DEMONSTRATION: Three nodes in a line relaying compact blocks
+#=============================================================================
+def demonstrate_compact_relay():
+    print("🚀 Compact Block Relay Demo")
+    print("=" * 60)
+
+    alice_node, bob_node, charlie_node = RelayNode("Alice"), RelayNode("Bob"), RelayNode("Charlie")
+    for node in (alice_node, bob_node, charlie_node):
+        node.blockchain.difficulty = 2
+    # All nodes must share the same genesis block
+    bob_node.blockchain.chain = list(alice_node.blockchain.chain)
+    charlie_node.blockchain.chain = list(alice_node.blockchain.chain)
+    alice_node.connect(bob_node)
+    bob_node.connect(charlie_node)
+
+    miner = Wallet("Miner")
+    users = [Wallet(f"User{i}") for i in range(4)]
+
+    alice_node.mine(miner.address)
+
+    # Most transactions are gossiped, a few only reach Alice before she mines
+    for i in range(40):
+        tx = miner.send_money(users[i % 4].address, 1, fee=0.1)
+        alice_node.submit_transaction(tx)
+    for i in range(3):
+        alice_node.blockchain.create_transaction(miner.send_money(users[i].address, 2, fee=0.1))
+
+    for node in (alice_node, bob_node, charlie_node):
+        node.stats["bytes_sent"] = node.stats["bytes_received"] = 0
+    block = alice_node.mine(miner.address)
+
+    print(f"\n📊 Relay results for block #{block.index} ({len(block.transactions)} transactions):")
+    for node in (alice_node, bob_node, charlie_node):
+        print(f"   {node}: tip {node.blockchain.get_latest_block().hash[:16]}..., stats {node.stats}")
+    full_size = len(encode_message({"type": "block", "block": block}))
+    json_size = len(json.dumps({"type": "block", "block": block.to_dict()}))
+    print(f"   Full block message: {full_size} bytes binary / {json_size} bytes JSON, "
+          f"Alice sent: {alice_node.stats['bytes_sent']} bytes")
+
+if __name__ == "__main__":
+    demonstrate_compact_relay()
@@ -4,6 +4,9 @@ import json
 from datetime import datetime
 import random
 import string
+from BalanceSheet import BalanceSheet
+from BlockCache import LazyChain, estimate_block_size
+from BloomFilter import BloomFilter, BloomProbe, RecentTransactionFilter
 
 # Day 7 Challenge: Build a Complete Cryptocurrency System
 # This file contains the 5 main challenges from Day 7
@@ -12,34 +15,48 @@ import string
 # Challenge 1: Create a Transaction Class 🏦
 #=============================================================================
 class Transaction:
-    def __init__(self, sender, receiver, amount, fee=0):
+    extra_addresses = ()  # Addresses touched besides sender and receiver
+    
+    def __init__(self, sender, receiver, amount, fee=0, timestamp=None, nonce=None):
         self.sender = sender
         self.receiver = receiver
         self.amount = amount
         self.fee = fee
-        self.timestamp = datetime.now()
+        self.timestamp = timestamp or datetime.now()
+        self.nonce = nonce  # Optional per-sender sequence number (replay protection)
         self.transaction_id = self.generate_transaction_id()
         self.signature = None
         self.hash = self.calculate_hash()
     
-    def generate_transaction_id(self):
-        """Generate unique transaction ID"""
-        unique_string = f"{self.sender}{self.receiver}{self.amount}{self.timestamp}{random.randint(1000, 9999)}"
-        return hashlib.sha256(unique_string.encode()).hexdigest()[:16]
-    
-    def calculate_hash(self):
-        """Calculate transaction hash for integrity"""
-        transaction_data = {
+    def content(self):
+        """Fields covered by the transaction ID and hash"""
+        data = {
             "sender": self.sender,
             "receiver": self.receiver,
             "amount": self.amount,
             "fee": self.fee,
-            "timestamp": str(self.timestamp),
-            "transaction_id": self.transaction_id
+            "timestamp": str(self.timestamp)
         }
+        if self.nonce is not None:  # Transactions without a nonce keep their original IDs
+            data["nonce"] = self.nonce
+        return data
+    
+    def generate_transaction_id(self):
+        """Derive the transaction ID from its content (same content -> same ID)"""
+        id_string = json.dumps(self.content(), sort_keys=True)
+        return hashlib.sha256(id_string.encode()).hexdigest()
+    
+    def calculate_hash(self):
+        """Calculate transaction hash for integrity"""
+        transaction_data = self.content()
+        transaction_data["transaction_id"] = self.transaction_id
         transaction_string = json.dumps(transaction_data, sort_keys=True)
         return hashlib.sha256(transaction_string.encode()).hexdigest()
     
+    def addresses(self):
+        """Addresses this transaction touches (indexed by block address filters)"""
+        return (self.sender, self.receiver) + self.extra_addresses
+    
     def sign_transaction(self, private_key):
         """Digital signature for transaction security"""
         if self.sender == "System":  # Mining rewards don't need signatures
@@ -59,6 +76,10 @@ class Transaction:
         if self.sender != "System" and not self.signature:
             return False
         
+        # ID must match the content it was derived from
+        if self.transaction_id != self.generate_transaction_id():
+            return False
+        
         # Hash integrity check
         if self.hash != self.calculate_hash():
             return False
@@ -67,7 +88,7 @@ class Transaction:
     
     def to_dict(self):
         """Convert to dictionary for JSON serialization"""
-        return {
+        data = {
             "transaction_id": self.transaction_id,
             "sender": self.sender,
             "receiver": self.receiver,
@@ -77,6 +98,20 @@ class Transaction:
             "signature": self.signature,
             "hash": self.hash
         }
+        if self.nonce is not None:
+            data["nonce"] = self.nonce
+        return data
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a transaction received as a dictionary (see to_dict)"""
+        transaction = cls(data["sender"], data["receiver"], data["amount"], data["fee"],
+                          timestamp=datetime.fromisoformat(data["timestamp"]), nonce=data.get("nonce"))
+        # Keep the received ID and hash so is_valid() can detect tampering
+        transaction.transaction_id = data["transaction_id"]
+        transaction.signature = data["signature"]
+        transaction.hash = data["hash"]
+        return transaction
     
     def __repr__(self):
         return f"TX({self.sender[:8]}...→{self.receiver[:8]}...: {self.amount})"
@@ -85,12 +120,13 @@ class Transaction:
 # Challenge 2: Build a Wallet System 👛
 #=============================================================================
 class Wallet:
-    def __init__(self, name=None):
+    def __init__(self, name=None, private_key=None, verbose=True):
         self.name = name or f"User_{random.randint(1000, 9999)}"
-        self.private_key = self.generate_private_key()
+        self.private_key = private_key or self.generate_private_key()
         self.public_key = self.generate_public_key()
         self.address = self.generate_address()
-        print(f"💳 Created wallet '{self.name}' with address: {self.address[:20]}...")
+        if verbose:
+            print(f"💳 Created wallet '{self.name}' with address: {self.address[:20]}...")
     
     def generate_private_key(self):
         """Generate unique private key"""
@@ -108,10 +144,19 @@ class Wallet:
     
     def get_balance(self, blockchain):
         """Calculate wallet balance by scanning entire blockchain"""
+        # Chains with a state index (and possibly pruned blocks) answer directly
+        if hasattr(blockchain, 'balances'):
+            return blockchain.get_balance(self.address)
+        
         balance = 0
+        probe = BloomProbe(self.address)
         
         # Scan all blocks in the blockchain
         for block in blockchain.chain:
+            # Skip blocks whose address filter rules this wallet out
+            if hasattr(block, 'may_involve') and not block.may_involve(self.address, probe):
+                continue
+            
             # Skip genesis block (has no transactions)
             if hasattr(block, 'transactions') and block.transactions:
                 for tx in block.transactions:
@@ -125,13 +170,13 @@ class Wallet:
         
         return balance
     
-    def send_money(self, receiver_address, amount, fee=0):
-        """Create and sign a transaction"""
+    def send_money(self, receiver_address, amount, fee=0, nonce=None):
+        """Create and sign a transaction (see CryptocurrencyBlockchain.get_next_nonce)"""
         if not receiver_address or amount <= 0:
             raise ValueError("Invalid receiver address or amount")
         
         # Create transaction
-        transaction = Transaction(self.address, receiver_address, amount, fee)
+        transaction = Transaction(self.address, receiver_address, amount, fee, nonce=nonce)
         
         # Sign transaction with private key
         transaction.sign_transaction(self.private_key)
@@ -144,6 +189,35 @@ class Wallet:
 #=============================================================================
 # Challenge 3: Enhanced Blockchain with Transaction Support
 #=============================================================================
+EMPTY_MERKLE_ROOT = "0" * 64
+
+def calculate_merkle_root(transactions):
+    """Merkle root over the full transaction data (including signatures)"""
+    if not transactions:
+        return EMPTY_MERKLE_ROOT
+    
+    level = [hashlib.sha256(json.dumps(tx.to_dict(), sort_keys=True).encode()).hexdigest()
+             for tx in transactions]
+    while len(level) > 1:
+        if len(level) % 2 == 1:
+            level.append(level[-1])  # Odd count: pair the last hash with itself
+        level = [hashlib.sha256((level[i] + level[i + 1]).encode()).hexdigest()
+                 for i in range(0, len(level), 2)]
+    return level[0]
+
+def calculate_block_hash(index, timestamp, merkle_root, previous_hash, nonce):
+    """Hash of a block header (shared by blocks and standalone miners)"""
+    block_data = {
+        "index": index,
+        "timestamp": str(timestamp),
+        "merkle_root": merkle_root,
+        "previous_hash": previous_hash,
+        "nonce": nonce
+    }
+    
+    block_string = json.dumps(block_data, sort_keys=True)
+    return hashlib.sha256(block_string.encode()).hexdigest()
+
 class EnhancedBlock:
     def __init__(self, index, timestamp, transactions, previous_hash):
         self.index = index
@@ -151,25 +225,28 @@ class EnhancedBlock:
         self.transactions = transactions  # List of Transaction objects
         self.previous_hash = previous_hash
         self.nonce = 0
+        self.merkle_root = calculate_merkle_root(transactions)
         self.hash = self.calculate_hash()
+        self.address_filter = None  # Built once the block is mined
+        self.pruned = False  # True once the transaction bodies were discarded
+        self.pruned_transaction_count = 0
     
     def calculate_hash(self):
-        """Calculate block hash including all transaction data"""
-        # Convert transactions to dictionaries
-        transactions_data = [tx.to_dict() for tx in self.transactions]
-        
-        block_data = {
-            "index": self.index,
-            "timestamp": str(self.timestamp),
-            "transactions": transactions_data,
-            "previous_hash": self.previous_hash,
-            "nonce": self.nonce
-        }
-        
-        block_string = json.dumps(block_data, sort_keys=True)
-        return hashlib.sha256(block_string.encode()).hexdigest()
+        """Calculate block hash from the header (transactions via the Merkle root)"""
+        return calculate_block_hash(self.index, self.timestamp, self.merkle_root, self.previous_hash, self.nonce)
+    
+    def has_valid_merkle_root(self):
+        """Check the transactions match the committed Merkle root (never true once pruned)"""
+        return not self.pruned and self.merkle_root == calculate_merkle_root(self.transactions)
+    
+    def prune(self):
+        """Discard the transaction bodies, keeping the header and Merkle root"""
+        if not self.pruned:
+            self.pruned_transaction_count = len(self.transactions)
+            self.transactions = []
+            self.pruned = True
     
-    def mine_block(self, difficulty):
+    def mine_block(self, difficulty, address_filter_fp_rate=0.01):
         """Mine block with Proof of Work"""
         target = "0" * difficulty
         start_time = time.time()
@@ -185,19 +262,108 @@ class EnhancedBlock:
         
         end_time = time.time()
         print(f"✅ Block #{self.index} mined! Time: {end_time - start_time:.2f}s")
+        
+        self.build_address_filter(address_filter_fp_rate)
+    
+    def build_address_filter(self, fp_rate=0.01):
+        """Build a Bloom filter of every sender and receiver in this block"""
+        addresses = set()
+        for tx in self.transactions:
+            addresses.update(tx.addresses())
+        
+        # Round capacity up to a power of two so filters share geometries (see BloomProbe)
+        capacity = 1 << max(0, len(addresses) - 1).bit_length()
+        self.address_filter = BloomFilter(capacity, fp_rate)
+        for address in addresses:
+            self.address_filter.add(address)
+        return self.address_filter
+    
+    def may_involve(self, address, probe=None):
+        """False if no transaction in this block can touch the address"""
+        if self.address_filter is None:
+            return True
+        if probe is not None:
+            return probe.matches(self.address_filter)
+        return address in self.address_filter
+    
+    def header(self):
+        """Block fields without the transaction bodies"""
+        return {
+            "index": self.index,
+            "timestamp": str(self.timestamp),
+            "previous_hash": self.previous_hash,
+            "merkle_root": self.merkle_root,
+            "nonce": self.nonce,
+            "hash": self.hash,
+            "transaction_count": self.pruned_transaction_count if self.pruned else len(self.transactions)
+        }
+    
+    def to_dict(self):
+        """Convert to dictionary for JSON serialization"""
+        block_data = self.header()
+        block_data["transactions"] = [tx.to_dict() for tx in self.transactions]
+        return block_data
+    
+    @classmethod
+    def from_header(cls, header, transactions):
+        """Rebuild a block from its header and an ordered list of transactions"""
+        timestamp = header["timestamp"]
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        block = cls(header["index"], timestamp, transactions, header["previous_hash"])
+        block.nonce = header["nonce"]
+        block.hash = header["hash"]
+        return block
+    
+    @classmethod
+    def from_dict(cls, data):
+        """Rebuild a block received as a dictionary (see to_dict)"""
+        transactions = [Transaction.from_dict(tx) for tx in data["transactions"]]
+        return cls.from_header(data, transactions)
     
     def __repr__(self):
+        if self.pruned:
+            return f"Block({self.index}, {self.pruned_transaction_count} txs pruned)"
         return f"Block({self.index}, {len(self.transactions)} txs)"
 
 #=============================================================================
 # Challenge 4 & 5: Complete Blockchain with Mining Economy 💎
 #=============================================================================
+# Assume-valid checkpoints shipped with the node: (height, block hash) pairs.
+# During sync, ancestors of a matched checkpoint skip signature checks.
+ASSUME_VALID_CHECKPOINTS = []
+
 class CryptocurrencyBlockchain:
-    def __init__(self):
-        self.chain = [self.create_genesis_block()]
+    def __init__(self, block_store=None, block_cache=None):
+        # With a block store the chain is read lazily from disk through an LRU cache
+        if block_store is None:
+            self.chain = [self.create_genesis_block()]
+        else:
+            self.chain = LazyChain(block_store, block_cache)
+            if len(self.chain) == 0:
+                self.chain.append(self.create_genesis_block())
         self.difficulty = 3  # Mining difficulty
         self.pending_transactions = []  # Transaction pool
         self.mining_reward = 100  # Block reward for miners
+        self.seen_transactions = RecentTransactionFilter()  # Replay protection
+        self.address_filter_fp_rate = 0.01  # False-positive rate of per-block address filters
+        self.balances = {}  # State index: address -> confirmed balance
+        self.nonces = {}  # State index: address -> next confirmed nonce
+        self.pending_spends = {}  # Address -> amount + fee of its pending transactions
+        self.pending_nonces = {}  # Address -> next nonce after its pending transactions
+        self.block_executor = None  # Optional BlockExecution.BlockExecutor for large blocks
+        self.checkpoints = sorted(ASSUME_VALID_CHECKPOINTS)  # Assume-valid (height, hash) pairs
+        self.max_block_transactions = None  # Block capacity (None = every pending transaction fits)
+        self.fee_estimator = None  # Optional FeeEstimator.FeeEstimator fed by the pool and new blocks
+        self.mempool_log = None  # Optional MempoolLog.MempoolLog recording every pool change
+        self.state_service = None  # Optional ShardedState.ShardedStateService mirroring the state index
+        self.event_bus = None  # Optional ChainEvents.EventBus notifying subscribers of chain and pool changes
+        self.prune_depth = None  # Keep bodies of this many recent blocks (None = keep all)
+        self.pruned_height = 0  # Every block at or below this height is pruned
+        self.pruning_stats = {"pruned_blocks": 0, "transactions_discarded": 0, "bytes_reclaimed": 0}
+        
+        if block_store is not None:
+            self.rebuild_state_index()
     
     def create_genesis_block(self):
         """Create the first block in the chain"""
@@ -207,20 +373,118 @@ class CryptocurrencyBlockchain:
         """Get the most recent block"""
         return self.chain[-1]
     
-    def create_transaction(self, transaction):
-        """Add transaction to pending pool after validation"""
-        if transaction.is_valid():
-            self.pending_transactions.append(transaction)
+    def create_transaction(self, transaction, verbose=True):
+        """Add transaction to pending pool after validation (verbose=False: no prints)"""
+        if transaction.transaction_id in self.seen_transactions:
+            if verbose:
+                print(f"❌ Duplicate transaction rejected: {transaction}")
+            return False
+        
+        if not transaction.is_valid():
+            if verbose:
+                print(f"❌ Invalid transaction rejected: {transaction}")
+            return False
+        
+        problem = self.check_spendable(transaction)
+        if problem:
+            if verbose:
+                print(f"❌ Transaction rejected ({problem}): {transaction}")
+            return False
+        
+        # Logged first: a transaction the log cannot record must not reach the pool
+        if self.mempool_log is not None:
+            self.mempool_log.log_add(transaction)
+        self.pending_transactions.append(transaction)
+        self.seen_transactions.add(transaction.transaction_id)
+        self.track_pending(transaction)
+        if self.fee_estimator is not None:
+            self.fee_estimator.track_transaction(transaction, len(self.chain) - 1)
+        if self.event_bus is not None:
+            self.event_bus.transaction_admitted(transaction, len(self.chain) - 1)
+        if verbose:
             print(f"📝 Transaction added: {transaction}")
-        else:
-            print(f"❌ Invalid transaction rejected: {transaction}")
+        return True
     
-    def mine_pending_transactions(self, mining_reward_address):
-        """Mine all pending transactions and reward the miner"""
-        print(f"\n⛏️  Mining {len(self.pending_transactions)} pending transactions...")
+    def restore_pending(self, transactions):
+        """
+        Re-admit pool transactions saved before a restart; returns how many were kept.
+        
+        They were verified when first admitted, so only what may have changed
+        since is checked: already confirmed, or no longer spendable.
+        """
+        remaining = [tx for tx in transactions if tx.transaction_id not in self.seen_transactions]
+        restored = 0
+        while remaining:  # Repeat while progress is made (nonce order may differ from log order)
+            deferred = []
+            for tx in remaining:
+                if self.check_spendable(tx):
+                    deferred.append(tx)
+                    continue
+                self.pending_transactions.append(tx)
+                self.seen_transactions.add(tx.transaction_id)
+                self.track_pending(tx)
+                if self.fee_estimator is not None:
+                    self.fee_estimator.track_transaction(tx, len(self.chain) - 1)
+                if self.event_bus is not None:
+                    self.event_bus.transaction_admitted(tx, len(self.chain) - 1)
+                restored += 1
+            if len(deferred) == len(remaining):
+                break
+            remaining = deferred
+        return restored
+    
+    def get_spendable_balance(self, address):
+        """Confirmed balance minus what the address already spends in the pending pool"""
+        return self.balances.get(address, 0) - self.pending_spends.get(address, 0)
+    
+    def get_next_nonce(self, address):
+        """Nonce the address's next transaction must carry (if it uses nonces)"""
+        return self.pending_nonces.get(address, self.nonces.get(address, 0))
+    
+    def check_spendable(self, transaction):
+        """Reason the sender cannot make this transaction right now, or None (O(1))"""
+        if transaction.sender == "System":
+            return "coinbase transactions are only valid in blocks"
+        if transaction.nonce is not None:
+            expected = self.get_next_nonce(transaction.sender)
+            if transaction.nonce != expected:
+                return f"nonce {transaction.nonce}, expected {expected}"
+        if transaction.amount + transaction.fee > self.get_spendable_balance(transaction.sender):
+            return "insufficient funds"
+        return None
+    
+    def track_pending(self, transaction):
+        """Add an admitted transaction to its sender's pending tallies"""
+        sender = transaction.sender
+        self.pending_spends[sender] = self.pending_spends.get(sender, 0) + transaction.amount + transaction.fee
+        if transaction.nonce is not None:
+            self.pending_nonces[sender] = transaction.nonce + 1
+    
+    def revalidate_pending(self):
+        """Rebuild the pending tallies against the current state, evicting what no longer fits"""
+        self.pending_spends = {}
+        self.pending_nonces = {}
+        kept = []
+        for tx in self.pending_transactions:
+            if self.check_spendable(tx):
+                self.seen_transactions.discard(tx.transaction_id)
+                if self.mempool_log is not None:
+                    self.mempool_log.log_remove(tx.transaction_id)
+                if self.event_bus is not None:
+                    self.event_bus.transaction_evicted(tx, len(self.chain) - 1)
+                print(f"🗑️  Evicted from pool (no longer spendable): {tx}")
+                continue
+            self.track_pending(tx)
+            kept.append(tx)
+        self.pending_transactions = kept
+    
+    def create_block_template(self, mining_reward_address, transactions=None):
+        """Build an unmined block: coinbase + pending transactions on top of the tip"""
+        if transactions is None:
+            transactions = self.select_transactions()
         
         # Calculate total transaction fees
-        total_fees = sum(tx.fee for tx in self.pending_transactions)
+        total_fees = sum(tx.fee for tx in transactions)
         
         # Create coinbase transaction (mining reward)
         mining_reward_tx = Transaction(
@@ -232,43 +496,380 @@ class CryptocurrencyBlockchain:
         mining_reward_tx.sign_transaction("SYSTEM_KEY")
         
         # Create block with all transactions
-        all_transactions = [mining_reward_tx] + self.pending_transactions
+        all_transactions = [mining_reward_tx] + transactions
         
-        new_block = EnhancedBlock(
+        return EnhancedBlock(
             index=len(self.chain),
             timestamp=datetime.now(),
             transactions=all_transactions,
             previous_hash=self.get_latest_block().hash
         )
+    
+    def select_transactions(self):
+        """Pending transactions for the next block: all of them, or the best-paying that fit"""
+        capacity = self.max_block_transactions
+        if capacity is None or len(self.pending_transactions) <= capacity:
+            return list(self.pending_transactions)
+        
+        # Highest fee first; a nonce-carrying transaction waits for its predecessor
+        selected = []
+        next_nonces = {}
+        waiting = {}  # (sender, nonce) -> transaction whose predecessor is not selected yet
+        for tx in sorted(self.pending_transactions, key=lambda tx: tx.fee, reverse=True):
+            ready = [tx]
+            while ready and len(selected) < capacity:
+                tx = ready.pop()
+                if tx.nonce is not None:
+                    expected = next_nonces.get(tx.sender, self.nonces.get(tx.sender, 0))
+                    if tx.nonce != expected:
+                        waiting[(tx.sender, tx.nonce)] = tx
+                        continue
+                    next_nonces[tx.sender] = tx.nonce + 1
+                    follower = waiting.pop((tx.sender, tx.nonce + 1), None)
+                    if follower is not None:
+                        ready.append(follower)
+                selected.append(tx)
+            if len(selected) >= capacity:
+                break
+        return selected
+    
+    def estimate_fee(self, target_blocks=3):
+        """Fee to confirm within target_blocks, from the fee estimator (None without one or without data)"""
+        if self.fee_estimator is None:
+            return None
+        return self.fee_estimator.estimate_fee(target_blocks)
+    
+    def mine_pending_transactions(self, mining_reward_address):
+        """Mine pending transactions (as many as fit in a block) and reward the miner"""
+        new_block = self.create_block_template(mining_reward_address)
+        included = len(new_block.transactions) - 1
+        if included == len(self.pending_transactions):
+            print(f"\n⛏️  Mining {included} pending transactions...")
+        else:
+            print(f"\n⛏️  Mining {included} of {len(self.pending_transactions)} pending transactions (block full)...")
+        
+        total_fees = sum(tx.fee for tx in new_block.transactions)
         
         # Mine the block
-        new_block.mine_block(self.difficulty)
+        new_block.mine_block(self.difficulty, self.address_filter_fp_rate)
         
-        # Add to blockchain and clear pending transactions
-        self.chain.append(new_block)
-        self.pending_transactions = []
+        # Add to blockchain and clear the mined transactions from the pool
+        self.connect_block(new_block)
+        self.remove_confirmed_transactions(new_block)
         
         print(f"💰 Miner earned: {self.mining_reward} (reward) + {total_fees} (fees) = {self.mining_reward + total_fees}")
         print(f"📦 Block #{new_block.index} added to blockchain!\n")
         
         return new_block
     
+    def add_block(self, block):
+        """Validate a block mined elsewhere and append it to the chain"""
+        problem = self.check_block(block)
+        if problem:
+            print(f"❌ Block #{block.index} rejected: {problem}")
+            return False
+        
+        block.build_address_filter(self.address_filter_fp_rate)
+        self.connect_block(block)
+        self.remove_confirmed_transactions(block)
+        
+        print(f"📦 Block #{block.index} received and added to blockchain!")
+        return True
+    
+    def check_block(self, block, verify_signatures=True):
+        """Reason a block cannot extend the tip, or None if it can"""
+        latest_block = self.get_latest_block()
+        
+        if block.index != latest_block.index + 1 or block.previous_hash != latest_block.hash:
+            return "does not extend the chain tip"
+        
+        if block.hash != block.calculate_hash() or not block.hash.startswith("0" * self.difficulty):
+            return "invalid hash or proof of work"
+        
+        # Only local pruning may drop bodies; a pruned block from elsewhere cannot be validated
+        if block.pruned:
+            return "pruned block (no transactions to validate)"
+        
+        # Below an assume-valid checkpoint signatures and transaction hashes are trusted
+        if verify_signatures:
+            for tx in block.transactions:
+                if not tx.is_valid():
+                    return f"invalid transaction {tx}"
+        
+        problem = self.check_duplicates(block)
+        if problem:
+            return problem
+        
+        if not block.has_valid_merkle_root():
+            return "transactions do not match the Merkle root"
+        
+        return self.check_block_state(block)
+    
+    def check_duplicates(self, block):
+        """Reason a block repeats a transaction (within itself or from the chain), or None"""
+        pending_ids = {tx.transaction_id for tx in self.pending_transactions}
+        block_ids = set()
+        for tx in block.transactions:
+            # Already-seen IDs are only fine if they are waiting in our pool
+            tx_id = tx.transaction_id
+            if tx_id in block_ids or (tx_id in self.seen_transactions and tx_id not in pending_ids):
+                return f"duplicate transaction {tx}"
+            block_ids.add(tx_id)
+        return None
+    
+    def check_block_state(self, block):
+        """Replay a block against the state index: funds, nonces and coinbase amount"""
+        changed = {}  # Balances touched so far in this block
+        next_nonces = {}
+        minted = fees = 0
+        for tx in block.transactions:
+            if tx.sender == "System":
+                minted += tx.amount
+                changed[tx.receiver] = changed.get(tx.receiver, self.balances.get(tx.receiver, 0)) + tx.amount
+                continue
+            if tx.nonce is not None:
+                expected = next_nonces.get(tx.sender, self.nonces.get(tx.sender, 0))
+                if tx.nonce != expected:
+                    return f"nonce {tx.nonce}, expected {expected} in {tx}"
+                next_nonces[tx.sender] = tx.nonce + 1
+            balance = changed.get(tx.sender, self.balances.get(tx.sender, 0))
+            if tx.amount + tx.fee > balance:
+                return f"insufficient funds in {tx}"
+            changed[tx.sender] = balance - (tx.amount + tx.fee)
+            changed[tx.receiver] = changed.get(tx.receiver, self.balances.get(tx.receiver, 0)) + tx.amount
+            fees += tx.fee
+        if minted > self.mining_reward + fees:
+            return "coinbase pays more than the block reward plus fees"
+        return None
+    
+    def add_checkpoint(self, height, block_hash):
+        """Trust the block with this hash at this height (and its ancestors) as assume-valid"""
+        self.checkpoints.append((height, block_hash))
+        self.checkpoints.sort()
+    
+    def assume_valid_height(self, blocks):
+        """
+        Highest checkpoint height matched by `blocks` (a chain indexed by height), or -1.
+        
+        Callers must check the linkage of blocks up to that height; the blocks
+        below a matched checkpoint are then its ancestors.
+        """
+        for height, block_hash in reversed(self.checkpoints):
+            if height < len(blocks) and blocks[height] is not None and blocks[height].hash == block_hash:
+                return height
+        return -1
+    
+    def sync_blocks(self, blocks, full_verification=False):
+        """
+        Initial sync: validate and connect blocks that extend the tip, in order.
+        
+        Headers (hash, linkage, proof of work) are checked first for the whole
+        batch; blocks at or below a matched assume-valid checkpoint then skip
+        signature checks, everything else is verified as in add_block. Returns
+        the number of blocks connected (stops at the first invalid block).
+        """
+        blocks = list(blocks)
+        tip = self.get_latest_block()
+        previous_hash = tip.hash
+        for count, block in enumerate(blocks):
+            if block.index != tip.index + 1 + count or block.previous_hash != previous_hash or \
+                    block.hash != block.calculate_hash() or not block.hash.startswith("0" * self.difficulty):
+                print(f"❌ Sync stopped: bad header at block #{block.index}")
+                blocks = blocks[:count]
+                break
+            previous_hash = block.hash
+        
+        trusted_height = -1
+        if not full_verification:
+            by_height = [None] * (tip.index + 1 + len(blocks))
+            by_height[tip.index] = tip
+            for block in blocks:
+                by_height[block.index] = block
+            trusted_height = self.assume_valid_height(by_height)
+        
+        connected = 0
+        start_time = time.time()
+        for block in blocks:
+            problem = self.check_block(block, verify_signatures=block.index > trusted_height)
+            if problem:
+                print(f"❌ Sync stopped: block #{block.index} rejected: {problem}")
+                break
+            block.build_address_filter(self.address_filter_fp_rate)
+            self.connect_block(block)
+            self.remove_confirmed_transactions(block)
+            connected += 1
+        
+        assumed = max(0, min(trusted_height, tip.index + connected) - tip.index)
+        print(f"🔄 Synced {connected} blocks in {time.time() - start_time:.2f}s "
+              f"({assumed} below an assume-valid checkpoint)")
+        return connected
+    
+    def connect_block(self, block):
+        """Append a validated block and update the state index"""
+        self.chain.append(block)
+        self.apply_block_to_state(block)
+        if self.state_service is not None:
+            committed, reason = self.state_service.apply_block(block)
+            if not committed:  # Out of step with the chain: resync rather than refuse every later block
+                print(f"⚠️  Sharded state refused block #{block.index} ({reason}), reloading it")
+                self.state_service.load(self.balances, self.nonces, block.index)
+        for tx in block.transactions:
+            self.seen_transactions.add(tx.transaction_id)
+        if self.event_bus is not None:
+            self.event_bus.block_connected(block)
+        if self.prune_depth is not None:
+            self.prune_old_blocks()
+    
+    def remove_confirmed_transactions(self, block):
+        """Drop transactions included in a block from the pending pool"""
+        confirmed_ids = {tx.transaction_id for tx in block.transactions}
+        if self.mempool_log is not None:
+            for tx in self.pending_transactions:
+                if tx.transaction_id in confirmed_ids:
+                    self.mempool_log.log_remove(tx.transaction_id)
+        self.pending_transactions = [tx for tx in self.pending_transactions
+                                     if tx.transaction_id not in confirmed_ids]
+        self.revalidate_pending()
+        if self.fee_estimator is not None:
+            self.fee_estimator.process_block(block.index, block.transactions, self.pending_transactions,
+                                             capacity=self.max_block_transactions)
+        if self.mempool_log is not None:
+            self.mempool_log.checkpoint(self.pending_transactions)
+    
+    def disconnect_tip(self):
+        """Remove the tip block (reorg), revert its state and re-queue its transactions"""
+        if len(self.chain) < 2:
+            raise ValueError("Cannot disconnect the genesis block")
+        block = self.chain[-1]
+        if block.pruned:
+            raise ValueError(f"Cannot disconnect pruned block #{block.index}")
+        
+        self.chain.pop()
+        balances = self.balances
+        for tx in reversed(block.transactions):
+            balances[tx.receiver] -= tx.amount
+            if tx.sender != "System":
+                balances[tx.sender] += tx.amount + tx.fee
+            if tx.nonce is not None:
+                self.nonces[tx.sender] = tx.nonce
+            self.seen_transactions.discard(tx.transaction_id)
+        return self.finish_disconnect(block)
+    
+    def finish_disconnect(self, block):
+        """
+        Second half of disconnect_tip, shared by every state model: once the
+        block is off the chain and its state reverted, notify the hooks and put
+        its transactions back in the pool.
+        """
+        if self.event_bus is not None:
+            self.event_bus.block_disconnected(block)
+        
+        # Coinbase transactions are only valid in the block that created them
+        returned = [tx for tx in block.transactions if tx.sender != "System"]
+        for tx in returned:
+            self.seen_transactions.add(tx.transaction_id)
+            if self.mempool_log is not None:
+                self.mempool_log.log_add(tx)
+            if self.event_bus is not None:
+                self.event_bus.transaction_admitted(tx, len(self.chain) - 1)
+        self.pending_transactions = returned + self.pending_transactions
+        self.revalidate_pending()
+        
+        # Only now that chain, state and pool agree: a failed rollback can reload from them
+        if self.state_service is not None:
+            rolled_back, reason = self.state_service.rollback_block(block)
+            if not rolled_back:
+                print(f"⚠️  Sharded state could not roll back #{block.index} ({reason}), reloading it")
+                self.state_service.load(self.balances, self.nonces, len(self.chain) - 1)
+        
+        print(f"↩️  Block #{block.index} disconnected, {len(returned)} transactions back in the pool")
+        return block
+    
+    def rebuild_state_index(self):
+        """Recompute balances and recent transaction IDs from the stored chain"""
+        self.balances = {}
+        self.nonces = {}
+        for block in self.chain:
+            self.apply_block_to_state(block)
+            for tx in block.transactions:
+                self.seen_transactions.add(tx.transaction_id)
+        if self.state_service is not None:
+            self.state_service.load(self.balances, self.nonces, len(self.chain) - 1)
+    
+    def apply_block_to_state(self, block):
+        """Apply a block's transfers to the balance index (in block order)"""
+        if self.block_executor is not None:
+            self.block_executor.execute(self.balances, self.nonces, block.transactions)
+            return
+        balances = self.balances
+        for tx in block.transactions:
+            balances[tx.receiver] = balances.get(tx.receiver, 0) + tx.amount
+            if tx.sender != "System":  # Mining rewards create new coins
+                balances[tx.sender] = balances.get(tx.sender, 0) - (tx.amount + tx.fee)
+            if tx.nonce is not None:
+                self.nonces[tx.sender] = tx.nonce + 1
+    
+    def enable_pruning(self, depth):
+        """Keep transaction bodies only for the most recent `depth` blocks"""
+        if depth < 1:
+            raise ValueError("Pruning depth must be at least 1 block")
+        if isinstance(self.chain, LazyChain):
+            # Startup rebuilds the state index by replaying the stored bodies, so they must stay on disk
+            raise ValueError("Pruning is only supported for in-memory chains, not store-backed ones")
+        self.prune_depth = depth
+        self.prune_old_blocks()
+    
+    def prune_old_blocks(self):
+        """Discard bodies of blocks deeper than prune_depth"""
+        prune_to = len(self.chain) - 1 - self.prune_depth
+        for height in range(self.pruned_height + 1, prune_to + 1):
+            block = self.chain[height]
+            if block.pruned:
+                continue
+            self.pruning_stats["pruned_blocks"] += 1
+            self.pruning_stats["transactions_discarded"] += len(block.transactions)
+            size_before = estimate_block_size(block)
+            block.prune()
+            self.pruning_stats["bytes_reclaimed"] += size_before - estimate_block_size(block)
+        self.pruned_height = max(self.pruned_height, prune_to)
+    
+    def get_pruning_report(self):
+        """How much transaction data pruning has discarded so far (bytes: estimated memory freed)"""
+        report = dict(self.pruning_stats)
+        report["prune_depth"] = self.prune_depth
+        report["pruned_height"] = self.pruned_height
+        report["chain_height"] = len(self.chain) - 1
+        return report
+    
     def get_balance(self, address):
-        """Get balance for any address"""
-        balance = 0
+        """Get balance for any address from the state index"""
+        return self.balances.get(address, 0)
+    
+    def get_balance_sheet(self):
+        """Every address's balance at the tip, copied from the state index (no chain scan)"""
+        tip = self.get_latest_block()
+        return BalanceSheet(dict(self.balances), tip.index, tip.hash)
+    
+    def get_transaction_history(self, address):
+        """List (block index, transaction) pairs that involve an address (unpruned blocks only)"""
+        history = []
+        probe = BloomProbe(address)
         
         for block in self.chain:
-            if hasattr(block, 'transactions'):
-                for tx in block.transactions:
-                    if tx.receiver == address:
-                        balance += tx.amount
-                    if tx.sender == address:
-                        balance -= (tx.amount + tx.fee)
+            if not block.may_involve(address, probe):
+                continue
+            for tx in block.transactions:
+                if tx.sender == address or tx.receiver == address or address in tx.extra_addresses:
+                    history.append((block.index, tx))
         
-        return balance
+        return history
     
-    def is_chain_valid(self):
-        """Validate entire blockchain"""
+    def is_chain_valid(self, full_verification=False):
+        """Validate entire blockchain (ancestors of a matched checkpoint skip signature checks)"""
+        total_transactions = sum(len(block.transactions) for block in self.chain)
+        seen_ids = RecentTransactionFilter(capacity=total_transactions)
+        trusted_height = -1 if full_verification else self.assume_valid_height(self.chain)
+        
         for i in range(1, len(self.chain)):
             current_block = self.chain[i]
             previous_block = self.chain[i-1]
@@ -281,10 +882,21 @@ class CryptocurrencyBlockchain:
             if current_block.previous_hash != previous_block.hash:
                 return False
             
-            # Validate all transactions
+            # Blocks we pruned ourselves only keep their header; the rest must match the Merkle root
+            if current_block.pruned:
+                if i > self.pruned_height:
+                    return False
+            elif not current_block.has_valid_merkle_root():
+                return False
+            
+            # Validate all transactions and reject replays
+            verify_signatures = i > trusted_height
             for tx in current_block.transactions:
-                if not tx.is_valid():
+                if verify_signatures and not tx.is_valid():
+                    return False
+                if tx.transaction_id in seen_ids:
                     return False
+                seen_ids.add(tx.transaction_id)
         
         return True
 
@@ -340,7 +952,7 @@ def demonstrate_cryptocurrency():
     print(f"\n🎯 Step 4: Complex transaction scenario")
     tx3 = alice.send_money(charlie.address, 10, fee=0.5)
     tx4 = bob.send_money(charlie.address, 15, fee=0.5)
-    tx5 = charlie.send_money(alice.address, 5, fee=0.25)  # Charlie will get money first
+    tx5 = charlie.send_money(alice.address, 5, fee=0.25)  # Rejected: Charlie's coins are still unconfirmed
     
     blockchain.create_transaction(tx3)
     blockchain.create_transaction(tx4)
@@ -349,12 +961,14 @@ def demonstrate_cryptocurrency():
     # Mine final block
     blockchain.mine_pending_transactions(miner.address)
     
-    # Final results
+    # Final results: one balance sheet instead of a lookup per wallet
+    balance_sheet = blockchain.get_balance_sheet()
     print(f"\n💰 Final Balances:")
-    print(f"   Alice: {alice.get_balance(blockchain)} coins")
-    print(f"   Bob: {bob.get_balance(blockchain)} coins") 
-    print(f"   Charlie: {charlie.get_balance(blockchain)} coins")
-    print(f"   Miner: {miner.get_balance(blockchain)} coins")
+    for wallet in (alice, bob, charlie, miner):
+        print(f"   {wallet.name}: {balance_sheet.get(wallet.address)} coins")
+    print(f"\n🏆 Rich list (top 3):")
+    for rank, (address, balance) in enumerate(balance_sheet.ranked(top=3), 1):
+        print(f"   {rank}. {address[:16]}... {balance} coins")
     
     # Blockchain summary
     print(f"\n📊 Blockchain Summary:")
@@ -0,0 +1,205 @@
+import contextlib
+import io
+import math
+import random
+import sys
+import time
+
+# Fee estimation from confirmation history and the live pool
+# Transactions here are fixed-shape transfers and blocks are limited by a
+# transaction count (max_block_transactions), so the fee rate is simply the
+# fee per transaction. Fees fall into exponentially spaced buckets.
+#
+# Per bucket the estimator keeps exponentially decayed counts of confirmed
+# transactions and of those confirmed within 1..max_target blocks of entering
+# the pool. Transactions still waiting count as failures for every target
+# they have already missed. After each block it also snapshots pool depth per
+# bucket: with a block capacity, a fee must be in the best target * capacity
+# pool transactions to have a chance within `target` blocks.
+#
+# All of this is recomputed once per block, so estimate_fee() is a table lookup.
+#
+# Use it through the blockchain:
+#     blockchain.fee_estimator = FeeEstimator()
+#     fee = blockchain.estimate_fee(target_blocks=2)
+
+
+class FeeEstimator:
+    def __init__(self, max_target=24, min_fee=0.0001, max_fee=1000.0, spacing=1.1,
+                 decay=0.998, success_threshold=0.85, min_samples=20):
+        self.max_target = max_target
+        self.min_fee = min_fee
+        self.spacing = spacing
+        self.decay = decay  # Per block: older confirmations gradually count less
+        self.success_threshold = success_threshold  # Share that must confirm in time
+        self.min_samples = min_samples  # Confirmations needed before a fee range is judged
+        self.num_buckets = 2 + int(math.log(max_fee / min_fee) / math.log(spacing))
+        # bounds[b] is the lowest fee in bucket b (bucket 0 holds fees below min_fee)
+        self.bounds = [0.0] + [min_fee * spacing ** i for i in range(self.num_buckets - 1)]
+        self._log_spacing = math.log(spacing)
+
+        self.confirmed = [0.0] * self.num_buckets  # Decayed count of confirmations per bucket
+        # confirmed_within[t][b]: decayed count confirmed in at most t blocks (t = 1..max_target)
+        self.confirmed_within = [[0.0] * self.num_buckets for _ in range(max_target + 1)]
+        self.entries = {}  # Transaction ID -> (height when it entered the pool, bucket)
+        self.capacity = None  # Block capacity in transactions, learned from the blockchain
+        self.estimates = [None] * (max_target + 1)  # Target -> fee, rebuilt every block
+        self.stats = {"blocks": 0, "tracked": 0, "confirmed": 0, "last_update_ms": 0.0}
+
+    def bucket_for(self, fee):
+        if fee < self.min_fee:
+            return 0
+        return min(self.num_buckets - 1, 1 + int(math.log(fee / self.min_fee) / self._log_spacing + 1e-9))
+
+    def track_transaction(self, transaction, height):
+        """A transaction entered the pool while the tip was at `height`"""
+        self.entries[transaction.transaction_id] = (height, self.bucket_for(transaction.fee))
+        self.stats["tracked"] += 1
+
+    def process_block(self, height, transactions, pending, capacity=None):
+        """Record the block's confirmations and rebuild the estimate table"""
+        start_time = time.perf_counter()
+        if capacity is not None:
+            self.capacity = capacity
+        decay = self.decay
+        self.confirmed = [count * decay for count in self.confirmed]
+        self.confirmed_within = [[count * decay for count in row] for row in self.confirmed_within]
+
+        for tx in transactions:
+            entry = self.entries.pop(tx.transaction_id, None)
+            if entry is None:  # Coinbase, or never seen in our pool
+                continue
+            entered, bucket = entry
+            blocks = max(1, height - entered)
+            self.confirmed[bucket] += 1
+            for target in range(blocks, self.max_target + 1):
+                self.confirmed_within[target][bucket] += 1
+            self.stats["confirmed"] += 1
+
+        # Live pool snapshot: depth per bucket and how long each transaction has waited
+        depth = [0] * self.num_buckets
+        waited_at_least = [[0] * self.num_buckets for _ in range(self.max_target + 1)]
+        entries = {}
+        for tx in pending:
+            entry = self.entries.get(tx.transaction_id)
+            if entry is None:
+                continue
+            entries[tx.transaction_id] = entry
+            entered, bucket = entry
+            depth[bucket] += 1
+            for target in range(1, min(height - entered, self.max_target) + 1):
+                waited_at_least[target][bucket] += 1
+        self.entries = entries  # Drops transactions evicted from the pool
+
+        for target in range(1, self.max_target + 1):
+            history = self._history_estimate(target, waited_at_least[target])
+            pool = self._pool_estimate(target, depth)
+            candidates = [fee for fee in (history, pool) if fee is not None]
+            self.estimates[target] = max(candidates) if candidates else None
+        self.stats["blocks"] += 1
+        self.stats["last_update_ms"] = (time.perf_counter() - start_time) * 1000
+
+    def _history_estimate(self, target, waiting):
+        """
+        Lowest bucket bound from which fee ranges keep confirming within `target`.
+
+        Buckets are scanned from the top and grouped until each group has
+        min_samples outcomes; the scan stops at the first group that misses
+        the success threshold.
+        """
+        within = self.confirmed_within[target]
+        best = None
+        successes = outcomes = 0.0
+        for bucket in range(self.num_buckets - 1, -1, -1):
+            successes += within[bucket]
+            outcomes += self.confirmed[bucket] + waiting[bucket]
+            if outcomes < self.min_samples:
+                continue
+            if successes / outcomes < self.success_threshold:
+                break
+            best = self.bounds[bucket]
+            successes = outcomes = 0.0
+        return best
+
+    def _pool_estimate(self, target, depth):
+        """Lowest bucket bound that is still within the best target * capacity pool transactions"""
+        if self.capacity is None:
+            return None
+        room = target * self.capacity
+        ahead = 0
+        for bucket in range(self.num_buckets - 1, -1, -1):
+            ahead += depth[bucket]
+            if ahead >= room:
+                # This bucket only partly fits: outbid it
+                return self.bounds[min(bucket + 1, self.num_buckets - 1)]
+        return None  # Everything waiting fits in time
+
+    def estimate_fee(self, target_blocks):
+        """Fee that should confirm within target_blocks (O(1)); None until enough data"""
+        target = min(max(1, target_blocks), self.max_target)
+        return self.estimates[target]
+
+    def __repr__(self):
+        return (f"FeeEstimator({self.num_buckets} buckets, {len(self.entries)} tracked in pool, "
+                f"{self.stats['confirmed']} confirmations seen)")
+
+#=============================================================================
+# DEMONSTRATION: a congested chain with fee competition
+#=============================================================================
+def demonstrate_fee_estimation(num_blocks=80, arrivals_per_block=130, capacity=100):
+    from Day4_TransactionSystem import CryptocurrencyBlockchain
+    from SyntheticWorkload import WorkloadConfig, WorkloadGenerator, make_genesis
+    from datetime import datetime, timedelta
+
+    print("🚀 Fee Estimation Demo")
+    print("=" * 60)
+    config = WorkloadConfig(num_wallets=3000, fee_distribution="exponential", fee_mean=0.05)
+    generator = WorkloadGenerator(config)
+    blockchain = CryptocurrencyBlockchain()
+    blockchain.difficulty = 0
+    blockchain.chain = [make_genesis()]
+    blockchain.max_block_transactions = capacity
+    estimator = FeeEstimator()
+    blockchain.fee_estimator = estimator
+    rng = random.Random(7)
+    clock = datetime(2024, 1, 1)
+
+    # Track actual confirmation delays to check the estimates afterwards
+    submitted = {}  # Transaction ID -> (height, fee)
+    delays = []  # (fee, blocks to confirm)
+    print(f"📈 {arrivals_per_block} arrivals per block, room for {capacity}: the pool keeps growing "
+          f"and low fees wait")
+    with contextlib.redirect_stdout(io.StringIO()):
+        blockchain.connect_block(generator.allocation_block(blockchain))
+        for height in range(2, num_blocks + 2):
+            for _ in range(rng.randint(arrivals_per_block - 20, arrivals_per_block + 20)):
+                clock += timedelta(milliseconds=1)
+                tx = generator.next_transaction(clock, blockchain.get_spendable_balance)
+                if tx is not None and blockchain.create_transaction(tx):
+                    submitted[tx.transaction_id] = (height - 1, tx.fee)
+            block = blockchain.mine_pending_transactions(generator.addresses[0])
+            for tx in block.transactions:
+                entry = submitted.pop(tx.transaction_id, None)
+                if entry is not None:
+                    delays.append((entry[1], height - entry[0]))
+
+    print(f"   Height {len(blockchain.chain) - 1}, pool {len(blockchain.pending_transactions)} transactions, "
+          f"{estimator}, last update {estimator.stats['last_update_ms']:.2f} ms")
+    print(f"\n🎯 Estimates vs what actually happened at that fee or more:")
+    for target in (1, 2, 3, 6, 12):
+        fee = blockchain.estimate_fee(target)
+        if fee is None:
+            print(f"   within {target:>2} blocks: no estimate yet")
+            continue
+        outcomes = [blocks for paid, blocks in delays if paid >= fee]
+        on_time = sum(1 for blocks in outcomes if blocks <= target) / len(outcomes) if outcomes else 0.0
+        print(f"   within {target:>2} blocks: fee {fee:.4f} -> {on_time * 100:.0f}% of {len(outcomes)} such "
+              f"transactions confirmed in time")
+
+    start_time = time.perf_counter()
+    for _ in range(100000):
+        estimator.estimate_fee(3)
+    print(f"\n⚡ estimate_fee: {(time.perf_counter() - start_time) / 100000 * 1e9:.0f} ns per call")
+
+if __name__ == "__main__":
+    demonstrate_fee_estimation(int(sys.argv[1]) if len(sys.argv) > 1 else 80)
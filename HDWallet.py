@@ -0,0 +1,158 @@
+import hashlib
+import hmac
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from Day4_TransactionSystem import Wallet
+
+# Hierarchical deterministic wallets
+# Every child key is derived from one seed and an index, so a whole keystore
+# is backed up by its seeds alone and addresses can be regenerated at will.
+# Child keys go through the same public key / address steps as Wallet.
+
+SEED_KEY = b"BlockchainInPython HD seed"
+
+def master_key_from_seed(seed):
+    return hmac.digest(SEED_KEY, seed, "sha512")
+
+def derive_private_key(master_key, index):
+    """Child private key for an index (64 hex characters, like Wallet keys)"""
+    return hmac.digest(master_key, index.to_bytes(8, "big"), "sha256").hex()
+
+def address_from_private_key(private_key):
+    """Same steps as Wallet.generate_public_key + generate_address"""
+    return "1" + hashlib.sha256(private_key.encode()).hexdigest()[:30]
+
+def derive_address_batch(master_key, start, count):
+    """Addresses for indexes start .. start+count-1 (runs in worker processes)"""
+    return [address_from_private_key(derive_private_key(master_key, index))
+            for index in range(start, start + count)]
+
+
+class HDWallet:
+    def __init__(self, seed=None, name="HD"):
+        self.name = name
+        self.seed = seed if seed is not None else os.urandom(32)
+        self.master_key = master_key_from_seed(self.seed)
+        self.next_index = 0  # Number of addresses handed out so far
+
+    def derive_wallet(self, index):
+        """Full Wallet (with signing key) for one child index"""
+        return Wallet(f"{self.name}/{index}", private_key=derive_private_key(self.master_key, index), verbose=False)
+
+    def derive_addresses(self, start, count, workers=None, batch_size=50000):
+        """Derive a range of addresses, in parallel batches when it pays off"""
+        if workers is None:
+            workers = os.cpu_count() or 1
+        if workers <= 1 or count <= batch_size:
+            return derive_address_batch(self.master_key, start, count)
+
+        starts = range(start, start + count, batch_size)
+        sizes = [min(batch_size, start + count - batch_start) for batch_start in starts]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            batches = executor.map(derive_address_batch, [self.master_key] * len(sizes), starts, sizes)
+            addresses = []
+            for batch in batches:
+                addresses.extend(batch)
+        return addresses
+
+    def __repr__(self):
+        return f"HDWallet({self.name}, {self.next_index} addresses)"
+
+
+class HDKeystore:
+    """
+    Several HD wallets plus a reverse index: address -> (wallet name, index).
+
+    Only seeds and address counts are persisted; addresses are re-derived on load.
+    """
+
+    def __init__(self):
+        self.wallets = {}  # Name -> HDWallet
+        self.address_index = {}  # Address -> (wallet name, child index), across all wallets
+
+    def add_wallet(self, name, seed=None):
+        if name in self.wallets:
+            raise ValueError(f"Wallet '{name}' already exists")
+        wallet = HDWallet(seed, name)
+        self.wallets[name] = wallet
+        return wallet
+
+    def generate_addresses(self, name, count, workers=None):
+        """Hand out `count` new addresses from a wallet and index them"""
+        wallet = self.wallets[name]
+        start = wallet.next_index
+        addresses = wallet.derive_addresses(start, count, workers)
+        self.address_index.update((address, (name, child_index))
+                                  for child_index, address in enumerate(addresses, start))
+        wallet.next_index += count
+        return addresses
+
+    def lookup(self, address):
+        """(wallet name, child index) owning an address, or None"""
+        return self.address_index.get(address)
+
+    def wallet_for_address(self, address):
+        """Signing wallet for an address in the keystore"""
+        owner = self.lookup(address)
+        if owner is None:
+            return None
+        name, child_index = owner
+        return self.wallets[name].derive_wallet(child_index)
+
+    def save(self, path):
+        """Write seeds and address counts (keep this file secret!)"""
+        data = {name: {"seed": wallet.seed.hex(), "addresses": wallet.next_index}
+                for name, wallet in self.wallets.items()}
+        # Owner-only from the first byte; an existing file keeps its old mode unless changed
+        descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        os.chmod(path, 0o600)
+        with os.fdopen(descriptor, "w") as f:
+            json.dump(data, f)
+
+    @classmethod
+    def load(cls, path, workers=None):
+        """Restore a keystore and re-derive its address index"""
+        with open(path) as f:
+            data = json.load(f)
+        keystore = cls()
+        for name, entry in data.items():
+            keystore.add_wallet(name, bytes.fromhex(entry["seed"]))
+            keystore.generate_addresses(name, entry["addresses"], workers)
+        return keystore
+
+    def __len__(self):
+        return len(self.address_index)
+
+    def __repr__(self):
+        return f"HDKeystore({len(self.wallets)} wallets, {len(self)} addresses)"
+
+#=============================================================================
+# DEMONSTRATION: Bulk address generation for a custodial keystore
+#=============================================================================
+def demonstrate_hd_keystore(count=1_000_000):
+    print("🚀 HD Keystore Demo")
+    print("=" * 60)
+
+    keystore = HDKeystore()
+    keystore.add_wallet("custody")
+
+    start_time = time.perf_counter()
+    addresses = keystore.generate_addresses("custody", count)
+    elapsed = time.perf_counter() - start_time
+    print(f"🔑 Derived {count:,} addresses in {elapsed:.2f}s "
+          f"({count / elapsed:,.0f}/s on {os.cpu_count()} cores)")
+
+    sample = addresses[count // 2]
+    start_time = time.perf_counter()
+    owner = keystore.lookup(sample)
+    print(f"🔍 {sample} belongs to {owner} (lookup {1e6 * (time.perf_counter() - start_time):.1f} µs)")
+
+    wallet = keystore.wallet_for_address(sample)
+    print(f"✍️  Re-derived signing wallet: {wallet}, address matches: {wallet.address == sample}")
+
+if __name__ == "__main__":
+    demonstrate_hd_keystore(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
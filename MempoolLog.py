@@ -0,0 +1,309 @@
+import contextlib
+import io
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import threading
+import time
+import zlib
+
+from BinaryCodec import CodecError, encode_transaction, decode_transaction
+from UTXOLedger import UTXOBlockchain
+
+# Crash-safe mempool persistence
+# Every change to the pending pool is appended to a write-ahead log: ADD
+# carries the codec-encoded transaction, REMOVE its 32-byte ID. Records are
+# buffered and written with a single flush + fsync per group (group commit):
+# when `group_size` records are waiting, when `commit_interval` has passed
+# (a timer commits even if nothing else arrives, so a crash loses at most the
+# last commit_interval of admissions), or after every block. Once the log holds many more records than the pool has
+# transactions it is compacted: the pool is written to a snapshot (temp file,
+# fsync, atomic rename) and the log starts over.
+#
+# Loading reads the snapshot, replays the log on top and stops at a torn final
+# record. Replay is idempotent, so a crash between snapshot and log reset is
+# harmless.
+#
+# Record layout: payload length, CRC32 of type + payload, type, payload
+
+RECORD_HEADER = struct.Struct(">IIB")
+RECORD_ADD = 1
+RECORD_REMOVE = 2
+
+
+class MempoolLogError(Exception):
+    """Raised when a snapshot is corrupt (a torn log tail is repaired instead)"""
+
+
+def _frame(record_type, payload):
+    checksum = zlib.crc32(payload, zlib.crc32(bytes([record_type])))
+    return RECORD_HEADER.pack(len(payload), checksum, record_type) + payload
+
+def read_records(path):
+    """(type, payload) records of a file and the offset where valid data ends"""
+    if not os.path.exists(path):
+        return [], 0
+    with open(path, "rb") as f:
+        data = f.read()
+    records = []
+    offset = 0
+    while offset + RECORD_HEADER.size <= len(data):
+        length, checksum, record_type = RECORD_HEADER.unpack_from(data, offset)
+        start = offset + RECORD_HEADER.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(payload, zlib.crc32(bytes([record_type]))) != checksum:
+            break
+        records.append((record_type, payload))
+        offset = start + length
+    return records, offset
+
+
+class MempoolLog:
+    def __init__(self, directory, group_size=256, commit_interval=0.05, sync=True,
+                 compact_ratio=4, compact_min_records=10000):
+        self.directory = directory
+        self.group_size = group_size  # Commit once this many records are buffered
+        self.commit_interval = commit_interval  # ...or once the oldest buffered record is this old
+        self.sync = sync  # fsync on commit (False: flush to the OS only)
+        self.compact_ratio = compact_ratio  # Compact when log records > ratio * pool size
+        self.compact_min_records = compact_min_records
+        os.makedirs(directory, exist_ok=True)
+
+        self.log_path = os.path.join(directory, "mempool.log")
+        self.snapshot_path = os.path.join(directory, "mempool.snapshot")
+        self.log_records = 0  # Records in the log file since the last compaction
+        self.stats = {"records": 0, "commits": 0, "bytes_written": 0, "compactions": 0,
+                      "loaded": 0, "torn_bytes_dropped": 0}
+        self._buffer = []
+        self._buffer_started = None
+        self._writer = None
+        self._lock = threading.RLock()  # The flush timer commits from its own thread
+        self._timer = None
+
+    #-------------------------------------------------------------------------
+    # Writing
+    #-------------------------------------------------------------------------
+    def _append(self, record_type, payload):
+        with self._lock:
+            if not self._buffer:
+                self._buffer_started = time.monotonic()
+                if self._timer is None:
+                    self._timer = threading.Timer(self.commit_interval, self._flush_due)
+                    self._timer.daemon = True
+                    self._timer.start()
+            self._buffer.append(_frame(record_type, payload))
+            if len(self._buffer) >= self.group_size or time.monotonic() - self._buffer_started >= self.commit_interval:
+                self.commit()
+
+    def _flush_due(self):
+        """Timer: commit what is buffered on a node that has gone quiet"""
+        with self._lock:
+            self._timer = None
+            self.commit()
+
+    def log_add(self, transaction):
+        self._append(RECORD_ADD, encode_transaction(transaction))
+
+    def log_remove(self, transaction_id):
+        self._append(RECORD_REMOVE, bytes.fromhex(transaction_id))
+
+    def commit(self):
+        """Write every buffered record with one flush (and fsync)"""
+        with self._lock:
+            if not self._buffer:
+                return
+            if self._writer is None:
+                self._writer = open(self.log_path, "ab")
+            data = b"".join(self._buffer)
+            self._writer.write(data)
+            self._writer.flush()
+            if self.sync:
+                os.fsync(self._writer.fileno())
+            self.log_records += len(self._buffer)
+            self.stats["records"] += len(self._buffer)
+            self.stats["bytes_written"] += len(data)
+            self.stats["commits"] += 1
+            self._buffer = []
+
+    def checkpoint(self, pending_transactions):
+        """Called after each block: commit, and compact if the log has outgrown the pool"""
+        self.commit()
+        if self.log_records >= max(self.compact_min_records, self.compact_ratio * len(pending_transactions)):
+            self.compact(pending_transactions)
+
+    def compact(self, pending_transactions):
+        """Replace snapshot + log with a snapshot of the current pool"""
+        with self._lock:
+            self.commit()
+            temp_path = self.snapshot_path + ".tmp"
+            with open(temp_path, "wb") as f:
+                f.write(b"".join(_frame(RECORD_ADD, encode_transaction(tx)) for tx in pending_transactions))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.snapshot_path)
+            self._fsync_directory()
+
+            # Only now drop the log; replaying it over the new snapshot would be harmless anyway
+            if self._writer is not None:
+                self._writer.close()
+            self._writer = open(self.log_path, "wb")
+            self._writer.flush()
+            os.fsync(self._writer.fileno())
+            self.log_records = 0
+            self.stats["compactions"] += 1
+
+    def _fsync_directory(self):
+        """Make the rename durable (not possible on every platform)"""
+        try:
+            descriptor = os.open(self.directory, os.O_RDONLY)
+        except OSError:
+            return
+        try:
+            os.fsync(descriptor)
+        except OSError:
+            pass
+        finally:
+            os.close(descriptor)
+
+    #-------------------------------------------------------------------------
+    # Loading
+    #-------------------------------------------------------------------------
+    def load(self):
+        """Pool contents as of the last commit, in admission order (repairs a torn log tail)"""
+        snapshot, snapshot_end = read_records(self.snapshot_path)
+        if os.path.exists(self.snapshot_path) and snapshot_end != os.path.getsize(self.snapshot_path):
+            raise MempoolLogError(f"Corrupt mempool snapshot {self.snapshot_path}")
+        log, log_end = read_records(self.log_path)
+        if os.path.exists(self.log_path) and log_end != os.path.getsize(self.log_path):
+            torn = os.path.getsize(self.log_path) - log_end
+            print(f"⚠️  Mempool log: discarding {torn} bytes of incomplete data")
+            self.stats["torn_bytes_dropped"] += torn
+            with open(self.log_path, "r+b") as f:
+                f.truncate(log_end)
+
+        pool = {}  # Transaction ID -> transaction (dicts keep insertion order)
+        for record_type, payload in snapshot + log:
+            if record_type == RECORD_ADD:
+                try:
+                    tx = decode_transaction(payload)
+                except CodecError:
+                    continue
+                pool.setdefault(tx.transaction_id, tx)
+            elif record_type == RECORD_REMOVE:
+                pool.pop(payload.hex(), None)
+        self.log_records = len(log)
+        self.stats["loaded"] = len(pool)
+        return list(pool.values())
+
+    def close(self):
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self.commit()
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+
+    def __repr__(self):
+        return f"MempoolLog({self.directory}, {self.log_records} log records, {len(self._buffer)} buffered)"
+
+
+def open_mempool(blockchain, directory, **options):
+    """
+    Reload a blockchain's pool from `directory` and log every later change there.
+
+    Transactions confirmed or no longer spendable since they were saved are
+    skipped. Returns (log, number of transactions restored).
+    """
+    if isinstance(blockchain, UTXOBlockchain):
+        raise ValueError("UTXO transactions have no codec record, so a UTXO pool cannot be logged")
+    log = MempoolLog(directory, **options)
+    restored = blockchain.restore_pending(log.load())
+    log.compact(blockchain.pending_transactions)  # Start from exactly what was kept
+    blockchain.mempool_log = log
+    return log, restored
+
+#=============================================================================
+# DEMONSTRATION: group commit, crash and reload
+#=============================================================================
+def demonstrate_mempool_log(num_transactions=20000):
+    from Day4_TransactionSystem import CryptocurrencyBlockchain
+    from SyntheticWorkload import WorkloadConfig, WorkloadGenerator, make_genesis
+    from datetime import datetime, timedelta
+
+    print("🚀 Mempool Write-Ahead Log Demo")
+    print("=" * 60)
+    generator = WorkloadGenerator(WorkloadConfig(num_wallets=5000, initial_balance=10**6))
+    clock = datetime(2024, 1, 1)
+    transactions = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        funding = CryptocurrencyBlockchain()
+        funding.chain = [make_genesis()]
+        funding.connect_block(generator.allocation_block(funding))
+        for i in range(num_transactions):
+            tx = generator.next_transaction(clock + timedelta(microseconds=i), funding.get_spendable_balance)
+            if tx is not None and funding.create_transaction(tx):
+                transactions.append(tx)
+
+    def fresh_node():
+        node = CryptocurrencyBlockchain()
+        node.difficulty = 1
+        node.chain = list(funding.chain)
+        node.rebuild_state_index()
+        return node
+
+    directory = tempfile.mkdtemp()
+    try:
+        # Write cost: one fsync per transaction vs group commit
+        sample = transactions[:2000]
+        print(f"✍️  Logging {len(sample)} admissions:")
+        for group_size in (1, 16, 256):
+            log = MempoolLog(os.path.join(directory, f"group{group_size}"), group_size=group_size)
+            start_time = time.perf_counter()
+            for tx in sample:
+                log.log_add(tx)
+            log.close()
+            elapsed = time.perf_counter() - start_time
+            print(f"   group size {group_size:>3}: {elapsed / len(sample) * 1e6:8.1f} µs per transaction, "
+                  f"{log.stats['commits']} fsyncs")
+
+        # A node under load: admit, mine one block, admit more, then "crash"
+        node = fresh_node()
+        pool_directory = os.path.join(directory, "node")
+        with contextlib.redirect_stdout(io.StringIO()):
+            log, _ = open_mempool(node, pool_directory, compact_min_records=5000)
+            for tx in transactions[:num_transactions // 2]:
+                node.create_transaction(tx)
+            node.max_block_transactions = 3000
+            block = node.mine_pending_transactions(generator.addresses[0])
+            for tx in transactions[num_transactions // 2:]:
+                node.create_transaction(tx)
+        log.commit()  # Whatever was acknowledged before the crash
+        expected = {tx.transaction_id for tx in node.pending_transactions}
+        print(f"\n💥 Crash with {len(expected)} pending transactions "
+              f"(block #{block.index} confirmed {len(block.transactions) - 1}); "
+              f"log: {log.stats['records']} records in {log.stats['commits']} commits, "
+              f"{log.stats['compactions']} compactions")
+        with open(log.log_path, "ab") as f:
+            f.write(_frame(RECORD_ADD, b"half-written record")[:11])  # Torn final write
+
+        # Restart: same chain on disk, empty pool, reload from the log
+        restarted = fresh_node()
+        restarted.connect_block(block)
+        start_time = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            new_log, restored = open_mempool(restarted, pool_directory)
+        elapsed = time.perf_counter() - start_time
+        recovered = {tx.transaction_id for tx in restarted.pending_transactions}
+        print(f"🔁 Reloaded {restored} transactions in {elapsed:.2f}s "
+              f"({restored / elapsed:,.0f} tx/s), torn bytes dropped: {new_log.stats['torn_bytes_dropped']}, "
+              f"pool identical: {recovered == expected}")
+        new_log.close()
+    finally:
+        shutil.rmtree(directory)
+
+if __name__ == "__main__":
+    demonstrate_mempool_log(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,316 @@
+import itertools
+import math
+import threading
+import time
+from multiprocessing import Process
+from multiprocessing.connection import Listener, Client
+
+from Day4_TransactionSystem import CryptocurrencyBlockchain, Wallet, calculate_block_hash
+
+# Local mining pool
+# A coordinator builds block templates from the pending pool and hands nonce
+# ranges to any number of miner processes over a local socket. Miners report
+# shares (hashes that meet an easier target) so the coordinator can measure
+# each worker's hashrate and split the block reward in proportion to shares.
+#
+# Protocol (pickled dicts over multiprocessing connections):
+#   worker -> pool: hello, share, need_work
+#   pool -> worker: job, stop
+
+DEFAULT_AUTHKEY = b"local-mining-pool"
+NONCE_RANGE = 100_000  # Nonces per work unit
+
+
+class PoolCoordinator:
+    def __init__(self, blockchain, address=("127.0.0.1", 0), authkey=DEFAULT_AUTHKEY,
+                 share_difficulty=None, refresh_interval=1.0):
+        self.blockchain = blockchain
+        self.pool_wallet = Wallet("Pool", verbose=False)  # Receives coinbases, pays workers
+        self.share_difficulty = share_difficulty or max(1, blockchain.difficulty - 2)
+        self.refresh_interval = refresh_interval
+        self.listener = Listener(address, authkey=authkey)
+        self.address = self.listener.address
+
+        self.lock = threading.RLock()
+        self.workers = {}  # Connection -> worker stats
+        self.round_shares = {}  # Payout address -> shares since the last block
+        self.job = None
+        self.job_ids = itertools.count(1)
+        self.blocks_found = []
+        self._template_state = None
+        self._running = False
+
+    #-------------------------------------------------------------------------
+    # Lifecycle
+    #-------------------------------------------------------------------------
+    def start(self):
+        with self.lock:
+            self._running = True
+            self._new_job()
+        threading.Thread(target=self._accept_loop, daemon=True).start()
+        threading.Thread(target=self._refresh_loop, daemon=True).start()
+        print(f"🏊 Mining pool listening on {self.address[0]}:{self.address[1]}")
+
+    def stop(self):
+        with self.lock:
+            self._running = False
+            for conn in list(self.workers):
+                try:
+                    conn.send({"type": "stop"})
+                except OSError:
+                    pass
+        self.listener.close()
+
+    def _accept_loop(self):
+        while self._running:
+            try:
+                conn = self.listener.accept()
+            except OSError:
+                break
+            threading.Thread(target=self._serve, args=(conn,), daemon=True).start()
+
+    def _refresh_loop(self):
+        while self._running:
+            time.sleep(self.refresh_interval)
+            self.refresh()
+
+    #-------------------------------------------------------------------------
+    # Jobs
+    #-------------------------------------------------------------------------
+    def _pool_state(self):
+        pending = self.blockchain.pending_transactions
+        return (self.blockchain.get_latest_block().hash, len(pending),
+                pending[-1].transaction_id if pending else None)
+
+    def _new_job(self):
+        template = self.blockchain.create_block_template(self.pool_wallet.address)
+        self.job = {
+            "job_id": next(self.job_ids),
+            "block": template,
+            "next_nonce": 0,
+            "seen_nonces": set()  # Nonces already credited, so a share counts once
+        }
+        self._template_state = self._pool_state()
+
+    def _send_job(self, conn):
+        """Hand the worker the next nonce range of the current job and remember it"""
+        job = self.job
+        block = job["block"]
+        nonce_start = job["next_nonce"]
+        job["next_nonce"] += NONCE_RANGE
+        worker = self.workers[conn]
+        if worker["job_id"] != job["job_id"]:
+            worker["job_id"] = job["job_id"]
+            worker["nonce_ranges"] = []
+        worker["nonce_ranges"].append((nonce_start, nonce_start + NONCE_RANGE))
+        conn.send({
+            "type": "job",
+            "job_id": job["job_id"],
+            "header": {
+                "index": block.index,
+                "timestamp": str(block.timestamp),
+                "merkle_root": block.merkle_root,
+                "previous_hash": block.previous_hash
+            },
+            "nonce_start": nonce_start,
+            "nonce_count": NONCE_RANGE,
+            "share_difficulty": self.share_difficulty,
+            "block_difficulty": self.blockchain.difficulty
+        })
+
+    def _broadcast_job(self):
+        for conn in list(self.workers):
+            try:
+                self._send_job(conn)
+            except OSError:
+                self.workers.pop(conn, None)
+
+    def refresh(self):
+        """Push a new template when the tip or the pending pool changed"""
+        with self.lock:
+            if self._running and self._pool_state() != self._template_state:
+                self._new_job()
+                self._broadcast_job()
+
+    def submit_transaction(self, transaction):
+        """Add a transaction to the pool's mempool (picked up by the next refresh)"""
+        with self.lock:
+            return self.blockchain.create_transaction(transaction)
+
+    #-------------------------------------------------------------------------
+    # Workers and shares
+    #-------------------------------------------------------------------------
+    def _serve(self, conn):
+        try:
+            hello = conn.recv()
+            with self.lock:
+                self.workers[conn] = {
+                    "name": hello["name"],
+                    "payout_address": hello["payout_address"],
+                    "connected_at": time.time(),
+                    "shares": 0,
+                    "stale_shares": 0,
+                    "invalid_shares": 0,
+                    "blocks": 0,
+                    "job_id": None,
+                    "nonce_ranges": []  # (start, end) ranges of the current job given to this worker
+                }
+                self._send_job(conn)
+            print(f"👷 Worker '{hello['name']}' joined the pool")
+
+            while True:
+                message = conn.recv()
+                with self.lock:
+                    if message["type"] == "share":
+                        self._handle_share(conn, message)
+                    elif message["type"] == "need_work" and self._running:
+                        self._send_job(conn)
+        except (EOFError, OSError):
+            pass
+        finally:
+            with self.lock:
+                self.workers.pop(conn, None)
+            conn.close()
+
+    def _handle_share(self, conn, message):
+        worker = self.workers[conn]
+        if message["job_id"] != self.job["job_id"]:
+            worker["stale_shares"] += 1
+            return
+
+        # Only nonces from this worker's own ranges, and each one only once
+        nonce = message["nonce"]
+        if nonce in self.job["seen_nonces"] or \
+                not any(start <= nonce < end for start, end in worker["nonce_ranges"]):
+            worker["invalid_shares"] += 1
+            return
+
+        block = self.job["block"]
+        block_hash = calculate_block_hash(block.index, block.timestamp, block.merkle_root,
+                                          block.previous_hash, message["nonce"])
+        if block_hash != message["hash"] or not block_hash.startswith("0" * self.share_difficulty):
+            worker["invalid_shares"] += 1
+            return
+
+        self.job["seen_nonces"].add(nonce)
+        worker["shares"] += 1
+        payout_address = worker["payout_address"]
+        self.round_shares[payout_address] = self.round_shares.get(payout_address, 0) + 1
+
+        if block_hash.startswith("0" * self.blockchain.difficulty):
+            block.nonce = message["nonce"]
+            block.hash = block_hash
+            if self.blockchain.add_block(block):
+                worker["blocks"] += 1
+                self.blocks_found.append(block)
+                print(f"🎉 Worker '{worker['name']}' found block #{block.index}")
+                self._pay_out(block)
+            self._new_job()
+            self._broadcast_job()
+
+    def _pay_out(self, block):
+        """Split the coinbase between workers in proportion to their shares this round"""
+        reward = block.transactions[0].amount
+        total_shares = sum(self.round_shares.values())
+        for payout_address, shares in self.round_shares.items():
+            # Round down so the payouts never add up to more than the pool received
+            amount = math.floor(reward * shares / total_shares * 1e8) / 1e8
+            if amount > 0:
+                payout = self.pool_wallet.send_money(payout_address, amount)
+                self.blockchain.create_transaction(payout)
+        self.round_shares = {}
+
+    def worker_stats(self):
+        """Shares and estimated hashrate per connected worker"""
+        hashes_per_share = 16 ** self.share_difficulty
+        now = time.time()
+        with self.lock:
+            stats = []
+            for worker in self.workers.values():
+                elapsed = max(now - worker["connected_at"], 1e-9)
+                stats.append(dict(worker, hashrate=worker["shares"] * hashes_per_share / elapsed))
+            return stats
+
+
+#=============================================================================
+# Miner process
+#=============================================================================
+def run_worker(address, payout_address, name="worker", authkey=DEFAULT_AUTHKEY, poll_every=2000):
+    """Mine work units from a coordinator until it says stop (or goes away)"""
+    conn = Client(address, authkey=authkey)
+    conn.send({"type": "hello", "name": name, "payout_address": payout_address})
+    job = None
+    try:
+        while True:
+            if job is None:
+                job = conn.recv()
+            if job["type"] == "stop":
+                break
+
+            header = job["header"]
+            share_target = "0" * job["share_difficulty"]
+            nonce, end = job["nonce_start"], job["nonce_start"] + job["nonce_count"]
+            next_job = None
+            while nonce < end:
+                block_hash = calculate_block_hash(header["index"], header["timestamp"], header["merkle_root"],
+                                                  header["previous_hash"], nonce)
+                if block_hash.startswith(share_target):
+                    conn.send({"type": "share", "job_id": job["job_id"], "nonce": nonce, "hash": block_hash})
+                nonce += 1
+                # New jobs (new tip or template) preempt the current work unit
+                if nonce % poll_every == 0 and conn.poll():
+                    next_job = conn.recv()
+                    break
+
+            if next_job is None:
+                conn.send({"type": "need_work", "job_id": job["job_id"]})
+            job = next_job
+    except (EOFError, OSError):
+        pass
+    finally:
+        conn.close()
+
+def start_local_workers(coordinator, payout_addresses):
+    """Start one miner process per payout address"""
+    processes = []
+    for i, payout_address in enumerate(payout_addresses):
+        process = Process(target=run_worker, args=(coordinator.address, payout_address, f"worker-{i}"), daemon=True)
+        process.start()
+        processes.append(process)
+    return processes
+
+#=============================================================================
+# DEMONSTRATION: Two local miners sharing block rewards
+#=============================================================================
+def demonstrate_mining_pool(blocks=3, workers=2):
+    print("🚀 Local Mining Pool Demo")
+    print("=" * 60)
+
+    blockchain = CryptocurrencyBlockchain()
+    blockchain.difficulty = 4
+    coordinator = PoolCoordinator(blockchain, share_difficulty=2)
+    coordinator.start()
+
+    miners = [Wallet(f"Miner{i}", verbose=False) for i in range(workers)]
+    processes = start_local_workers(coordinator, [miner.address for miner in miners])
+
+    while len(coordinator.blocks_found) < blocks:
+        time.sleep(0.2)
+
+    for stats in coordinator.worker_stats():
+        print(f"   {stats['name']}: {stats['shares']} shares, {stats['stale_shares']} stale, "
+              f"~{stats['hashrate']:,.0f} H/s, {stats['blocks']} blocks")
+    coordinator.stop()
+    for process in processes:
+        process.join(timeout=5)
+
+    # Mine the last round of payouts so they show up in balances
+    blockchain.difficulty = 2
+    blockchain.mine_pending_transactions(coordinator.pool_wallet.address)
+    for miner in miners:
+        print(f"   {miner.name} balance: {miner.get_balance(blockchain)}")
+    print(f"   Pool balance: {blockchain.get_balance(coordinator.pool_wallet.address)}")
+    print(f"   Blockchain valid: {blockchain.is_chain_valid()}")
+
+if __name__ == "__main__":
+    demonstrate_mining_pool()
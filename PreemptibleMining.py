@@ -0,0 +1,161 @@
+import threading
+import time
+
+from Day4_TransactionSystem import CryptocurrencyBlockchain, Wallet
+
+# Preemptible mining
+# EnhancedBlock.mine_block() runs until it finds a hash. MiningTask mines on a
+# background thread instead and checks in every few thousand nonces: a new tip
+# abandons the work at once, and after `refresh_interval` seconds the template
+# is rebuilt if the best block the pool allows now pays more fees. Every block
+# gets a report of how many hashes went into templates that were thrown away.
+
+class MiningTask:
+    def __init__(self, blockchain, mining_reward_address, refresh_interval=2.0,
+                 check_every=2000, max_blocks=None, lock=None):
+        self.blockchain = blockchain
+        self.mining_reward_address = mining_reward_address
+        self.refresh_interval = refresh_interval
+        self.check_every = check_every
+        self.max_blocks = max_blocks
+        self.lock = lock or threading.RLock()  # Shared with anyone touching the blockchain
+        self.reports = []  # One entry per mined block
+        self.totals = {"hashes": 0, "wasted_hashes": 0, "stale_tips": 0, "template_refreshes": 0}
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Cancel mining; the current template is abandoned"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def submit_transaction(self, transaction):
+        with self.lock:
+            return self.blockchain.create_transaction(transaction)
+
+    def _new_template(self):
+        with self.lock:
+            block = self.blockchain.create_block_template(self.mining_reward_address)
+        fees = sum(tx.fee for tx in block.transactions)
+        return block, fees, time.time()
+
+    def run(self):
+        target = "0" * self.blockchain.difficulty
+        while not self._stop.is_set():
+            if self.max_blocks is not None and len(self.reports) >= self.max_blocks:
+                break
+
+            report = {"hashes": 0, "wasted_hashes": 0, "stale_tips": 0, "template_refreshes": 0}
+            started = time.time()
+            block, template_fees, template_time = self._new_template()
+            template_hashes = 0
+
+            while not self._stop.is_set():
+                block.nonce += 1
+                block.hash = block.calculate_hash()
+                template_hashes += 1
+
+                if block.hash.startswith(target):
+                    with self.lock:
+                        accepted = self.blockchain.add_block(block)
+                    report["hashes"] += template_hashes
+                    if accepted:
+                        break
+                    # Lost a race with a block that arrived in the meantime
+                    report["wasted_hashes"] += template_hashes
+                    report["stale_tips"] += 1
+                    block, template_fees, template_time = self._new_template()
+                    template_hashes = 0
+                    continue
+
+                if template_hashes % self.check_every:
+                    continue
+
+                # A new tip makes this template worthless: switch immediately
+                if self.blockchain.get_latest_block().hash != block.previous_hash:
+                    report["hashes"] += template_hashes
+                    report["wasted_hashes"] += template_hashes
+                    report["stale_tips"] += 1
+                    block, template_fees, template_time = self._new_template()
+                    template_hashes = 0
+                    continue
+
+                # Periodically pick up higher-fee transactions (only what would fit in the block counts)
+                if time.time() - template_time >= self.refresh_interval:
+                    with self.lock:
+                        best_fees = sum(tx.fee for tx in self.blockchain.select_transactions())
+                    if best_fees > template_fees:
+                        report["hashes"] += template_hashes
+                        report["wasted_hashes"] += template_hashes
+                        report["template_refreshes"] += 1
+                        block, template_fees, template_time = self._new_template()
+                        template_hashes = 0
+                    else:
+                        template_time = time.time()
+            else:
+                report["hashes"] += template_hashes
+                report["wasted_hashes"] += template_hashes
+                self._add_totals(report)
+                break
+
+            report["block"] = block.index
+            report["fees"] = template_fees
+            report["elapsed"] = time.time() - started
+            self.reports.append(report)
+            self._add_totals(report)
+            print(f"⛏️  Block #{block.index}: {report['hashes']} hashes, {report['wasted_hashes']} wasted, "
+                  f"{report['stale_tips']} stale tips, {report['template_refreshes']} refreshes")
+
+    def _add_totals(self, report):
+        for key in self.totals:
+            self.totals[key] += report[key]
+
+    def waste_ratio(self):
+        """Share of all hashes spent on abandoned templates"""
+        return self.totals["wasted_hashes"] / self.totals["hashes"] if self.totals["hashes"] else 0.0
+
+#=============================================================================
+# DEMONSTRATION: Preempted by a competing block and by higher fees
+#=============================================================================
+def demonstrate_preemptible_mining():
+    print("🚀 Preemptible Mining Demo")
+    print("=" * 60)
+
+    blockchain = CryptocurrencyBlockchain()
+    blockchain.difficulty = 4
+    miner = Wallet("Miner", verbose=False)
+    rival = Wallet("Rival", verbose=False)
+    alice = Wallet("Alice", verbose=False)
+
+    # A rival found the next block too; it arrives while our task is mining
+    rival_block = blockchain.create_block_template(rival.address)
+    rival_block.mine_block(blockchain.difficulty)
+
+    task = MiningTask(blockchain, miner.address, refresh_interval=0.2, max_blocks=3).start()
+    time.sleep(0.05)
+    with task.lock:
+        blockchain.add_block(rival_block)
+
+    # Fee-paying transactions arrive mid-search
+    time.sleep(0.1)
+    for i in range(3):
+        task.submit_transaction(rival.send_money(alice.address, 10, fee=2 + i))
+
+    while task.is_running():
+        time.sleep(0.1)
+
+    print(f"\n📊 Totals: {task.totals}")
+    print(f"   Wasted work: {task.waste_ratio():.1%} of hashes")
+    print(f"   Chain height: {len(blockchain.chain) - 1}, valid: {blockchain.is_chain_valid()}")
+
+if __name__ == "__main__":
+    demonstrate_preemptible_mining()
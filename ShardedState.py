@@ -0,0 +1,411 @@
+import contextlib
+import io
+import multiprocessing
+import os
+import random
+import sys
+import threading
+import time
+import zlib
+from multiprocessing.connection import Client, Listener
+
+# Address state sharded across worker processes
+# Each shard process owns the balances and nonces of the addresses that hash
+# to it (CRC32, stable across processes) and serves reads over its own socket,
+# so readers in any number of processes spread across cores instead of
+# queueing on one interpreter.
+#
+# Blocks are committed to all shards with two-phase commit: every shard gets a
+# prepare (its slice of the block's changes, in block order, even if empty),
+# checks that it extends its height and leaves no spender negative, and votes.
+# Only if every shard votes yes is the block committed everywhere; otherwise
+# all shards abort and nothing changes. Each shard keeps undo data for recent
+# heights so the tip can be rolled back in a reorg (deeper reorgs reload the
+# shards from the chain).
+#
+# Attach to a chain with `service.attach(blockchain)`: the chain keeps its own
+# index for admission and validation, and forwards every connected or
+# disconnected block so the shards mirror it for readers.
+
+MINT_SENDER = "System"  # Coinbase sender: never debited
+
+
+def shard_for(address, num_shards):
+    return zlib.crc32(address.encode()) % num_shards
+
+
+class ShardError(Exception):
+    pass
+
+
+#=============================================================================
+# Shard process
+#=============================================================================
+class Shard:
+    def __init__(self, shard_id, undo_depth):
+        self.shard_id = shard_id
+        self.undo_depth = undo_depth
+        self.balances = {}
+        self.nonces = {}
+        self.height = -1  # Last committed block
+        self.prepared = None  # (height, changes, nonces) awaiting commit or abort
+        self.undo = {}  # Height -> ({address: previous balance or None}, {address: previous nonce or None})
+        self.lock = threading.Lock()
+        self.reads = 0
+
+    def handle(self, message):
+        kind = message[0]
+        if kind == "get":
+            with self.lock:
+                self.reads += len(message[1])
+                balances = self.balances
+                return ("ok", self.height, [balances.get(address, 0) for address in message[1]])
+        if kind == "nonces":
+            with self.lock:
+                return ("ok", self.height, [self.nonces.get(address, 0) for address in message[1]])
+        if kind == "prepare":
+            return self.prepare(*message[1:])
+        if kind == "commit":
+            return self.commit(message[1])
+        if kind == "abort":
+            with self.lock:
+                if self.prepared is not None and self.prepared[0] == message[1]:
+                    self.prepared = None
+            return ("ok",)
+        if kind == "rollback":
+            return self.rollback(message[1])
+        if kind == "load":
+            with self.lock:
+                _, self.height, self.balances, self.nonces = message
+                self.undo = {}
+                self.prepared = None
+            return ("ok",)
+        if kind == "stats":
+            with self.lock:
+                return ("ok", {"shard": self.shard_id, "height": self.height,
+                               "addresses": len(self.balances), "reads": self.reads})
+        return ("error", f"unknown message {kind!r}")
+
+    def prepare(self, height, changes, nonces):
+        """Vote on a block's slice: changes are (address, amount, is_debit) in block order"""
+        with self.lock:
+            if height != self.height + 1:
+                return ("no", f"shard {self.shard_id} is at height {self.height}, cannot apply #{height}")
+            working = {}
+            for address, amount, is_debit in changes:
+                balance = working.get(address, self.balances.get(address, 0)) + amount
+                if is_debit and balance < 0:
+                    return ("no", f"shard {self.shard_id}: {address[:10]}... would go negative")
+                working[address] = balance
+            self.prepared = (height, changes, nonces)
+            return ("ok",)
+
+    def commit(self, height):
+        with self.lock:
+            if self.prepared is None or self.prepared[0] != height:
+                return ("error", f"shard {self.shard_id} has no prepared block #{height}")
+            _, changes, nonces = self.prepared
+            balances = self.balances
+            previous_balances = {}
+            previous_nonces = {}
+            # Same additions in the same order as the chain's own index
+            for address, amount, _ in changes:
+                if address not in previous_balances:
+                    previous_balances[address] = balances.get(address)
+                balances[address] = balances.get(address, 0) + amount
+            for address, nonce in nonces.items():
+                previous_nonces[address] = self.nonces.get(address)
+                self.nonces[address] = nonce
+            self.undo[height] = (previous_balances, previous_nonces)
+            self.undo.pop(height - self.undo_depth, None)
+            self.height = height
+            self.prepared = None
+            return ("ok",)
+
+    def rollback(self, height):
+        with self.lock:
+            if height != self.height or height not in self.undo:
+                return ("error", f"shard {self.shard_id} cannot roll back #{height} (at {self.height})")
+            previous_balances, previous_nonces = self.undo.pop(height)
+            for target, previous in ((self.balances, previous_balances), (self.nonces, previous_nonces)):
+                for address, value in previous.items():
+                    if value is None:
+                        target.pop(address, None)
+                    else:
+                        target[address] = value
+            self.height -= 1
+            return ("ok",)
+
+
+def _serve_client(shard, connection):
+    try:
+        while True:
+            message = connection.recv()
+            if message[0] == "stop":
+                connection.send(("ok",))
+                os._exit(0)
+            connection.send(shard.handle(message))
+    except (EOFError, OSError):
+        pass
+    finally:
+        connection.close()
+
+def _run_shard(shard_id, undo_depth, authkey, ready):
+    """Shard process: accept connections, one thread each"""
+    shard = Shard(shard_id, undo_depth)
+    with Listener(("127.0.0.1", 0), authkey=authkey) as listener:
+        ready.send(listener.address)
+        ready.close()
+        while True:
+            connection = listener.accept()
+            threading.Thread(target=_serve_client, args=(shard, connection), daemon=True).start()
+
+
+#=============================================================================
+# Clients
+#=============================================================================
+class ShardReader:
+    """
+    Read-only access to the shards, usable from any process.
+
+    Create one per thread (connections are not shared). Multi-shard reads
+    retry until every shard answered at the same height, so they never mix
+    state from before and after a commit.
+    """
+
+    def __init__(self, endpoints, authkey, max_retries=10):
+        self.connections = [Client(endpoint, authkey=authkey) for endpoint in endpoints]
+        self.max_retries = max_retries
+
+    def _query(self, kind, addresses):
+        num_shards = len(self.connections)
+        by_shard = {}
+        for position, address in enumerate(addresses):
+            by_shard.setdefault(shard_for(address, num_shards), []).append(position)
+        for attempt in range(self.max_retries):
+            # Ask every shard first, then collect: the shards work in parallel
+            for shard_id, positions in by_shard.items():
+                self.connections[shard_id].send((kind, [addresses[p] for p in positions]))
+            results = [None] * len(addresses)
+            heights = set()
+            for shard_id, positions in by_shard.items():
+                _, height, values = self.connections[shard_id].recv()
+                heights.add(height)
+                for position, value in zip(positions, values):
+                    results[position] = value
+            if len(heights) <= 1:
+                return results, heights.pop() if heights else None
+        raise ShardError("Shards kept moving between heights; try again")
+
+    def get_balances(self, addresses):
+        """Balances of several addresses at one consistent height: (balances, height)"""
+        return self._query("get", list(addresses))
+
+    def get_balance(self, address):
+        return self._query("get", [address])[0][0]
+
+    def get_nonces(self, addresses):
+        return self._query("nonces", list(addresses))
+
+    def close(self):
+        for connection in self.connections:
+            connection.close()
+
+
+class ShardedStateService:
+    def __init__(self, num_shards=None, undo_depth=100):
+        self.num_shards = num_shards or os.cpu_count() or 1
+        self.authkey = os.urandom(16)
+        self.processes = []
+        self.endpoints = []
+        context = multiprocessing.get_context("spawn")  # No inherited locks or chain state
+        for shard_id in range(self.num_shards):
+            receiver, sender = context.Pipe(duplex=False)
+            process = context.Process(target=_run_shard, args=(shard_id, undo_depth, self.authkey, sender),
+                                      daemon=True)
+            process.start()
+            self.endpoints.append(receiver.recv())
+            self.processes.append(process)
+        self.connections = [Client(endpoint, authkey=self.authkey) for endpoint in self.endpoints]
+        self._reader = ShardReader(self.endpoints, self.authkey)
+        self.height = -1
+        self.stats = {"commits": 0, "aborts": 0, "rollbacks": 0}
+
+    def _broadcast(self, messages):
+        """Send one message per shard, then gather every reply (in shard order)"""
+        for connection, message in zip(self.connections, messages):
+            connection.send(message)
+        return [connection.recv() for connection in self.connections]
+
+    def load(self, balances, nonces, height):
+        """Replace all shard state (e.g. from a chain's state index)"""
+        shard_balances = [{} for _ in range(self.num_shards)]
+        shard_nonces = [{} for _ in range(self.num_shards)]
+        for address, balance in balances.items():
+            shard_balances[shard_for(address, self.num_shards)][address] = balance
+        for address, nonce in nonces.items():
+            shard_nonces[shard_for(address, self.num_shards)][address] = nonce
+        self._broadcast([("load", height, shard_balances[i], shard_nonces[i]) for i in range(self.num_shards)])
+        self.height = height
+
+    def apply_block(self, block):
+        """Commit a block's state changes on every shard, or on none; returns (ok, reason)"""
+        changes = [[] for _ in range(self.num_shards)]
+        nonces = [{} for _ in range(self.num_shards)]
+        num_shards = self.num_shards
+        for tx in block.transactions:
+            changes[shard_for(tx.receiver, num_shards)].append((tx.receiver, tx.amount, False))
+            if tx.sender != MINT_SENDER:
+                changes[shard_for(tx.sender, num_shards)].append((tx.sender, -(tx.amount + tx.fee), True))
+            if tx.nonce is not None:
+                nonces[shard_for(tx.sender, num_shards)][tx.sender] = tx.nonce + 1
+
+        votes = self._broadcast([("prepare", block.index, changes[i], nonces[i]) for i in range(num_shards)])
+        refusals = [vote[1] for vote in votes if vote[0] != "ok"]
+        if refusals:
+            self._broadcast([("abort", block.index)] * num_shards)
+            self.stats["aborts"] += 1
+            return False, refusals[0]
+        replies = self._broadcast([("commit", block.index)] * num_shards)
+        failures = [reply[1] for reply in replies if reply[0] != "ok"]
+        if failures:  # Only possible if a shard lost its prepared state: nothing safe to do but stop
+            raise ShardError(f"Commit of block #{block.index} failed after a unanimous vote: {failures[0]}")
+        self.height = block.index
+        self.stats["commits"] += 1
+        return True, None
+
+    def rollback_block(self, block):
+        """
+        Undo the tip block on every shard (reorg); returns (ok, reason).
+
+        Fails when the block is older than the undo data kept (a reorg deeper
+        than undo_depth); shards may then disagree, so the caller reloads them.
+        """
+        replies = self._broadcast([("rollback", block.index)] * self.num_shards)
+        failures = [reply[1] for reply in replies if reply[0] != "ok"]
+        if failures:
+            return False, failures[0]
+        self.height = block.index - 1
+        self.stats["rollbacks"] += 1
+        return True, None
+
+    def attach(self, blockchain):
+        """Mirror a chain: load its current state, then follow its connected/disconnected blocks"""
+        self.load(blockchain.balances, blockchain.nonces, len(blockchain.chain) - 1)
+        blockchain.state_service = self
+
+    def get_balance(self, address):
+        return self._reader.get_balance(address)
+
+    def get_balances(self, addresses):
+        return self._reader.get_balances(addresses)
+
+    def reader(self):
+        """A new ShardReader (for another thread; pass endpoints and authkey to other processes)"""
+        return ShardReader(self.endpoints, self.authkey)
+
+    def shard_stats(self):
+        return [reply[1] for reply in self._broadcast([("stats",)] * self.num_shards)]
+
+    def close(self):
+        self._reader.close()
+        for connection in self.connections:
+            try:
+                connection.send(("stop",))
+                connection.recv()
+            except (EOFError, OSError):
+                pass
+            connection.close()
+        for process in self.processes:
+            process.join(timeout=5)
+        self.processes = []
+
+    def __repr__(self):
+        return f"ShardedStateService({self.num_shards} shards, height {self.height})"
+
+#=============================================================================
+# DEMONSTRATION
+#=============================================================================
+def _read_load(endpoints, authkey, addresses, batch_size, duration, results):
+    """Reader process: batched balance queries for `duration` seconds"""
+    reader = ShardReader(endpoints, authkey)
+    rng = random.Random(os.getpid())
+    reads = 0
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        reader.get_balances(rng.sample(addresses, batch_size))
+        reads += batch_size
+    reader.close()
+    results.put(reads)
+
+def measure_read_throughput(service, addresses, readers, batch_size=64, duration=2.0):
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    processes = [context.Process(target=_read_load, args=(service.endpoints, service.authkey, addresses,
+                                                          batch_size, duration, results))
+                 for _ in range(readers)]
+    for process in processes:
+        process.start()
+    total = sum(results.get() for _ in processes)
+    for process in processes:
+        process.join()
+    return total / duration
+
+def demonstrate_sharded_state(num_blocks=40, txs_per_block=200):
+    from BalanceSheet import compute_balances
+    from Day4_TransactionSystem import Transaction, EnhancedBlock, CryptocurrencyBlockchain
+    from SyntheticWorkload import WorkloadConfig, generate_chain
+
+    print("🚀 Sharded State Demo")
+    print("=" * 60)
+    source, generator = generate_chain(WorkloadConfig(num_wallets=5000), num_blocks, txs_per_block)
+    cores = os.cpu_count() or 1
+    service = ShardedStateService(num_shards=max(2, cores))
+    print(f"🧩 {service} on {cores} CPU cores")
+
+    # Mirror a chain as it grows
+    node = CryptocurrencyBlockchain()
+    node.difficulty = 0
+    node.chain = [source.chain[0]]
+    service.attach(node)
+    start_time = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for block in source.chain[1:]:
+            node.connect_block(block)
+    elapsed = time.perf_counter() - start_time
+    balances, height = service.get_balances(generator.addresses)
+    identical = balances == [node.get_balance(address) for address in generator.addresses]
+    print(f"   Committed {len(source.chain) - 1} blocks in {elapsed:.2f}s, shards at height {height}, "
+          f"identical to the chain's index: {identical}")
+    print(f"   Addresses per shard: {[stats['addresses'] for stats in service.shard_stats()]}")
+
+    # A block that overdraws one address is refused by its shard and applied nowhere
+    poor, rich = generator.addresses[-1], generator.addresses[0]
+    overdraft = Transaction(poor, rich, node.get_balance(poor) + 5, timestamp=source.chain[-1].timestamp)
+    fine = Transaction(rich, poor, 1, timestamp=source.chain[-1].timestamp)
+    bad_block = EnhancedBlock(height + 1, source.chain[-1].timestamp, [fine, overdraft], source.chain[-1].hash)
+    ok, reason = service.apply_block(bad_block)
+    after, after_height = service.get_balances([poor, rich])
+    print(f"\n🛡️  Overdrawing block committed: {ok} ({reason}); "
+          f"balances unchanged: {after == [node.get_balance(poor), node.get_balance(rich)]}, height {after_height}")
+
+    # Reorg: the shards restore their saved values (the chain's index subtracts,
+    # which can leave float rounding behind), so compare with a fresh replay
+    with contextlib.redirect_stdout(io.StringIO()):
+        tip = node.disconnect_tip()
+    replayed = compute_balances(node.chain)
+    print(f"↩️  Disconnected #{tip.index}: shards at height {service.height}, identical to a replay "
+          f"of the chain: {service.get_balances(generator.addresses)[0] == [replayed.get(a) for a in generator.addresses]}")
+
+    print(f"\n📖 Read throughput (batches of 64 addresses, {cores} cores):")
+    for num_shards in sorted({1, max(2, cores)}):
+        shard_service = ShardedStateService(num_shards=num_shards)
+        shard_service.load(node.balances, node.nonces, len(node.chain) - 1)
+        for readers in sorted({1, max(2, cores)}):
+            rate = measure_read_throughput(shard_service, generator.addresses, readers)
+            print(f"   {num_shards} shard(s), {readers} reader process(es): {rate:>10,.0f} balances/s")
+        shard_service.close()
+    service.close()
+
+if __name__ == "__main__":
+    demonstrate_sharded_state(int(sys.argv[1]) if len(sys.argv) > 1 else 40)
@@ -0,0 +1,356 @@
+import bisect
+import contextlib
+import csv
+import io
+import os
+import random
+import resource
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+from CompactBlockRelay import RelayNode
+from Day4_TransactionSystem import Transaction, Wallet, EnhancedBlock, CryptocurrencyBlockchain
+
+# Synthetic workloads at configurable scale
+# A WorkloadGenerator turns a seeded WorkloadConfig into a stream of signed
+# transactions between N wallets: senders and receivers follow a Zipf-like skew
+# (a few hot addresses, a long tail), fees follow a chosen distribution, and
+# everything is reproducible from the seed.
+#
+# generate_chain() writes that stream straight into blocks, giving large
+# deterministic chains (same seed -> same block hashes) for benchmarks.
+# SoakHarness drives one or more relay nodes in real time for as long as you
+# like and samples throughput, confirmation latency, mempool size, memory and
+# block validation time. Run a soak with
+#     python SyntheticWorkload.py [seconds] [nodes]
+
+SYNTHETIC_EPOCH = datetime(2024, 1, 1)  # Timestamps of generated chains start here
+FEE_DISTRIBUTIONS = ("fixed", "uniform", "exponential")
+
+
+class WorkloadConfig:
+    def __init__(self, num_wallets=1000, tx_rate=200.0, fee_distribution="exponential", fee_mean=0.05,
+                 address_skew=1.0, block_interval=5.0, initial_balance=1000, amount_fraction=0.05,
+                 use_nonces=False, difficulty=1, seed=42):
+        if fee_distribution not in FEE_DISTRIBUTIONS:
+            raise ValueError(f"fee_distribution must be one of {FEE_DISTRIBUTIONS}")
+        if num_wallets < 2:
+            raise ValueError("A workload needs at least 2 wallets")
+        self.num_wallets = num_wallets
+        self.tx_rate = tx_rate  # Target transactions per second (Poisson arrivals)
+        self.fee_distribution = fee_distribution
+        self.fee_mean = fee_mean
+        self.address_skew = address_skew  # Zipf exponent: 0 = uniform, 1+ = a few hot wallets
+        self.block_interval = block_interval  # Seconds between blocks
+        self.initial_balance = initial_balance  # Premined for every wallet
+        self.amount_fraction = amount_fraction  # Largest payment as a share of the sender's funds
+        self.use_nonces = use_nonces
+        self.difficulty = difficulty  # Proof of work for live nodes (generated chains use 0)
+        self.seed = seed
+
+    def __repr__(self):
+        return (f"WorkloadConfig({self.num_wallets} wallets, {self.tx_rate:g} tx/s, "
+                f"{self.fee_distribution} fees ~{self.fee_mean:g}, skew {self.address_skew:g}, "
+                f"block every {self.block_interval:g}s, seed {self.seed})")
+
+
+class WorkloadGenerator:
+    def __init__(self, config):
+        self.config = config
+        self.rng = random.Random(config.seed)
+        # Deterministic keys so the same seed always yields the same addresses
+        self.wallets = [Wallet(f"synthetic{i}", private_key=f"{self.rng.getrandbits(256):064x}", verbose=False)
+                        for i in range(config.num_wallets)]
+        self.addresses = [wallet.address for wallet in self.wallets]
+        self.nonces = [0] * config.num_wallets
+        weights = [1 / (rank + 1) ** config.address_skew for rank in range(config.num_wallets)]
+        total = 0.0
+        self.cumulative_weights = []
+        for weight in weights:
+            total += weight
+            self.cumulative_weights.append(total)
+
+    def pick_wallet(self):
+        """Index of a wallet, low indexes hotter as address_skew grows"""
+        point = self.rng.random() * self.cumulative_weights[-1]
+        return min(bisect.bisect_right(self.cumulative_weights, point), len(self.wallets) - 1)
+
+    def pick_fee(self):
+        config = self.config
+        if config.fee_distribution == "fixed":
+            return config.fee_mean
+        if config.fee_distribution == "uniform":
+            return round(self.rng.uniform(0, 2 * config.fee_mean), 4)
+        return round(self.rng.expovariate(1 / config.fee_mean), 4) if config.fee_mean > 0 else 0
+
+    def allocation_block(self, blockchain, timestamp=None):
+        """Block on top of blockchain's tip that premines initial_balance for every wallet"""
+        timestamp = timestamp or SYNTHETIC_EPOCH
+        grants = []
+        for i, address in enumerate(self.addresses):
+            tx = Transaction("System", address, self.config.initial_balance,
+                             timestamp=timestamp + timedelta(microseconds=i))
+            tx.sign_transaction("SYSTEM_KEY")
+            grants.append(tx)
+        latest = blockchain.get_latest_block()
+        return EnhancedBlock(latest.index + 1, timestamp, grants, latest.hash)
+
+    def next_transaction(self, timestamp, spendable):
+        """
+        A signed payment, or None if the picked sender cannot afford one.
+
+        `spendable(address)` is the sender's available balance (the node's
+        spendable balance for live runs, a local ledger for generated chains).
+        """
+        sender_index = self.pick_wallet()
+        receiver_index = self.pick_wallet()
+        if receiver_index == sender_index:
+            receiver_index = (receiver_index + 1 + self.rng.randrange(len(self.wallets) - 1)) % len(self.wallets)
+        sender = self.wallets[sender_index]
+        fee = self.pick_fee()
+        available = spendable(sender.address) - fee
+        if available < 1:
+            return None
+        amount = max(1, int(available * self.config.amount_fraction * self.rng.random()))
+
+        nonce = None
+        if self.config.use_nonces:
+            nonce = self.nonces[sender_index]
+            self.nonces[sender_index] += 1
+        tx = Transaction(sender.address, self.addresses[receiver_index], amount, fee, timestamp=timestamp, nonce=nonce)
+        tx.sign_transaction(sender.private_key)
+        return tx
+
+    def sync_nonces(self, blockchain):
+        """Realign nonces with a node after rejected transactions"""
+        if self.config.use_nonces:
+            self.nonces = [blockchain.get_next_nonce(address) for address in self.addresses]
+
+
+def make_genesis(timestamp=SYNTHETIC_EPOCH):
+    return EnhancedBlock(0, timestamp, [], "0")
+
+def generate_chain(config, num_blocks, txs_per_block, miner_index=0):
+    """
+    Deterministic chain (difficulty 0) of num_blocks synthetic blocks after the premine.
+
+    The same config and sizes always give the same block hashes. Returns
+    (blockchain, generator); the generator's wallets own the coins.
+    """
+    generator = WorkloadGenerator(config)
+    blockchain = CryptocurrencyBlockchain()
+    blockchain.difficulty = 0
+    blockchain.chain = [make_genesis()]
+    miner = generator.addresses[miner_index]
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        blockchain.connect_block(generator.allocation_block(blockchain))
+        ledger = dict(blockchain.balances)
+        for height in range(2, num_blocks + 2):
+            block_time = SYNTHETIC_EPOCH + timedelta(seconds=config.block_interval * height)
+            transactions = []
+            attempts = 0
+            while len(transactions) < txs_per_block and attempts < txs_per_block * 4:
+                attempts += 1
+                tx = generator.next_transaction(block_time + timedelta(microseconds=attempts),
+                                                lambda address: ledger.get(address, 0))
+                if tx is None:
+                    continue
+                ledger[tx.sender] -= tx.amount + tx.fee
+                ledger[tx.receiver] = ledger.get(tx.receiver, 0) + tx.amount
+                transactions.append(tx)
+
+            coinbase = Transaction("System", miner, blockchain.mining_reward + sum(tx.fee for tx in transactions),
+                                   timestamp=block_time)
+            coinbase.sign_transaction("SYSTEM_KEY")
+            ledger[miner] = ledger.get(miner, 0) + coinbase.amount
+            block = EnhancedBlock(height, block_time, [coinbase] + transactions, blockchain.get_latest_block().hash)
+            block.mine_block(0, blockchain.address_filter_fp_rate)
+            blockchain.connect_block(block)
+
+    return blockchain, generator
+
+#=============================================================================
+# Soak harness
+#=============================================================================
+def current_rss_bytes():
+    """Resident set size of this process (peak RSS where /proc is unavailable)"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+class TimedBlockchain(CryptocurrencyBlockchain):
+    """Records how long each relayed block takes to validate and connect"""
+
+    def __init__(self):
+        super().__init__()
+        self.validation_times = []  # (seconds, transaction count) per accepted block
+
+    def add_block(self, block):
+        start_time = time.perf_counter()
+        accepted = super().add_block(block)
+        if accepted:
+            self.validation_times.append((time.perf_counter() - start_time, len(block.transactions)))
+        return accepted
+
+
+class SoakHarness:
+    """
+    Runs a WorkloadConfig against `num_nodes` relay nodes linked in a line.
+
+    Transactions arrive at tx_rate (Poisson) at nodes in turn and are gossiped;
+    every block_interval the next node mines and relays a compact block. Every
+    sample_interval a row of metrics is appended to `samples` (and printed).
+    """
+
+    def __init__(self, config, num_nodes=3, sample_interval=10.0, csv_path=None):
+        self.config = config
+        self.generator = WorkloadGenerator(config)
+        self.sample_interval = sample_interval
+        self.csv_path = csv_path
+        self.samples = []
+        self.totals = {"generated": 0, "accepted": 0, "rejected": 0, "unaffordable": 0, "confirmed": 0, "blocks": 0}
+
+        self.nodes = [RelayNode(f"node{i}", TimedBlockchain()) for i in range(num_nodes)]
+        genesis = make_genesis()
+        allocation = self.generator.allocation_block(self.nodes[0].blockchain)
+        allocation.build_address_filter()
+        for node in self.nodes:
+            node.blockchain.difficulty = config.difficulty
+            node.blockchain.chain = [genesis]
+            with contextlib.redirect_stdout(io.StringIO()):
+                node.blockchain.connect_block(allocation)
+        for left, right in zip(self.nodes, self.nodes[1:]):
+            left.connect(right)
+
+        self.submitted_at = {}  # Transaction ID -> perf_counter at submission
+        self._window = {"confirmed": 0, "latencies": [], "accepted": 0, "validation": []}
+
+    def _submit(self, node, now):
+        tx = self.generator.next_transaction(datetime.now(), node.blockchain.get_spendable_balance)
+        self.totals["generated"] += 1
+        if tx is None:
+            self.totals["unaffordable"] += 1
+            return
+        if node.submit_transaction(tx):
+            self.totals["accepted"] += 1
+            self._window["accepted"] += 1
+            self.submitted_at[tx.transaction_id] = now
+        else:
+            self.totals["rejected"] += 1
+            self.generator.sync_nonces(node.blockchain)
+
+    def _mine(self, node):
+        validated = [len(other.blockchain.validation_times) for other in self.nodes]
+        block = node.mine(self.generator.addresses[self.totals["blocks"] % len(self.generator.addresses)])
+        confirmed_at = time.perf_counter()
+        self.totals["blocks"] += 1
+        for tx in block.transactions:
+            submitted = self.submitted_at.pop(tx.transaction_id, None)
+            if submitted is not None:
+                self.totals["confirmed"] += 1
+                self._window["confirmed"] += 1
+                self._window["latencies"].append(confirmed_at - submitted)
+        for other, before in zip(self.nodes, validated):
+            self._window["validation"].extend(other.blockchain.validation_times[before:])
+
+    def _sample(self, elapsed, window_seconds):
+        window = self._window
+        latencies = sorted(window["latencies"])
+        validation = window["validation"]
+        validated_txs = sum(count for _, count in validation)
+        tip = self.nodes[0].blockchain
+        sample = {
+            "elapsed_s": round(elapsed, 1),
+            "height": len(tip.chain) - 1,
+            "accepted_tps": round(window["accepted"] / window_seconds, 1),
+            "confirmed_tps": round(window["confirmed"] / window_seconds, 1),
+            "latency_p50_s": round(percentile(latencies, 0.50), 3),
+            "latency_p95_s": round(percentile(latencies, 0.95), 3),
+            "mempool": len(tip.pending_transactions),
+            "rss_mb": round(current_rss_bytes() / 2**20, 1),
+            "validation_ms_per_block": round(statistics.fmean(t for t, _ in validation) * 1000, 2) if validation else 0.0,
+            "validation_us_per_tx": round(sum(t for t, _ in validation) / validated_txs * 1e6, 1) if validated_txs else 0.0,
+        }
+        self.samples.append(sample)
+        self._window = {"confirmed": 0, "latencies": [], "accepted": 0, "validation": []}
+        print(f"   t={sample['elapsed_s']:>7}s height {sample['height']:>5} | {sample['accepted_tps']:>7} tx/s in, "
+              f"{sample['confirmed_tps']:>7} tx/s confirmed | latency p50 {sample['latency_p50_s']}s "
+              f"p95 {sample['latency_p95_s']}s | mempool {sample['mempool']:>5} | RSS {sample['rss_mb']} MB | "
+              f"validate {sample['validation_ms_per_block']} ms/block ({sample['validation_us_per_tx']} µs/tx)")
+        return sample
+
+    def run(self, duration):
+        """Drive the nodes for `duration` seconds of wall-clock time; returns the samples"""
+        config = self.config
+        arrivals = random.Random(config.seed + 1)
+        start_time = time.perf_counter()
+        next_tx = start_time + arrivals.expovariate(config.tx_rate)
+        next_block = start_time + config.block_interval
+        next_sample = start_time + self.sample_interval
+        last_sample = start_time
+        turn = 0
+        print(f"🔥 Soak: {config} on {len(self.nodes)} nodes for {duration:g}s")
+
+        while True:
+            now = time.perf_counter()
+            if now - start_time >= duration:
+                break
+            with contextlib.redirect_stdout(io.StringIO()):
+                # Catch up on every arrival that is due (the generator may fall behind)
+                while next_tx <= now:
+                    self._submit(self.nodes[turn % len(self.nodes)], now)
+                    turn += 1
+                    next_tx += arrivals.expovariate(config.tx_rate)
+                if next_block <= now:
+                    self._mine(self.nodes[self.totals["blocks"] % len(self.nodes)])
+                    next_block += config.block_interval
+            if next_sample <= now:
+                self._sample(now - start_time, now - last_sample)
+                last_sample = now
+                next_sample += self.sample_interval
+            time.sleep(max(0.0, min(next_tx, next_block, next_sample) - time.perf_counter()))
+
+        if self.csv_path and self.samples:
+            with open(self.csv_path, "w", newline="") as output:
+                writer = csv.DictWriter(output, fieldnames=list(self.samples[0]))
+                writer.writeheader()
+                writer.writerows(self.samples)
+        heights = {len(node.blockchain.chain) - 1 for node in self.nodes}
+        print(f"📊 Totals: {self.totals}, nodes in sync: {len(heights) == 1}")
+        return self.samples
+
+#=============================================================================
+# DEMONSTRATION
+#=============================================================================
+def demonstrate_synthetic_workload(duration=30.0, num_nodes=3):
+    print("🚀 Synthetic Workload Demo")
+    print("=" * 60)
+
+    config = WorkloadConfig(num_wallets=2000)
+    start_time = time.perf_counter()
+    blockchain, _ = generate_chain(config, num_blocks=50, txs_per_block=200)
+    again, _ = generate_chain(config, num_blocks=50, txs_per_block=200)
+    print(f"🧱 Generated {len(blockchain.chain) - 1} blocks in {time.perf_counter() - start_time:.2f}s (twice), "
+          f"tip {blockchain.get_latest_block().hash[:16]}..., deterministic: "
+          f"{blockchain.get_latest_block().hash == again.get_latest_block().hash}")
+    hottest = blockchain.get_balance_sheet().ranked(top=3)
+    print(f"   Richest addresses: {[(address[:10], round(balance, 2)) for address, balance in hottest]}")
+
+    soak_config = WorkloadConfig(num_wallets=500, tx_rate=200, block_interval=2.0, difficulty=1)
+    SoakHarness(soak_config, num_nodes=num_nodes, sample_interval=max(1.0, duration / 6)).run(duration)
+
+if __name__ == "__main__":
+    demonstrate_synthetic_workload(float(sys.argv[1]) if len(sys.argv) > 1 else 30.0,
+                                   int(sys.argv[2]) if len(sys.argv) > 2 else 3)
@@ -1,11 +1,84 @@
 # Day3_4_ExtendedBlockchain.py
 # This file imports your existing Block and Blockchain classes and extends them
 
+import io
+import itertools
 import json
+import threading
+import time
 from datetime import datetime
 from Day1_Blockchain import Block  # Import your Block class
 from Day2_CreatingBlockchain import Blockchain  # Import your Blockchain class
 
+class BackgroundJob:
+    """
+    A long-running CLI task (mining, validation, big displays) on a worker thread.
+
+    The task function receives the job and should call job.report(done, total)
+    as it goes and return early once job.cancelled is set.
+    """
+    
+    def __init__(self, job_id, name, task, *args):
+        self.job_id = job_id
+        self.name = name
+        self.task = task
+        self.args = args
+        self.done = 0  # Units of work finished (blocks checked, hashes tried, ...)
+        self.total = None  # Expected units of work, if known
+        self.unit = "steps"
+        self.state = "running"  # running, finished, cancelled, failed
+        self.result = None
+        self.error = None
+        self.started_at = time.time()
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+    
+    def start(self):
+        self._thread.start()
+        return self
+    
+    def _run(self):
+        try:
+            self.result = self.task(self, *self.args)
+            self.state = "cancelled" if self.cancelled else "finished"
+        except Exception as error:
+            self.error = error
+            self.state = "failed"
+        self.finished_at = time.time()
+        print(f"\n🔔 Job #{self.job_id} ({self.name}) {self.state}")
+    
+    @property
+    def cancelled(self):
+        return self._cancel.is_set()
+    
+    def cancel(self):
+        self._cancel.set()
+    
+    def is_running(self):
+        return self.state == "running"
+    
+    def report(self, done, total=None):
+        self.done = done
+        if total is not None:
+            self.total = total
+    
+    def elapsed(self):
+        return (self.finished_at or time.time()) - self.started_at
+    
+    def rate(self):
+        """Units of work per second"""
+        elapsed = self.elapsed()
+        return self.done / elapsed if elapsed > 0 else 0.0
+    
+    def status_line(self):
+        progress = f"{self.done:,}"
+        if self.total:
+            progress += f"/{self.total:,} ({min(self.done / self.total, 1):.0%})"
+        return (f"#{self.job_id} {self.name:<18} {self.state:<9} {progress} {self.unit}, "
+                f"{self.rate():,.0f} {self.unit}/s, {self.elapsed():.1f}s")
+
+
 class ExtendedBlockchain(Blockchain):
     """
     Extended Blockchain class that inherits from your original Blockchain
@@ -15,9 +88,13 @@ class ExtendedBlockchain(Blockchain):
     3. Simple CLI interface
     """
     
-    def __init__(self):
+    def __init__(self, difficulty=4):
         # Call parent constructor to initialize the basic blockchain
         super().__init__()
+        self.difficulty = difficulty  # Proof of work for blocks added from the CLI
+        self.lock = threading.RLock()  # Guards chain changes made by background jobs
+        self.jobs = []
+        self._job_ids = itertools.count(1)
     
     # ✅ Task 1: Display the entire blockchain nicely
     def display_blockchain(self):
@@ -27,11 +104,7 @@ class ExtendedBlockchain(Blockchain):
         print("=" * 60)
         
         for i, block in enumerate(self.chain):
-            print(f"\n📦 BLOCK #{block.index}")
-            print(f"   Hash: {block.hash}")
-            print(f"   Previous Hash: {block.previous_hash}")
-            print(f"   Timestamp: {block.timestamp}")
-            print(f"   Data: {json.dumps(block.data, indent=8)}")
+            self._print_block(block)
             
             # Add visual connection between blocks
             if i < len(self.chain) - 1:
@@ -40,6 +113,24 @@ class ExtendedBlockchain(Blockchain):
         print(f"\n✅ Chain Status: {'VALID' if self.is_chain_valid() else 'INVALID'}")
         print(f"📊 Total blocks: {len(self.chain)}")
     
+    def _print_block(self, block, file=None):
+        """One block of display_blockchain(), to stdout or the given file"""
+        print(f"\n📦 BLOCK #{block.index}", file=file)
+        print(f"   Hash: {block.hash}", file=file)
+        print(f"   Previous Hash: {block.previous_hash}", file=file)
+        print(f"   Timestamp: {block.timestamp}", file=file)
+        print(f"   Data: {json.dumps(block.data, indent=8)}", file=file)
+    
+    def is_block_valid(self, i):
+        """Hash and linkage checks for block i (both is_chain_valid and the validation job use these)"""
+        current_block = self.chain[i]
+        previous_block = self.chain[i-1]
+        return (current_block.hash == current_block.calculate_hash() and
+                current_block.previous_hash == previous_block.hash)
+    
+    def is_chain_valid(self):
+        return all(self.is_block_valid(i) for i in range(1, len(self.chain)))
+    
     # ✅ Task 2: Find a block by its index
     def find_block_by_index(self, index):
         """Find and return a block by its index"""
@@ -74,6 +165,72 @@ class ExtendedBlockchain(Blockchain):
             "latest_block_index": self.get_latest_block().index
         }
     
+    # Background tasks (run by BackgroundJob on a worker thread)
+    def start_job(self, name, task, *args):
+        job = BackgroundJob(next(self._job_ids), name, task, *args)
+        self.jobs.append(job)
+        return job.start()
+    
+    def running_jobs(self):
+        return [job for job in self.jobs if job.is_running()]
+    
+    def _mine_block_task(self, job, block, check_every=1000):
+        """Proof of work that reports hashes tried and stops when cancelled"""
+        job.unit = "hashes"
+        target = "0" * self.difficulty
+        job.report(0, 16 ** self.difficulty)  # Expected number of hashes
+        with self.lock:
+            block.index = len(self.chain)
+            block.previous_hash = self.get_latest_block().hash
+        block.nonce = 0
+        block.hash = block.calculate_hash()
+        while block.hash[:self.difficulty] != target:
+            block.nonce += 1
+            block.hash = block.calculate_hash()
+            if block.nonce % check_every == 0:
+                job.report(block.nonce)
+                if job.cancelled:
+                    return None
+        job.report(block.nonce + 1)
+        
+        with self.lock:
+            if block.previous_hash != self.get_latest_block().hash:
+                raise RuntimeError("the chain tip changed while mining; add the block again")
+            self.chain.append(block)
+        return block
+    
+    def _validate_task(self, job):
+        """is_chain_valid one block at a time; returns (valid, first bad index)"""
+        job.unit = "blocks"
+        total = len(self.chain)
+        job.report(1, total)
+        for i in range(1, total):
+            if job.cancelled:
+                return None
+            if not self.is_block_valid(i):
+                return False, i
+            job.report(i + 1)
+        return True, None
+    
+    def _display_task(self, job):
+        """Render display_blockchain() into text so it can be shown when ready"""
+        job.unit = "blocks"
+        total = len(self.chain)
+        # Written to a buffer, not stdout: the CLI keeps printing while this runs
+        buffer = io.StringIO()
+        print("=" * 60, file=buffer)
+        print("               BLOCKCHAIN DISPLAY", file=buffer)
+        print("=" * 60, file=buffer)
+        for i in range(total):
+            if job.cancelled:
+                return None
+            self._print_block(self.chain[i], file=buffer)
+            if i < total - 1:
+                print("   ⬇️  links to", file=buffer)
+            job.report(i + 1, total)
+        print(f"\n📊 Total blocks: {total}", file=buffer)
+        return buffer.getvalue()
+    
     # ✅ Task 3: Simple CLI to interact with blockchain
     def simple_cli(self):
         """Simple command line interface for blockchain interaction"""
@@ -82,7 +239,7 @@ class ExtendedBlockchain(Blockchain):
         
         while True:
             self._display_menu()
-            choice = input("\nEnter your choice (1-7): ").strip()
+            choice = input("\nEnter your choice (1-9): ").strip()
             
             if choice == '1':
                 self._cli_display_blockchain()
@@ -97,10 +254,16 @@ class ExtendedBlockchain(Blockchain):
             elif choice == '6':
                 self._cli_tamper_block()
             elif choice == '7':
+                self._cli_show_jobs()
+            elif choice == '8':
+                self._cli_cancel_job()
+            elif choice == '9':
+                for job in self.running_jobs():
+                    job.cancel()
                 print("\n👋 Thank you for using Extended Blockchain CLI! Goodbye!")
                 break
             else:
-                print("❌ Invalid choice! Please select 1-7.")
+                print("❌ Invalid choice! Please select 1-9.")
             
             input("\nPress Enter to continue...")
     
@@ -115,12 +278,18 @@ class ExtendedBlockchain(Blockchain):
         print("4. ✅ Validate blockchain")
         print("5. 📊 Show blockchain statistics")
         print("6. 🔨 Tamper with block (for testing)")
-        print("7. 🚪 Exit")
+        print("7. ⏳ Background jobs (live progress)")
+        print("8. 🛑 Cancel a background job")
+        print("9. 🚪 Exit")
+        running = self.running_jobs()
+        if running:
+            print(f"   ({len(running)} job(s) running in the background)")
         print("="*50)
     
     def _cli_display_blockchain(self):
-        """CLI method to display blockchain"""
-        self.display_blockchain()
+        """CLI method to display blockchain (rendered in the background)"""
+        job = self.start_job("display chain", self._display_task)
+        print(f"📋 Rendering {len(self.chain)} blocks as job #{job.job_id}; view it from the jobs menu (7)")
     
     def _cli_find_block(self):
         """CLI method to find and display a block"""
@@ -155,20 +324,79 @@ class ExtendedBlockchain(Blockchain):
         new_index = len(self.chain)
         new_block = Block(new_index, datetime.now(), block_data, "")
         
-        # Add block using inherited method
-        self.add_block(new_block)
-        
-        print(f"✅ Block #{new_index} added successfully!")
-        print(f"   Hash: {new_block.hash[:16]}...")
+        # Mine in the background so the CLI keeps responding
+        if any(job.name == "mine block" for job in self.running_jobs()):
+            print("⚠️  A block is already being mined; wait for it or cancel it first (8)")
+            return
+        job = self.start_job("mine block", self._mine_block_task, new_block)
+        print(f"⛏️  Mining block #{new_index} at difficulty {self.difficulty} as job #{job.job_id}")
+        print("   Watch progress and hashrate from the jobs menu (7), cancel with (8)")
     
     def _cli_validate_chain(self):
-        """CLI method to validate the blockchain"""
-        is_valid = self.is_chain_valid()
-        status = "✅ VALID" if is_valid else "❌ INVALID"
-        print(f"\n🔍 Blockchain validation: {status}")
+        """CLI method to validate the blockchain (in the background)"""
+        job = self.start_job("validate chain", self._validate_task)
+        print(f"\n🔍 Validating {len(self.chain)} blocks as job #{job.job_id}; results in the jobs menu (7)")
+    
+    def _cli_show_jobs(self):
+        """Live status of background jobs; results of finished ones on request"""
+        if not self.jobs:
+            print("\n⏳ No background jobs yet")
+            return
+        
+        print("\n⏳ BACKGROUND JOBS (Ctrl+C stops watching, jobs keep running)")
+        try:
+            while True:
+                for job in self.jobs:
+                    print(f"   {job.status_line()}")
+                if not self.running_jobs():
+                    break
+                time.sleep(1)
+                print()
+        except KeyboardInterrupt:
+            print()
         
-        if not is_valid:
-            print("   The blockchain has been tampered with or corrupted!")
+        finished = [job for job in self.jobs if job.state in ("finished", "failed")]
+        if not finished:
+            return
+        choice = input("Show the result of job # (Enter to skip): ").strip()
+        job = next((job for job in finished if str(job.job_id) == choice), None)
+        if job is not None:
+            self._show_job_result(job)
+    
+    def _show_job_result(self, job):
+        if job.state == "failed":
+            print(f"❌ Job #{job.job_id} failed: {job.error}")
+        elif job.name == "mine block":
+            print(f"✅ Block #{job.result.index} added successfully!")
+            print(f"   Hash: {job.result.hash[:16]}...")
+            print(f"   Nonce: {job.result.nonce}, {job.rate():,.0f} hashes/s")
+        elif job.name == "validate chain":
+            is_valid, bad_index = job.result
+            print(f"🔍 Blockchain validation: {'✅ VALID' if is_valid else '❌ INVALID'}")
+            if not is_valid:
+                print(f"   The blockchain has been tampered with or corrupted at block #{bad_index}!")
+        else:
+            print(job.result)
+    
+    def _cli_cancel_job(self):
+        """CLI method to cancel a running background job"""
+        running = self.running_jobs()
+        if not running:
+            print("\n🛑 No jobs are running")
+            return
+        for job in running:
+            print(f"   {job.status_line()}")
+        try:
+            job_id = int(input("Job # to cancel: "))
+        except ValueError:
+            print("❌ Please enter a valid number!")
+            return
+        job = next((job for job in running if job.job_id == job_id), None)
+        if job is None:
+            print(f"❌ Job #{job_id} is not running")
+            return
+        job.cancel()
+        print(f"🛑 Cancelling job #{job_id}...")
     
     def _cli_show_stats(self):
         """CLI method to show blockchain statistics"""
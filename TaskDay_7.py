@@ -4,6 +4,8 @@ import json
 from datetime import datetime
 import random
 import string
+from BalanceSheet import compute_balances
+from BloomFilter import BloomFilter
 
 # Day 7 Tasks: Step-by-Step Implementation
 # This file contains the specific daily tasks for Day 7A and Day 7B
@@ -33,9 +35,14 @@ class Transaction:
         self.hash = self.calculate_hash()
     
     def generate_transaction_id(self):
-        """Generate a unique transaction ID"""
-        unique_string = f"{self.sender}{self.receiver}{self.amount}{self.timestamp}{random.randint(1000, 9999)}"
-        return hashlib.sha256(unique_string.encode()).hexdigest()[:12]
+        """Derive the transaction ID from its content (same content -> same ID)"""
+        id_string = json.dumps({
+            "sender": self.sender,
+            "receiver": self.receiver,
+            "amount": self.amount,
+            "timestamp": str(self.timestamp)
+        }, sort_keys=True)
+        return hashlib.sha256(id_string.encode()).hexdigest()
     
     def calculate_hash(self):
         """Calculate transaction hash for integrity"""
@@ -86,6 +93,7 @@ class TransactionBlock:
         self.previous_hash = previous_hash
         self.nonce = 0
         self.hash = self.calculate_hash()
+        self.address_filter = None  # Bloom filter of senders and receivers
     
     def calculate_hash(self):
         """Calculate block hash including all transaction data"""
@@ -101,6 +109,13 @@ class TransactionBlock:
         }, sort_keys=True)
         return hashlib.sha256(block_string.encode()).hexdigest()
     
+    def build_address_filter(self, fp_rate=0.01):
+        """Remember which addresses appear in this block"""
+        addresses = {tx.sender for tx in self.transactions} | {tx.receiver for tx in self.transactions}
+        self.address_filter = BloomFilter(len(addresses), fp_rate)
+        for address in addresses:
+            self.address_filter.add(address)
+    
     def display_transactions(self):
         """Display all transactions in the block"""
         print(f"   Block #{self.index} contains {len(self.transactions)} transactions:")
@@ -157,6 +172,7 @@ class BasicBlockchain:
             transactions=self.pending_transactions.copy(),
             previous_hash=self.get_latest_block().hash
         )
+        new_block.build_address_filter()
         
         self.chain.append(new_block)
         self.pending_transactions = []  # Clear pending transactions
@@ -246,6 +262,10 @@ class WalletWithBalance(BasicWallet):
         
         # Scan all blocks in the blockchain
         for block in blockchain.chain:
+            # Skip blocks whose address filter rules this wallet out
+            if block.address_filter is not None and self.address not in block.address_filter:
+                continue
+            
             # Skip genesis block (has no transactions)
             if hasattr(block, 'transactions') and block.transactions:
                 for tx in block.transactions:
@@ -318,6 +338,7 @@ class BlockchainWithMining(BasicBlockchain):
             transactions=all_transactions,
             previous_hash=self.get_latest_block().hash
         )
+        new_block.build_address_filter()
         
         self.chain.append(new_block)
         self.pending_transactions = []
@@ -384,7 +405,9 @@ def demonstrate_all_day7_tasks():
     print(f"\n🎯 Step 1: Initial mining (create coins)")
     blockchain.mine_pending_transactions(miner.address)
     
-    print(f"   Miner balance: {miner.get_balance(blockchain)}")
+    # One pass over the chain gives every balance; later steps only replay new blocks
+    balances = compute_balances(blockchain.chain)
+    print(f"   Miner balance: {balances.get(miner.address)}")
     
     # Step 2: Miner sends coins to Alice and Bob
     print(f"\n🎯 Step 2: Miner distributes coins")
@@ -397,10 +420,11 @@ def demonstrate_all_day7_tasks():
     # Mine these transactions
     blockchain.mine_pending_transactions(miner.address)
     
+    balances = compute_balances(blockchain.chain, previous=balances)
     print(f"   Balances after distribution:")
-    print(f"   Miner: {miner.get_balance(blockchain)}")
-    print(f"   Alice: {alice.get_balance(blockchain)}")
-    print(f"   Bob: {bob.get_balance(blockchain)}")
+    print(f"   Miner: {balances.get(miner.address)}")
+    print(f"   Alice: {balances.get(alice.address)}")
+    print(f"   Bob: {balances.get(bob.address)}")
     
     # Step 3: Alice and Bob send to Charlie
     print(f"\n🎯 Step 3: Multiple transactions")
@@ -413,11 +437,13 @@ def demonstrate_all_day7_tasks():
     # Mine final block
     blockchain.mine_pending_transactions(miner.address)
     
+    balances = compute_balances(blockchain.chain, previous=balances)
     print(f"   Final balances:")
-    print(f"   Miner: {miner.get_balance(blockchain)}")
-    print(f"   Alice: {alice.get_balance(blockchain)}")
-    print(f"   Bob: {bob.get_balance(blockchain)}")
-    print(f"   Charlie: {charlie.get_balance(blockchain)}")
+    print(f"   Miner: {balances.get(miner.address)}")
+    print(f"   Alice: {balances.get(alice.address)}")
+    print(f"   Bob: {balances.get(bob.address)}")
+    print(f"   Charlie: {balances.get(charlie.address)}")
+    print(f"   Richest: {balances.ranked(top=1)}")
     
     print(f"\n📊 Final Statistics:")
     print(f"   Total blocks: {len(blockchain.chain)}")
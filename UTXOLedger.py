@@ -0,0 +1,453 @@
+import contextlib
+import io
+import os
+import random
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+
+from Day4_TransactionSystem import Transaction, Wallet, CryptocurrencyBlockchain
+
+# UTXO ledger mode
+# Instead of debiting accounts, a transaction spends earlier outputs and creates
+# new ones. The node keeps the set of unspent outputs, so checking a
+# transaction only needs the outputs it references: O(1) lookups, and once the
+# inputs are resolved every transaction can be checked on its own (in parallel).
+#
+# Memory per unspent output (64-bit CPython, see measure_output_memory):
+#   36-byte outpoint key (bytes object)     ~69 bytes
+#   (address, amount) value tuple + float   ~80 bytes
+#   dict slot                               ~30-60 bytes depending on fill
+#   per-address index (set slot)            ~30-60 bytes
+# About 250 bytes per output in total; address strings are shared.
+
+OUTPOINT_INDEX_BYTES = 4
+
+def outpoint_key(transaction_id, index):
+    """Compact dict key for an output: raw 32-byte transaction ID + 4-byte index"""
+    return bytes.fromhex(transaction_id) + index.to_bytes(OUTPOINT_INDEX_BYTES, "big")
+
+def outpoint_from_key(key):
+    return key[:32].hex(), int.from_bytes(key[32:], "big")
+
+
+class UTXOTransaction(Transaction):
+    """
+    A transaction that spends outputs of earlier transactions.
+
+    `inputs` are (transaction ID, output index) pairs owned by `owner`;
+    `outputs` are (address, amount) pairs. Whatever the inputs hold beyond the
+    outputs is the fee. sender/receiver/amount describe the payment (outputs
+    not returning to the owner) so the rest of the system can display it.
+    """
+
+    def __init__(self, owner, inputs, outputs, fee=0, timestamp=None):
+        self.inputs = [tuple(spent) for spent in inputs]
+        self.outputs = [tuple(output) for output in outputs]
+        payments = [(address, amount) for address, amount in self.outputs if address != owner]
+        receiver = payments[0][0] if payments else owner
+        amount = sum(amount for _, amount in (payments or self.outputs))
+        self.extra_addresses = tuple({address for address, _ in self.outputs} - {owner, receiver})
+        super().__init__(owner, receiver, amount, fee, timestamp)
+
+    def content(self):
+        data = super().content()
+        data["inputs"] = [list(spent) for spent in self.inputs]
+        data["outputs"] = [list(output) for output in self.outputs]
+        return data
+
+    def is_valid(self):
+        if not self.inputs or not self.outputs:
+            return False
+        if len(set(self.inputs)) != len(self.inputs):
+            return False
+        if any(amount <= 0 for _, amount in self.outputs):
+            return False
+        return super().is_valid()
+
+    def input_keys(self):
+        return [outpoint_key(transaction_id, index) for transaction_id, index in self.inputs]
+
+    def to_dict(self):
+        data = super().to_dict()
+        data["inputs"] = [list(spent) for spent in self.inputs]
+        data["outputs"] = [list(output) for output in self.outputs]
+        return data
+
+    def __repr__(self):
+        return f"UTXO-TX({self.sender[:8]}...: {len(self.inputs)} in → {len(self.outputs)} out, {self.amount})"
+
+
+class UTXOSet:
+    """Unspent outputs with O(1) insert, lookup and spend, plus a per-address index"""
+
+    def __init__(self):
+        self.outputs = {}  # Outpoint key -> (address, amount)
+        self.by_address = {}  # Address -> set of outpoint keys
+
+    def add(self, transaction_id, index, address, amount):
+        key = outpoint_key(transaction_id, index)
+        self.outputs[key] = (address, amount)
+        self.by_address.setdefault(address, set()).add(key)
+
+    def spend(self, key):
+        """Remove an output and return its (address, amount); KeyError if unknown"""
+        address, amount = self.outputs.pop(key)
+        keys = self.by_address[address]
+        keys.discard(key)
+        if not keys:
+            del self.by_address[address]
+        return address, amount
+
+    def restore(self, key, entry):
+        self.outputs[key] = entry
+        self.by_address.setdefault(entry[0], set()).add(key)
+
+    def get(self, key):
+        return self.outputs.get(key)
+
+    def coins_for(self, address):
+        """[(outpoint key, amount)] owned by an address"""
+        outputs = self.outputs
+        return [(key, outputs[key][1]) for key in self.by_address.get(address, ())]
+
+    def balance(self, address):
+        return sum(amount for _, amount in self.coins_for(address))
+
+    def __contains__(self, key):
+        return key in self.outputs
+
+    def __len__(self):
+        return len(self.outputs)
+
+    def __repr__(self):
+        return f"UTXOSet({len(self.outputs)} outputs, {len(self.by_address)} addresses)"
+
+#=============================================================================
+# Coin selection
+#=============================================================================
+def select_coins(coins, target):
+    """
+    Pick coins [(key, amount)] worth at least `target`, or None if they can't.
+
+    1. A single coin worth exactly the target.
+    2. If all coins smaller than the target cannot reach it, the smallest larger coin.
+    3. Otherwise smaller coins largest-first, unless one larger coin leaves less change.
+    """
+    smaller = []
+    smallest_larger = None
+    for coin in coins:
+        amount = coin[1]
+        if amount == target:
+            return [coin]
+        if amount < target:
+            smaller.append(coin)
+        elif smallest_larger is None or amount < smallest_larger[1]:
+            smallest_larger = coin
+
+    if sum(amount for _, amount in smaller) < target:
+        return [smallest_larger] if smallest_larger is not None else None
+
+    smaller.sort(key=lambda coin: coin[1], reverse=True)
+    selected = []
+    total = 0
+    for coin in smaller:
+        selected.append(coin)
+        total += coin[1]
+        if total >= target:
+            break
+    if smallest_larger is not None and smallest_larger[1] - target < total - target:
+        return [smallest_larger]
+    return selected
+
+
+class UTXOWallet(Wallet):
+    def send_coins(self, blockchain, receiver_address, amount, fee=0):
+        """Build and sign a payment from this wallet's unspent outputs (change comes back here)"""
+        if not receiver_address or amount <= 0:
+            raise ValueError("Invalid receiver address or amount")
+        coins = [coin for coin in blockchain.utxos.coins_for(self.address)
+                 if coin[0] not in blockchain.pending_spent]
+        selected = select_coins(coins, amount + fee)
+        if selected is None:
+            raise ValueError(f"Insufficient funds: need {amount + fee}")
+
+        change = sum(value for _, value in selected) - amount - fee
+        outputs = [(receiver_address, amount)]
+        if change > 0:
+            outputs.append((self.address, change))
+        inputs = [outpoint_from_key(key) for key, _ in selected]
+        transaction = UTXOTransaction(self.address, inputs, outputs, fee)
+        transaction.sign_transaction(self.private_key)
+        return transaction
+
+#=============================================================================
+# Validation (parallel once inputs are resolved)
+#=============================================================================
+def check_resolved_transaction(tx, spent_outputs):
+    """Checks that need only the transaction and the outputs it spends; None if valid"""
+    if not tx.is_valid():
+        return "invalid structure, signature or hash"
+    total = 0
+    for address, amount in spent_outputs:
+        if address != tx.sender:
+            return "spends an output owned by another address"
+        total += amount
+    if total < sum(amount for _, amount in tx.outputs) + tx.fee:
+        return "outputs plus fee exceed inputs"
+    return None
+
+def _check_batch(batch):
+    return [check_resolved_transaction(tx, spent_outputs) for tx, spent_outputs in batch]
+
+def validate_transactions(utxos, transactions, workers=None, batch_size=2000, excluded=()):
+    """
+    Problems for a list of transactions in order (None = valid), e.g. a block body.
+
+    Inputs are resolved serially with O(1) lookups, which also catches double
+    spends and lets later transactions spend outputs created earlier in the
+    list. The remaining checks are independent and run in worker processes.
+    `excluded` holds outpoint keys that must not be spent (e.g. pending spends).
+    """
+    problems = [None] * len(transactions)
+    created = {}
+    spent = set()
+    pending = []  # (position, transaction, spent outputs) awaiting the stateless checks
+    for position, tx in enumerate(transactions):
+        if tx.sender == "System":
+            problems[position] = None if tx.is_valid() else "invalid coinbase"
+            created[outpoint_key(tx.transaction_id, 0)] = (tx.receiver, tx.amount)
+            continue
+        if not isinstance(tx, UTXOTransaction):
+            problems[position] = "UTXO mode needs transactions that spend outputs"
+            continue
+
+        spent_outputs = []
+        for key in tx.input_keys():
+            entry = created.get(key) or utxos.get(key)
+            if key in spent or key in excluded:
+                problems[position] = "double spend"
+                break
+            if entry is None:
+                problems[position] = "unknown or already spent output"
+                break
+            spent_outputs.append(entry)
+        if problems[position] is not None:
+            continue
+        spent.update(tx.input_keys())
+        for index, output in enumerate(tx.outputs):
+            created[outpoint_key(tx.transaction_id, index)] = output
+        pending.append((position, tx, spent_outputs))
+
+    if workers is None:
+        workers = os.cpu_count() or 1
+    batches = [[(tx, spent_outputs) for _, tx, spent_outputs in pending[start:start + batch_size]]
+               for start in range(0, len(pending), batch_size)]
+    if workers <= 1 or len(batches) <= 1:
+        results = [_check_batch(batch) for batch in batches]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_check_batch, batches))
+
+    checked = (problem for batch in results for problem in batch)
+    for (position, _, _), problem in zip(pending, checked):
+        problems[position] = problem
+    return problems
+
+
+class UTXOBlockchain(CryptocurrencyBlockchain):
+    """CryptocurrencyBlockchain whose state is a UTXO set (balances are derived from it)"""
+
+    def __init__(self, validation_workers=None):
+        self.utxos = UTXOSet()
+        self.pending_spent = set()  # Outpoint keys spent by pending transactions
+        self.undo = {}  # Height -> per transaction [(outpoint key, spent output)], for reorgs
+        self.validation_workers = validation_workers
+        super().__init__()
+
+    #-------------------------------------------------------------------------
+    # Admission
+    #-------------------------------------------------------------------------
+    def check_spendable(self, transaction):
+        if transaction.sender == "System":
+            return "coinbase transactions are only valid in blocks"
+        if not isinstance(transaction, UTXOTransaction):
+            return "UTXO mode needs transactions that spend outputs"
+        spent_outputs = []
+        for key in transaction.input_keys():
+            if key in self.pending_spent:
+                return "output already spent by a pending transaction"
+            entry = self.utxos.get(key)
+            if entry is None:
+                return "unknown or already spent output"
+            spent_outputs.append(entry)
+        # is_valid() already ran in create_transaction; only the value checks remain
+        total = 0
+        for address, amount in spent_outputs:
+            if address != transaction.sender:
+                return "spends an output owned by another address"
+            total += amount
+        if total < sum(amount for _, amount in transaction.outputs) + transaction.fee:
+            return "outputs plus fee exceed inputs"
+        return None
+
+    def track_pending(self, transaction):
+        super().track_pending(transaction)
+        self.pending_spent.update(transaction.input_keys())
+
+    def revalidate_pending(self):
+        self.pending_spent = set()
+        super().revalidate_pending()
+
+    #-------------------------------------------------------------------------
+    # Blocks
+    #-------------------------------------------------------------------------
+    def check_block_state(self, block):
+        problems = validate_transactions(self.utxos, block.transactions, self.validation_workers)
+        for tx, problem in zip(block.transactions, problems):
+            if problem:
+                return f"{problem} in {tx}"
+
+        # The coinbase may claim the reward plus the fees: inputs minus outputs
+        created = {}
+        minted = fees = 0
+        for tx in block.transactions:
+            if tx.sender == "System":
+                minted += tx.amount
+                created[outpoint_key(tx.transaction_id, 0)] = (tx.receiver, tx.amount)
+                continue
+            inputs = sum((created.get(key) or self.utxos.get(key))[1] for key in tx.input_keys())
+            fees += inputs - sum(amount for _, amount in tx.outputs)
+            for index, output in enumerate(tx.outputs):
+                created[outpoint_key(tx.transaction_id, index)] = output
+        if minted > self.mining_reward + fees + 1e-9:  # Tolerate float rounding in the sums
+            return "coinbase pays more than the block reward plus fees"
+        return None
+
+    def apply_block_to_state(self, block):
+        balances = self.balances
+        utxos = self.utxos
+        undo = []
+        for tx in block.transactions:
+            spent = []
+            if tx.sender == "System":  # Mining rewards create a single new output
+                outputs = [(tx.receiver, tx.amount)]
+            else:
+                for key in tx.input_keys():
+                    address, amount = utxos.spend(key)
+                    balances[address] -= amount
+                    spent.append((key, (address, amount)))
+                outputs = tx.outputs
+            for index, (address, amount) in enumerate(outputs):
+                utxos.add(tx.transaction_id, index, address, amount)
+                balances[address] = balances.get(address, 0) + amount
+            undo.append(spent)
+        self.undo[block.index] = undo
+
+    def rebuild_state_index(self):
+        self.utxos = UTXOSet()
+        self.undo = {}
+        super().rebuild_state_index()
+
+    def disconnect_tip(self):
+        """Remove the tip block, restoring the outputs it spent"""
+        if len(self.chain) < 2:
+            raise ValueError("Cannot disconnect the genesis block")
+        block = self.chain[-1]
+        if block.pruned:
+            raise ValueError(f"Cannot disconnect pruned block #{block.index}")
+
+        self.chain.pop()
+        balances = self.balances
+        for tx, spent in zip(reversed(block.transactions), reversed(self.undo.pop(block.index))):
+            outputs = [(tx.receiver, tx.amount)] if tx.sender == "System" else tx.outputs
+            for index, (address, amount) in enumerate(outputs):
+                self.utxos.spend(outpoint_key(tx.transaction_id, index))
+                balances[address] -= amount
+            for key, entry in spent:
+                self.utxos.restore(key, entry)
+                balances[entry[0]] += entry[1]
+            self.seen_transactions.discard(tx.transaction_id)
+        return self.finish_disconnect(block)
+
+#=============================================================================
+# DEMONSTRATION: Payments, coin selection, parallel validation, memory
+#=============================================================================
+def measure_output_memory(count=100_000):
+    """Average bytes per unspent output held in a UTXOSet"""
+    addresses = [f"1{i:030x}" for i in range(count // 10)]
+    transaction_ids = [os.urandom(32).hex() for _ in range(count)]
+    amounts = [float(i % 1000 + 1) for i in range(count)]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    utxos = UTXOSet()
+    for i in range(count):
+        utxos.add(transaction_ids[i], 0, addresses[i % len(addresses)], amounts[i])
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return used / count
+
+def demonstrate_utxo_ledger(num_payments=20000):
+    print("🚀 UTXO Ledger Demo")
+    print("=" * 60)
+
+    blockchain = UTXOBlockchain()
+    blockchain.difficulty = 2
+    miner = UTXOWallet("Miner", verbose=False)
+    alice = UTXOWallet("Alice", verbose=False)
+    bob = UTXOWallet("Bob", verbose=False)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(3):
+            blockchain.mine_pending_transactions(miner.address)
+    print(f"💰 Miner owns {len(blockchain.utxos.coins_for(miner.address))} coinbase outputs, "
+          f"balance {blockchain.get_balance(miner.address)}")
+
+    # Coin selection: 130 + fee needs two 100-coin outputs, change comes back
+    payment = miner.send_coins(blockchain, alice.address, 130, fee=1)
+    print(f"🪙 {payment}: inputs {len(payment.inputs)}, outputs {payment.outputs[1:]}")
+    blockchain.create_transaction(payment)
+
+    # Double spend of the same outputs is rejected at admission
+    double_spend = UTXOTransaction(miner.address, payment.inputs, [(bob.address, 199)])
+    double_spend.sign_transaction(miner.private_key)
+    blockchain.create_transaction(double_spend)
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        blockchain.mine_pending_transactions(miner.address)
+    change = alice.send_coins(blockchain, bob.address, 30)
+    blockchain.create_transaction(change)
+    with contextlib.redirect_stdout(io.StringIO()):
+        blockchain.mine_pending_transactions(miner.address)
+    for wallet in (miner, alice, bob):
+        print(f"   {wallet.name}: balance {blockchain.get_balance(wallet.address)}, "
+              f"{len(blockchain.utxos.coins_for(wallet.address))} outputs")
+    print(f"   {blockchain.utxos}, chain valid: {blockchain.is_chain_valid()}")
+
+    # Parallel validation of many independent payments
+    rng = random.Random(1)
+    utxos = UTXOSet()
+    funding = Transaction("System", miner.address, 1)
+    transactions = []
+    for i in range(num_payments):
+        utxos.add(funding.transaction_id, i, miner.address, 10.0)
+        tx = UTXOTransaction(miner.address, [(funding.transaction_id, i)],
+                             [(f"1{rng.getrandbits(120):030x}", 9.0), (miner.address, 0.5)], fee=0.5)
+        tx.sign_transaction(miner.private_key)
+        transactions.append(tx)
+
+    start_time = time.perf_counter()
+    serial = validate_transactions(utxos, transactions, workers=1)
+    serial_time = time.perf_counter() - start_time
+    start_time = time.perf_counter()
+    parallel = validate_transactions(utxos, transactions)
+    parallel_time = time.perf_counter() - start_time
+    print(f"\n🧪 Validating {num_payments:,} payments: serial {serial_time * 1000:.0f} ms, "
+          f"parallel {parallel_time * 1000:.0f} ms on {os.cpu_count()} cores, "
+          f"same result: {serial == parallel}, all valid: {not any(serial)}")
+
+    print(f"📏 Memory per unspent output: ~{measure_output_memory():.0f} bytes")
+
+if __name__ == "__main__":
+    demonstrate_utxo_ledger(int(sys.argv[1]) if len(sys.argv) > 1 else 20000)
@@ -0,0 +1,444 @@
+import asyncio
+import contextlib
+import http.client
+import io
+import json
+import queue
+import statistics
+import sys
+import threading
+import time
+
+from Day4_TransactionSystem import Transaction, Wallet, CryptocurrencyBlockchain
+
+# JSON-RPC 2.0 wallet API
+# POST a request object (or a batch: a list of them) to http://host:port/ over a
+# keep-alive connection. Methods:
+#   getblockcount, getmempoolinfo
+#   getbalance(address), getspendablebalance(address), getnextnonce(address)
+#   gettransactionhistory(address, limit=100)
+#   sendrawtransaction(transaction dict)          -> transaction ID
+#   createwallet(name), sendmoney(wallet name, receiver, amount, fee=0, nonce=None)
+# Wallets made with createwallet live on the server (custodial), so sendmoney
+# signs for them; sendrawtransaction takes transactions signed elsewhere.
+
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+INTERNAL_ERROR = -32603
+TRANSACTION_REJECTED = -32000
+
+HTTP_REASONS = {200: "OK", 204: "No Content", 400: "Bad Request", 405: "Method Not Allowed"}
+
+# Safe to send twice: the client only retries these on a dropped connection
+READ_ONLY_METHODS = {"getblockcount", "getmempoolinfo", "getbalance", "getspendablebalance",
+                     "getnextnonce", "gettransactionhistory"}
+
+
+class RPCError(Exception):
+    def __init__(self, code, message, data=None):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+        self.data = data
+
+    def to_dict(self):
+        error = {"code": self.code, "message": self.message}
+        if self.data is not None:
+            error["data"] = self.data
+        return error
+
+
+class WalletRPCServer:
+    def __init__(self, blockchain, host="127.0.0.1", port=8332, quiet=True):
+        self.blockchain = blockchain
+        self.host = host
+        self.port = port
+        self.quiet = quiet  # Submit without the chain's per-transaction prints
+        self.wallets = {}  # Name -> Wallet (custodial)
+        self.lock = threading.RLock()  # Shared with anyone else touching the blockchain
+        self.stats = {"http_requests": 0, "calls": 0, "batches": 0, "errors": 0}
+        self.methods = {
+            "getblockcount": self.getblockcount,
+            "getmempoolinfo": self.getmempoolinfo,
+            "getbalance": self.getbalance,
+            "getspendablebalance": self.getspendablebalance,
+            "getnextnonce": self.getnextnonce,
+            "gettransactionhistory": self.gettransactionhistory,
+            "sendrawtransaction": self.sendrawtransaction,
+            "createwallet": self.createwallet,
+            "sendmoney": self.sendmoney,
+        }
+        self._server = None
+        self._loop = None
+        self._thread = None
+        self._connections = set()
+
+    #-------------------------------------------------------------------------
+    # Methods
+    #-------------------------------------------------------------------------
+    def getblockcount(self):
+        return len(self.blockchain.chain) - 1
+
+    def getmempoolinfo(self):
+        pending = self.blockchain.pending_transactions
+        return {"size": len(pending), "total_fees": sum(tx.fee for tx in pending)}
+
+    def getbalance(self, address):
+        return self.blockchain.get_balance(address)
+
+    def getspendablebalance(self, address):
+        return self.blockchain.get_spendable_balance(address)
+
+    def getnextnonce(self, address):
+        return self.blockchain.get_next_nonce(address)
+
+    def gettransactionhistory(self, address, limit=100):
+        history = self.blockchain.get_transaction_history(address)
+        return [{"block_height": height, "transaction": tx.to_dict()}
+                for height, tx in history[-limit:]] if limit > 0 else []
+
+    def sendrawtransaction(self, transaction):
+        try:
+            tx = Transaction.from_dict(transaction)
+        except (KeyError, TypeError, ValueError) as error:
+            raise RPCError(INVALID_PARAMS, f"Malformed transaction: {error}") from None
+        return self._submit(tx)
+
+    def createwallet(self, name):
+        if name in self.wallets:
+            raise RPCError(INVALID_PARAMS, f"Wallet '{name}' already exists")
+        wallet = Wallet(name, verbose=False)
+        self.wallets[name] = wallet
+        return wallet.address
+
+    def sendmoney(self, wallet, receiver, amount, fee=0, nonce=None):
+        sender = self.wallets.get(wallet)
+        if sender is None:
+            raise RPCError(INVALID_PARAMS, f"Unknown wallet '{wallet}'")
+        try:
+            tx = sender.send_money(receiver, amount, fee, nonce)
+        except ValueError as error:
+            raise RPCError(INVALID_PARAMS, str(error)) from None
+        return self._submit(tx)
+
+    def _submit(self, tx):
+        if tx.transaction_id in self.blockchain.seen_transactions:
+            raise RPCError(TRANSACTION_REJECTED, "Duplicate transaction", tx.transaction_id)
+        if not tx.is_valid():
+            raise RPCError(TRANSACTION_REJECTED, "Invalid transaction", tx.transaction_id)
+        problem = self.blockchain.check_spendable(tx)
+        if problem:
+            raise RPCError(TRANSACTION_REJECTED, f"Transaction rejected: {problem}", tx.transaction_id)
+        self.blockchain.create_transaction(tx, verbose=not self.quiet)
+        return tx.transaction_id
+
+    #-------------------------------------------------------------------------
+    # JSON-RPC dispatch
+    #-------------------------------------------------------------------------
+    def call(self, request):
+        """Response dict for one request object, or None for a notification"""
+        if not isinstance(request, dict) or request.get("jsonrpc") != "2.0" or \
+                not isinstance(request.get("method"), str):
+            return {"jsonrpc": "2.0", "id": None,
+                    "error": RPCError(INVALID_REQUEST, "Invalid Request").to_dict()}
+        request_id = request.get("id")
+        self.stats["calls"] += 1
+        try:
+            method = self.methods.get(request["method"])
+            if method is None:
+                raise RPCError(METHOD_NOT_FOUND, f"Method not found: {request['method']}")
+            params = request.get("params", [])
+            try:
+                if isinstance(params, dict):
+                    result = method(**params)
+                elif isinstance(params, list):
+                    result = method(*params)
+                else:
+                    raise RPCError(INVALID_PARAMS, "params must be an array or an object")
+            except TypeError as error:
+                raise RPCError(INVALID_PARAMS, str(error)) from None
+            response = {"jsonrpc": "2.0", "id": request_id, "result": result}
+        except RPCError as error:
+            self.stats["errors"] += 1
+            response = {"jsonrpc": "2.0", "id": request_id, "error": error.to_dict()}
+        except Exception as error:
+            self.stats["errors"] += 1
+            response = {"jsonrpc": "2.0", "id": request_id,
+                        "error": RPCError(INTERNAL_ERROR, "Internal error", str(error)).to_dict()}
+        return response if "id" in request else None
+
+    def handle_body(self, body):
+        """Response bytes for a request body (single or batch); b"" if nothing to return"""
+        try:
+            payload = json.loads(body)
+        except ValueError:
+            error = RPCError(PARSE_ERROR, "Parse error").to_dict()
+            return json.dumps({"jsonrpc": "2.0", "id": None, "error": error}).encode()
+
+        with self.lock:
+            if isinstance(payload, list):
+                self.stats["batches"] += 1
+                if not payload:
+                    responses = {"jsonrpc": "2.0", "id": None,
+                                 "error": RPCError(INVALID_REQUEST, "Empty batch").to_dict()}
+                else:
+                    responses = [response for response in map(self.call, payload) if response is not None]
+                    if not responses:
+                        return b""
+            else:
+                responses = self.call(payload)
+                if responses is None:
+                    return b""
+        return json.dumps(responses).encode()
+
+    #-------------------------------------------------------------------------
+    # HTTP transport (keep-alive)
+    #-------------------------------------------------------------------------
+    async def _serve_connection(self, reader, writer):
+        self._connections.add(asyncio.current_task())
+        try:
+            while True:
+                try:
+                    head = await reader.readuntil(b"\r\n\r\n")
+                except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+                    break
+                lines = head.decode("latin-1").split("\r\n")
+                method, _, rest = lines[0].partition(" ")
+                headers = {}
+                for line in lines[1:]:
+                    name, _, value = line.partition(":")
+                    if name:
+                        headers[name.strip().lower()] = value.strip()
+                close = headers.get("connection", "").lower() == "close" or rest.endswith("HTTP/1.0")
+                try:
+                    length = int(headers.get("content-length", 0))
+                except ValueError:
+                    length = -1
+                self.stats["http_requests"] += 1
+
+                if length < 0:  # The body cannot be framed, so the connection cannot be reused either
+                    status, data, close = 400, b'{"error": "Invalid Content-Length"}', True
+                else:
+                    try:
+                        body = await reader.readexactly(length)
+                    except (asyncio.IncompleteReadError, ConnectionError):
+                        break
+                    if method != "POST":
+                        status, data = 405, b'{"error": "POST JSON-RPC requests to /"}'
+                    else:
+                        data = self.handle_body(body)
+                        status = 200 if data else 204
+                response = (f"HTTP/1.1 {status} {HTTP_REASONS[status]}\r\n"
+                            f"Content-Type: application/json\r\nContent-Length: {len(data)}\r\n"
+                            f"Connection: {'close' if close else 'keep-alive'}\r\n\r\n").encode("latin-1")
+                writer.write(response + data)
+                await writer.drain()
+                if close:
+                    break
+        except asyncio.CancelledError:
+            pass
+        finally:
+            self._connections.discard(asyncio.current_task())
+            writer.close()
+
+    def start(self):
+        """Run the server on a background thread (returns once it is listening)"""
+        ready = threading.Event()
+
+        def run():
+            self._loop = asyncio.new_event_loop()
+            asyncio.set_event_loop(self._loop)
+            self._server = self._loop.run_until_complete(
+                asyncio.start_server(self._serve_connection, self.host, self.port))
+            self.port = self._server.sockets[0].getsockname()[1]
+            ready.set()
+            self._loop.run_forever()
+
+        self._thread = threading.Thread(target=run, daemon=True)
+        self._thread.start()
+        ready.wait()
+        print(f"🔌 JSON-RPC wallet API on http://{self.host}:{self.port}/")
+        return self
+
+    async def _shutdown(self):
+        self._server.close()
+        for task in list(self._connections):
+            task.cancel()
+        await asyncio.gather(*self._connections, return_exceptions=True)
+        await self._server.wait_closed()
+
+    def stop(self):
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._shutdown(), self._loop).result(timeout=5)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join(timeout=5)
+        self._loop.close()
+        self._loop = None
+
+#=============================================================================
+# Pooled client
+#=============================================================================
+class RPCClient:
+    """
+    Thread-safe JSON-RPC client over a pool of persistent HTTP connections.
+
+    call() returns the result or raises RPCError; batch() returns one entry per
+    call, in order, with RPCError instances in place of failed results.
+    """
+
+    def __init__(self, host="127.0.0.1", port=8332, pool_size=8, timeout=30):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self._pool = queue.LifoQueue()
+        for _ in range(pool_size):
+            self._pool.put(None)  # Connections are opened lazily
+        self._ids = iter(range(1, sys.maxsize))
+        self._id_lock = threading.Lock()
+
+    def _next_id(self):
+        with self._id_lock:
+            return next(self._ids)
+
+    def _post(self, payload):
+        requests = payload if isinstance(payload, list) else [payload]
+        read_only = all(request.get("method") in READ_ONLY_METHODS for request in requests)
+        connection = self._pool.get()
+        try:
+            for attempt in range(2):  # One retry if the server closed an idle connection
+                if connection is None:
+                    connection = http.client.HTTPConnection(self.host, self.port, timeout=self.timeout)
+                sent = False
+                try:
+                    connection.request("POST", "/", body=json.dumps(payload),
+                                       headers={"Content-Type": "application/json"})
+                    sent = True
+                    response = connection.getresponse()
+                    data = response.read()
+                    break
+                except (http.client.HTTPException, ConnectionError):
+                    connection.close()
+                    connection = None
+                    # Once sent, the server may have acted on it: resending could e.g. pay twice
+                    if attempt or (sent and not read_only):
+                        raise
+            return json.loads(data) if data else None
+        finally:
+            self._pool.put(connection)
+
+    def call(self, method, *params):
+        request = {"jsonrpc": "2.0", "id": self._next_id(), "method": method, "params": list(params)}
+        response = self._post(request)
+        if "error" in response:
+            error = response["error"]
+            raise RPCError(error["code"], error["message"], error.get("data"))
+        return response["result"]
+
+    def batch(self, calls):
+        """Send [(method, params), ...] in one round trip"""
+        requests = [{"jsonrpc": "2.0", "id": self._next_id(), "method": method, "params": list(params)}
+                    for method, params in calls]
+        responses = {response["id"]: response for response in self._post(requests)}
+        results = []
+        for request in requests:
+            response = responses[request["id"]]
+            if "error" in response:
+                error = response["error"]
+                results.append(RPCError(error["code"], error["message"], error.get("data")))
+            else:
+                results.append(response["result"])
+        return results
+
+    def close(self):
+        while not self._pool.empty():
+            connection = self._pool.get_nowait()
+            if connection is not None:
+                connection.close()
+
+#=============================================================================
+# Benchmark: throughput and latency percentiles
+#=============================================================================
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+def run_rpc_benchmark(client, make_calls, threads=8, rounds=50):
+    """Each thread sends `rounds` requests built by make_calls(thread, round); returns a report"""
+    latencies = []
+    calls_done = [0]
+    lock = threading.Lock()
+
+    def worker(thread):
+        local = []
+        count = 0
+        for round_number in range(rounds):
+            calls = make_calls(thread, round_number)
+            start_time = time.perf_counter()
+            if len(calls) == 1:
+                method, params = calls[0]
+                client.call(method, *params)
+            else:
+                client.batch(calls)
+            local.append(time.perf_counter() - start_time)
+            count += len(calls)
+        with lock:
+            latencies.extend(local)
+            calls_done[0] += count
+
+    start_time = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start_time
+
+    latencies.sort()
+    return {
+        "requests_per_second": len(latencies) / elapsed,
+        "calls_per_second": calls_done[0] / elapsed,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p90_ms": percentile(latencies, 0.90) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+        "mean_ms": statistics.fmean(latencies) * 1000 if latencies else 0.0
+    }
+
+def benchmark_wallet_rpc(threads=8, rounds=50, batch_size=100):
+    print("🧪 Benchmark: JSON-RPC wallet API")
+    blockchain = CryptocurrencyBlockchain()
+    blockchain.difficulty = 1
+    with contextlib.redirect_stdout(io.StringIO()):
+        server = WalletRPCServer(blockchain, port=0).start()
+    client = RPCClient(server.host, server.port, pool_size=threads)
+
+    treasury = client.call("createwallet", "treasury")
+    with contextlib.redirect_stdout(io.StringIO()):
+        with server.lock:
+            for _ in range(5):
+                blockchain.mine_pending_transactions(treasury)
+    addresses = [Wallet(f"user{i}", verbose=False).address for i in range(batch_size)]
+
+    reports = {
+        "getbalance x1": run_rpc_benchmark(
+            client, lambda t, r: [("getbalance", [addresses[(t + r) % batch_size]])], threads, rounds),
+        f"getbalance x{batch_size} batch": run_rpc_benchmark(
+            client, lambda t, r: [("getbalance", [address]) for address in addresses], threads, rounds),
+        f"sendmoney x{batch_size} batch": run_rpc_benchmark(
+            client, lambda t, r: [("sendmoney", ["treasury", addresses[i], 0.001])
+                                  for i in range(batch_size)], threads, max(1, rounds // 10)),
+    }
+    for name, report in reports.items():
+        print(f"   {name:<24} {report['requests_per_second']:>8,.0f} req/s {report['calls_per_second']:>9,.0f} calls/s  "
+              f"p50 {report['p50_ms']:.2f} ms  p90 {report['p90_ms']:.2f} ms  p99 {report['p99_ms']:.2f} ms")
+    print(f"   Mempool after submissions: {client.call('getmempoolinfo')}")
+
+    client.close()
+    server.stop()
+    return reports
+
+if __name__ == "__main__":
+    benchmark_wallet_rpc()